@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+
+from logger import get_logger
+from profiler import stage
+
+logger = get_logger(__name__)
+
+CACHE_DIR = Path(__file__).parent / "Cache" / "asset_index"
+INDEX_VERSION = 2
+HASH_CHUNK = 1 << 20
+
+
+def file_hash(path: str) -> str:
+    """blake2b content hash of a file, read in 1 MB chunks."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_text_asset(raw: bytes, endian: str = "<") -> tuple[str, bytes]:
+    """Parse the serialized bytes of a TextAsset object.
+
+    Layout: m_Name and m_Script, each an int32 length followed by the data
+    and padding to a 4 byte boundary.
+
+    Returns:
+        tuple: (m_Name, m_Script bytes)
+    """
+    view = memoryview(raw)
+    (name_len,) = struct.unpack_from(f"{endian}i", view, 0)
+    name = str(view[4:4 + name_len], 'utf-8', 'surrogateescape')
+    pos = (4 + name_len + 3) & ~3
+    (script_len,) = struct.unpack_from(f"{endian}i", view, pos)
+    pos += 4
+    if script_len < 0 or pos + script_len > len(view):
+        raise ValueError(f"Corrupt TextAsset '{name}': script length {script_len}")
+    return name, bytes(view[pos:pos + script_len])
+
+
+class AssetIndex:
+    """On-disk index of the named TextAssets in Unity assets files.
+
+    Entries are keyed by the file's path and validated against its size,
+    mtime and content hash, so a changed file is rescanned automatically.
+    For standalone serialized files the byte range of every TextAsset is
+    recorded, which lets later reads skip UnityPy entirely.
+    """
+
+    def __init__(self, cache_dir: str | Path = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else CACHE_DIR
+
+    def _entry_path(self, path: str) -> Path:
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def load(self, path: str) -> dict | None:
+        """Return the cached entry for path, or None if missing or stale."""
+        entry_path = self._entry_path(path)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("version") != INDEX_VERSION:
+            return None
+
+        stat = os.stat(path)
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry
+
+        # Touched or copied without changing content: keep the entry
+        if entry["size"] == stat.st_size and entry["hash"] and entry["hash"] == file_hash(path):
+            logger.debug(f"Asset index for {path} still valid, refreshing mtime")
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self._store(entry_path, entry)
+            return entry
+
+        logger.debug(f"Asset index for {path} is stale")
+        return None
+
+    def _store(self, entry_path: Path, entry: dict) -> None:
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+
+    def build(self, path: str, env=None) -> dict:
+        """Scan path with UnityPy and record every named TextAsset."""
+        import UnityPy
+        from UnityPy.files import SerializedFile
+
+        stat = os.stat(path)
+        if env is None:
+            with stage("unity_load"):
+                env = UnityPy.load(path)
+            logger.debug(f"Loaded {path} for indexing")
+
+        # Byte ranges are only file offsets when the assets file is not
+        # wrapped in a bundle.
+        direct = isinstance(env.file, SerializedFile)
+        objects = {}
+        endian = "<"
+        table = []
+        with stage("unity_scan"):
+            for obj in env.objects:
+                if direct and hasattr(obj, "byte_size_offset"):
+                    table.append([
+                        obj.byte_start, obj.byte_size,
+                        obj.byte_start_offset[0], obj.byte_start_offset[1], obj.byte_size_offset[0]
+                    ])
+                if obj.type.name != "TextAsset":
+                    continue
+                peek_name = getattr(obj, "peek_name", None)
+                name = peek_name() if peek_name else obj.read().m_Name
+                if name in objects:
+                    continue
+                objects[name] = {
+                    "path_id": obj.path_id,
+                    "type": obj.type.name,
+                    "byte_start": obj.byte_start,
+                    "byte_size": obj.byte_size,
+                }
+                endian = getattr(obj.reader, "endian", endian)
+
+        entry = {
+            "version": INDEX_VERSION,
+            "path": os.path.abspath(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": file_hash(path),
+            "direct": direct,
+            "endian": endian,
+            "objects": objects,
+            "layout": self._layout(env.file, table) if direct else None,
+        }
+        self._store(self._entry_path(path), entry)
+        logger.debug(f"Indexed {len(objects)} TextAssets in {path}")
+        return entry
+
+    @staticmethod
+    def _layout(assets_file, table: list) -> dict | None:
+        """Where the object table and header keep offsets, for asset_patch.
+
+        Only recorded for format 9+ (metadata in front of the data) and when
+        UnityPy exposes the table field positions.
+        """
+        version = assets_file.header.version
+        if version < 9 or len(table) != len(assets_file.objects):
+            return None
+        table.sort()
+        return {
+            "format": version,
+            "data_offset": assets_file.header.data_offset,
+            # [byte_start, byte_size, start field offset, start field width, size field offset]
+            "table": table,
+        }
+
+    def update(self, path: str, entry: dict) -> None:
+        """Store an entry that was adjusted after an in-place change to path.
+
+        The content hash is dropped rather than recomputed over the whole
+        file, so only an unchanged size and mtime keep the entry valid.
+        """
+        stat = os.stat(path)
+        entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, hash=None)
+        self._store(self._entry_path(path), entry)
+
+    def get(self, path: str) -> dict:
+        """Return a valid entry for path, rebuilding it when needed."""
+        return self.load(path) or self.build(path)
+
+    def invalidate(self, path: str) -> None:
+        try:
+            os.remove(self._entry_path(path))
+        except FileNotFoundError:
+            pass
+
+    def script_range(self, path: str, name: str) -> tuple[int, int] | None:
+        """Locate the m_Script bytes of a TextAsset without reading them.
+
+        Returns:
+            tuple: (file offset, length) of m_Script, or None if the asset is
+            not indexed or the file is not a standalone serialized file
+        """
+        entry = self.get(path)
+        info = entry["objects"].get(name)
+        if info is None or not entry["direct"]:
+            return None
+
+        endian = entry["endian"]
+        with open(path, 'rb') as f:
+            f.seek(info["byte_start"])
+            (name_len,) = struct.unpack(f"{endian}i", f.read(4))
+            found_name = str(f.read(name_len), 'utf-8', 'surrogateescape')
+            f.seek(info["byte_start"] + ((4 + name_len + 3) & ~3))
+            (script_len,) = struct.unpack(f"{endian}i", f.read(4))
+        offset = info["byte_start"] + ((4 + name_len + 3) & ~3) + 4
+        if found_name != name or script_len < 0 or offset + script_len > info["byte_start"] + info["byte_size"]:
+            logger.warning(f"Asset index mismatch in {path}: expected {name}, found {found_name}")
+            self.invalidate(path)
+            return None
+        return offset, script_len
+
+    def read_text_asset(self, path: str, name: str) -> tuple[str, bytes] | None:
+        """Read one TextAsset straight from its recorded byte range.
+
+        Returns:
+            tuple: (m_Name, m_Script bytes), or None if the asset is not
+            indexed or the file is not a standalone serialized file
+        """
+        entry = self.get(path)
+        info = entry["objects"].get(name)
+        if info is None or not entry["direct"]:
+            return None
+
+        with open(path, 'rb') as f:
+            f.seek(info["byte_start"])
+            raw = f.read(info["byte_size"])
+        found_name, script = parse_text_asset(raw, entry["endian"])
+        if found_name != name:
+            # The index says otherwise; let the caller fall back to UnityPy
+            logger.warning(f"Asset index mismatch in {path}: expected {name}, found {found_name}")
+            self.invalidate(path)
+            return None
+        return found_name, script
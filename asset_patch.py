@@ -0,0 +1,212 @@
+"""In-place replacement of TextAsset scripts in standalone assets files.
+
+A UnityPy repack parses every object and rewrites the whole file even when
+a few kilobytes of WSREFDATA change. With the object table layout recorded
+by AssetIndex, the new TextAsset can be written straight into a memory map
+of the file instead:
+
+- same size (after 8 byte alignment): overwritten where it is
+- otherwise the data behind it is moved by the difference and the offsets
+  of the following objects are fixed up in the object table, which gives
+  the same bytes as a UnityPy repack of a file UnityPy wrote
+- or, with append=True, an object that still fits is overwritten where it
+  is and one that grew is written at the end of the file with its table
+  entry relinked there, leaving the old region unused
+
+The file is modified in place, so keep a backup; AssetTransaction does.
+"""
+import mmap
+import os
+import struct
+
+from asset_index import AssetIndex
+from logger import get_logger
+from profiler import stage
+
+logger = get_logger(__name__)
+
+OBJECT_ALIGN = 8
+
+
+class PatchError(RuntimeError):
+    """Raised when a file cannot be patched in place, or a patch does not match a repack."""
+
+
+def _align(n: int, alignment: int) -> int:
+    return n + (alignment - n % alignment) % alignment
+
+
+def replace_script(raw: bytes, script: bytes, endian: str = "<") -> bytes:
+    """Return the serialized TextAsset raw with its m_Script replaced.
+
+    m_Name and anything stored after m_Script are kept as they are.
+    """
+    (name_len,) = struct.unpack_from(f"{endian}i", raw, 0)
+    pos = _align(4 + name_len, 4)
+    (script_len,) = struct.unpack_from(f"{endian}i", raw, pos)
+    if script_len < 0 or pos + 4 + script_len > len(raw):
+        raise PatchError(f"Corrupt TextAsset: script length {script_len}")
+    tail = raw[_align(pos + 4 + script_len, 4):]
+    padding = b"\0" * ((4 - len(script) % 4) % 4)
+    return raw[:pos] + struct.pack(f"{endian}i", len(script)) + script + padding + tail
+
+
+def _header_file_size(file_format: int) -> tuple[str, int]:
+    # The header is always big-endian; format 22 moved the sizes to 64 bit fields
+    return (">q", 24) if file_format >= 22 else (">I", 4)
+
+
+def _patch_one(f, entry: dict, name: str, script: bytes, append: bool) -> str:
+    layout = entry["layout"]
+    endian = entry["endian"]
+    table = layout["table"]
+    data_offset = layout["data_offset"]
+
+    start = entry["objects"][name]["byte_start"]
+    pos = next((i for i, row in enumerate(table) if row[0] == start), None)
+    if pos is None:
+        raise PatchError(f"{name} is missing from the recorded object table")
+    row = table[pos]
+
+    f.seek(start)
+    raw = f.read(row[1])
+    new_raw = replace_script(raw, script, endian)
+
+    file_size = os.fstat(f.fileno()).st_size
+    last = pos == len(table) - 1
+    slot_end = file_size if last else table[pos + 1][0]
+    old_slot = slot_end - start
+
+    same_size = _align(len(new_raw), OBJECT_ALIGN) == _align(row[1], OBJECT_ALIGN)
+    if len(new_raw) <= old_slot and (same_size or append):
+        mode = "in place"
+        new_start, delta, new_size = start, 0, file_size
+        body = new_raw + b"\0" * max(0, row[1] - len(new_raw))
+    elif append and not last:
+        mode = "appended"
+        new_start = _align(file_size, OBJECT_ALIGN)
+        body = new_raw + b"\0" * ((OBJECT_ALIGN - len(new_raw) % OBJECT_ALIGN) % OBJECT_ALIGN)
+        delta, new_size = 0, new_start + len(body)
+    else:
+        mode = "shifted"
+        new_start = start
+        new_slot = _align(len(new_raw), OBJECT_ALIGN)
+        if not last:
+            # Keep the following objects on the alignment they had
+            new_slot += (old_slot - new_slot) % OBJECT_ALIGN
+        delta = new_slot - old_slot
+        body = new_raw + b"\0" * (new_slot - len(new_raw))
+        new_size = file_size + delta
+
+    if new_size > file_size:
+        f.truncate(new_size)
+    with mmap.mmap(f.fileno(), 0) as view:
+        if delta and not last:
+            view.move(slot_end + delta, slot_end, file_size - slot_end)
+        view[new_start:new_start + len(body)] = body
+
+        # Relink the object table
+        moved = {}
+        if delta:
+            for other in table[pos + 1:]:
+                moved[other[0]] = other[0] + delta
+                other[0] += delta
+                struct.pack_into(_start_format(endian, other[3]), view, other[2], other[0] - data_offset)
+        if new_start != start:
+            moved[start] = new_start
+            row[0] = new_start
+            struct.pack_into(_start_format(endian, row[3]), view, row[2], new_start - data_offset)
+        row[1] = len(new_raw)
+        struct.pack_into(f"{endian}I", view, row[4], row[1])
+
+        size_format, size_offset = _header_file_size(layout["format"])
+        (header_size,) = struct.unpack_from(size_format, view, size_offset)
+        struct.pack_into(size_format, view, size_offset, header_size + new_size - file_size)
+        view.flush()
+    if new_size < file_size:
+        f.truncate(new_size)
+
+    table.sort()
+    for info in entry["objects"].values():
+        info["byte_start"] = moved.get(info["byte_start"], info["byte_start"])
+    entry["objects"][name]["byte_size"] = row[1]
+    logger.debug(f"Patched {name} {mode}: {len(raw)} -> {len(new_raw)} bytes")
+    return mode
+
+
+def _start_format(endian: str, width: int) -> str:
+    return f"{endian}q" if width == 8 else f"{endian}I"
+
+
+def patch_text_assets(path: str, scripts: dict, index: AssetIndex = None, append: bool = False) -> dict[str, str]:
+    """Replace the m_Script of TextAssets in path without repacking it.
+
+    Args:
+        scripts (dict): TextAsset name to new m_Script (bytes or str)
+        append (bool): Move grown assets to the end of the file and leave
+            shrunk ones where they are, instead of shifting the data behind them
+
+    Returns:
+        dict: Name to how it was written ("in place", "shifted" or "appended")
+
+    Raises:
+        PatchError: The file is wrapped in a bundle, uses a format older
+            than 9, or an asset is missing; nothing was modified
+    """
+    index = index or AssetIndex()
+    entry = index.get(path)
+    if not entry["direct"] or not entry.get("layout"):
+        raise PatchError(f"{path} cannot be patched in place (bundled or unsupported format)")
+    missing = sorted(name for name in scripts if name not in entry["objects"])
+    if missing:
+        raise PatchError(f"Could not find {', '.join(missing)} in the asset index of {path}")
+
+    modes = {}
+    try:
+        with stage("patch"), open(path, 'r+b') as f:
+            for name, script in scripts.items():
+                if isinstance(script, str):
+                    script = script.encode('utf-8', 'surrogateescape')
+                modes[name] = _patch_one(f, entry, name, script, append)
+    except BaseException:
+        # The recorded layout no longer matches what is on disk
+        index.invalidate(path)
+        raise
+    index.update(path, entry)
+    return modes
+
+
+def _objects(source) -> dict:
+    import UnityPy
+
+    env = UnityPy.load(source)
+    return {obj.path_id: (obj.type.name, obj.get_raw_data()) for obj in env.objects}
+
+
+def verify_patch(original_path: str, patched_path: str, scripts: dict) -> str:
+    """Check a patched file against a UnityPy repack of the original.
+
+    Returns:
+        str: "identical" when the files match byte for byte, "equivalent"
+        when only the layout differs (every object has the same path ID,
+        type and bytes)
+
+    Raises:
+        PatchError: The patched file holds different objects
+    """
+    from asset_transaction import repack
+
+    expected = repack(original_path, scripts)
+    with open(patched_path, 'rb') as f:
+        actual = f.read()
+    if actual == expected:
+        return "identical"
+
+    expected_objects = _objects(expected)
+    actual_objects = _objects(actual)
+    if expected_objects.keys() != actual_objects.keys():
+        raise PatchError("Patched file does not hold the same objects as the UnityPy repack")
+    different = [path_id for path_id, value in expected_objects.items() if actual_objects[path_id] != value]
+    if different:
+        raise PatchError(f"{len(different)} objects differ from the UnityPy repack, first path ID {different[0]}")
+    return "equivalent"
@@ -0,0 +1,320 @@
+"""Find the encrypted TextAssets in every Unity file of a game Data folder.
+
+Each file is loaded with UnityPy in a worker process. For every TextAsset
+the m_Script payload is tried against SAVE_KEY and REFDATA_KEY. Because
+the cipher is ECB, decrypting the first and the last block is enough: the
+key is right when the last block has valid PKCS7 padding and the first
+one is UTF-8 text. Results are cached per file under Cache/asset_scan and
+validated like the asset index, so a rescan after a game patch only loads
+the files that changed.
+"""
+import binascii
+import codecs
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from asset_index import file_hash
+from crypto import SaveCrypto
+from dotnet_io import read_7bit_int
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_DIR = Path(__file__).parent / "Cache" / "asset_scan"
+SCAN_VERSION = 1
+KEYS = {"SAVE_KEY": SaveCrypto.SAVE_KEY, "REFDATA_KEY": SaveCrypto.REFDATA_KEY}
+
+# Serialized files and bundles; .resS/.resource hold raw texture and audio data
+_ASSET_FILE = re.compile(
+    r"(\.assets|\.bundle|\.unity3d)$|^(level\d+|globalgamemanagers|unity default resources)$",
+    re.IGNORECASE
+)
+_BASE64 = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_CONTROL = bytes(c for c in range(32) if c not in (9, 10, 13))
+AES_BLOCK = 16
+
+
+@dataclass
+class ScannedAsset:
+    """One TextAsset found by the scan."""
+    file: str
+    name: str
+    path_id: int
+    size: int
+    key: str | None
+    hash: str
+    format: str
+
+    def describe(self) -> str:
+        return f"{self.key or '-':<12} {self.size:>12,}  {self.hash[:12]}  {self.file}:{self.name}"
+
+
+def find_asset_files(data_dir: str) -> list[str]:
+    """Every serialized file and bundle under data_dir, sorted."""
+    paths = []
+    for root, _, files in os.walk(data_dir):
+        for name in files:
+            if _ASSET_FILE.search(name):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def _ciphertext(script: bytes) -> bytes | None:
+    """Base64-decode the payload of a TextAsset, or None if it is not base64 text.
+
+    The payload is either a BinaryWriter length-prefixed string, like save
+    files, or carries a few prefix bytes that SaveCrypto skips as len % 4.
+    """
+    try:
+        length, pos = read_7bit_int(memoryview(script))
+    except (ValueError, EOFError, IndexError):
+        length, pos = -1, 0
+    payload = script[pos:] if length > 0 and pos + length == len(script) else script[len(script) % 4:]
+    body = payload.rstrip(b"=")
+    if len(payload) < 24 or len(payload) % 4 or len(payload) - len(body) > 2 or body.translate(None, _BASE64):
+        return None
+    ciphertext = binascii.a2b_base64(payload)
+    return ciphertext if len(ciphertext) % AES_BLOCK == 0 else None
+
+
+def _valid_padding(block: bytes) -> bool:
+    n = block[-1]
+    return 1 <= n <= AES_BLOCK and block[-n:] == bytes([n]) * n
+
+
+def _is_text(data: bytes) -> bool:
+    try:
+        # final=False: the block may end in the middle of a character
+        codecs.utf_8_decode(data, 'strict', False)
+    except UnicodeDecodeError:
+        return False
+    return data.translate(None, _CONTROL) == data
+
+
+def identify_key(script: bytes) -> tuple[str | None, str]:
+    """Find which key an m_Script payload decrypts under.
+
+    Returns:
+        tuple: (key name or None, format) where format is "json" or "text"
+        for decryptable payloads, and "plain" or "binary" otherwise
+    """
+    ciphertext = _ciphertext(script)
+    if ciphertext is not None:
+        for key_name, key in KEYS.items():
+            head = _decrypt_head(ciphertext, key)
+            if head is not None:
+                return key_name, "json" if head.lstrip(b"\xef\xbb\xbf \t\r\n")[:1] in (b"{", b"[") else "text"
+    return None, "plain" if _is_text(script[:4096]) else "binary"
+
+
+def _decrypt_head(ciphertext: bytes, key: str) -> bytes | None:
+    """The first plaintext block if ciphertext decrypts under key, else None."""
+    if SaveCrypto.get_backend() == "native":
+        from native_crypto import NativeRijndael
+
+        cipher = NativeRijndael.for_key(key)
+        last = cipher.decrypt_blocks(ciphertext[-AES_BLOCK:])
+        if not _valid_padding(last):
+            return None
+        head = last[:-last[-1]] if len(ciphertext) == AES_BLOCK else cipher.decrypt_blocks(ciphertext[:AES_BLOCK])
+        return head if _is_text(head) else None
+
+    # The CLR backend cannot decrypt single blocks, decrypt the whole payload
+    try:
+        text = SaveCrypto._decrypt_data(binascii.b2a_base64(ciphertext, newline=False), key)
+    except Exception:
+        return None
+    head = text[:AES_BLOCK].encode('utf-8')
+    return head if "\ufffd" not in text[:4096] and _is_text(head) else None
+
+
+def _init_worker(backend: str) -> None:
+    SaveCrypto.set_backend(backend)
+
+
+def scan_file(path: str) -> tuple[str, str, list[dict], str | None]:
+    """Load one Unity file and classify every TextAsset in it.
+
+    Returns:
+        tuple: (path, file hash, assets as dicts, error)
+    """
+    import UnityPy
+
+    digest = file_hash(path)
+    assets = []
+    try:
+        env = UnityPy.load(path)
+        for obj in env.objects:
+            if obj.type.name != "TextAsset":
+                continue
+            data = obj.read()
+            script = data.m_Script
+            if isinstance(script, str):
+                script = script.encode('utf-8', 'surrogateescape')
+            key, fmt = identify_key(script)
+            assets.append(asdict(ScannedAsset(
+                file=path,
+                name=data.m_Name,
+                path_id=obj.path_id,
+                size=len(script),
+                key=key,
+                hash=hashlib.blake2b(script, digest_size=20).hexdigest(),
+                format=fmt,
+            )))
+    except Exception as e:
+        return path, digest, [], f"{type(e).__name__}: {e}"
+    return path, digest, assets, None
+
+
+@dataclass
+class ScanResult:
+    """Every TextAsset found, plus how the scan went."""
+    assets: list[ScannedAsset] = field(default_factory=list)
+    files: int = 0
+    scanned: int = 0
+    cached: int = 0
+    elapsed: float = 0.0
+    failures: list[tuple[str, str]] = field(default_factory=list)
+
+    def encrypted(self) -> list[ScannedAsset]:
+        return [asset for asset in self.assets if asset.key]
+
+    def summary(self) -> str:
+        lines = [
+            f"Found {len(self.assets)} TextAssets ({len(self.encrypted())} encrypted) in {self.files} files "
+            f"in {self.elapsed:.2f}s: {self.scanned} scanned, {self.cached} cached"
+        ]
+        for path, error in self.failures:
+            lines.append(f"FAILED {path}: {error}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            "assets": [asdict(asset) for asset in self.assets],
+            "files": self.files,
+            "scanned": self.scanned,
+            "cached": self.cached,
+            "elapsed": self.elapsed,
+            "failures": [{"path": path, "error": error} for path, error in self.failures],
+        }
+
+
+class AssetScanner:
+    """Scans Data folders, keeping one cache entry per Unity file.
+
+    Entries are validated against the file's size and mtime, then its
+    content hash, the same way AssetIndex entries are.
+    """
+
+    def __init__(self, cache_dir: str | Path = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else CACHE_DIR
+
+    def _entry_path(self, path: str) -> Path:
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def load(self, path: str, stat: os.stat_result) -> dict | None:
+        """Return the cached entry for path, or None if missing or stale."""
+        entry_path = self._entry_path(path)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != SCAN_VERSION or entry["size"] != stat.st_size:
+            return None
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry
+        if entry["hash"] == file_hash(path):
+            logger.debug(f"Scan of {path} still valid, refreshing mtime")
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self._store(entry)
+            return entry
+        return None
+
+    def _store(self, entry: dict) -> None:
+        entry_path = self._entry_path(entry["path"])
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+
+    def scan(self, data_dirs: list[str], workers: int = None, rescan: bool = False, progress=None) -> ScanResult:
+        """Classify the TextAssets of every Unity file under data_dirs.
+
+        Args:
+            workers (int): Worker processes, defaults to the number of cores
+            rescan (bool): Ignore the cache and load every file again
+            progress (callable): Optional callback(done, total) after each loaded file
+        """
+        start = time.perf_counter()
+        paths = []
+        for data_dir in data_dirs:
+            paths.extend(find_asset_files(data_dir) if os.path.isdir(data_dir) else [data_dir])
+        result = ScanResult(files=len(paths))
+
+        entries = {}
+        pending = []
+        for path in paths:
+            stat = os.stat(path)
+            entry = None if rescan else self.load(path, stat)
+            if entry is None:
+                pending.append((path, stat))
+            else:
+                entries[path] = entry
+                result.cached += 1
+
+        if pending:
+            logger.info(f"Scanning {len(pending)} of {len(paths)} asset files")
+            stats = dict(pending)
+            for done, (path, digest, assets, error) in enumerate(self._scan(list(stats), workers), 1):
+                if error:
+                    result.failures.append((path, error))
+                    logger.warning(f"Could not scan {path}: {error}")
+                else:
+                    stat = stats[path]
+                    entries[path] = {
+                        "version": SCAN_VERSION,
+                        "path": os.path.abspath(path),
+                        "size": stat.st_size,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "hash": digest,
+                        "assets": assets,
+                    }
+                    self._store(entries[path])
+                    result.scanned += 1
+                if progress:
+                    progress(done, len(pending))
+
+        for path in paths:
+            for asset in entries.get(path, {}).get("assets", ()):
+                # Cached entries may come from a scan through a different relative path
+                result.assets.append(ScannedAsset(**{**asset, "file": path}))
+        result.elapsed = time.perf_counter() - start
+        logger.info(result.summary())
+        return result
+
+    @staticmethod
+    def _scan(paths: list[str], workers: int = None):
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+        if workers == 1:
+            for path in paths:
+                yield scan_file(path)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(SaveCrypto.get_backend(),)
+        ) as pool:
+            futures = [pool.submit(scan_file, path) for path in paths]
+            for future in as_completed(futures):
+                yield future.result()
@@ -0,0 +1,233 @@
+import json
+import os
+import shutil
+import tempfile
+
+from asset_index import AssetIndex
+from crypto import SaveCrypto
+from refdata import load_refdata_json
+from utils import serialize_json
+from logger import get_logger
+from profiler import stage
+
+logger = get_logger(__name__)
+
+
+def _decrypts(data: bytes, key: str) -> str | None:
+    """Return the JSON text data decrypts to with key, or None."""
+    try:
+        text = SaveCrypto._decrypt_data(SaveCrypto._read_prefixed(data), key)
+        json.loads(text)
+    except Exception:
+        return None
+    return text
+
+
+def repack(source, scripts: dict) -> bytes:
+    """Load an assets file with UnityPy, replace TextAsset scripts and serialize it again.
+
+    Args:
+        source: Path or contents of the assets file
+        scripts (dict): TextAsset name to new m_Script (bytes or str)
+    """
+    import UnityPy
+
+    with stage("unity_load"):
+        env = UnityPy.load(source)
+    logger.debug("Loaded assets file")
+
+    pending = dict(scripts)
+    with stage("unity_scan"):
+        for obj in env.objects:
+            if obj.type.name != "TextAsset":
+                continue
+            data = obj.read()
+            script = pending.pop(data.m_Name, None)
+            if script is None:
+                continue
+            if isinstance(data.m_Script, str) and isinstance(script, bytes):
+                script = script.decode('utf-8', 'surrogateescape')
+            data.m_Script = script
+            data.save()
+            logger.debug(f"Updated {data.m_Name} content")
+            if not pending:
+                break
+
+    if pending:
+        raise ValueError(f"Could not find {', '.join(sorted(pending))} in assets file")
+
+    with stage("unity_save"):
+        return env.file.save(packer="original")
+
+
+class AssetTransaction:
+    """Stage any number of TextAsset replacements and write them in one repack.
+
+    The assets file is loaded and scanned once on commit, every staged
+    replacement is applied, and the result is written to a temporary file
+    next to the original that is then atomically renamed over it. If
+    anything fails the original file is left untouched.
+
+    With in_place=True the staged assets are patched straight into the
+    file instead (see asset_patch), which skips loading and rewriting every
+    object but is not atomic. Files that cannot be patched are repacked.
+    append moves grown assets to the end of the file instead of shifting
+    the data behind them; verify compares the patched file with a UnityPy
+    repack and falls back to the repack when they differ.
+
+    Usage:
+        with AssetTransaction("resources.assets") as tx:
+            tx.stage_refdata("WSREFDATA", data)
+            tx.stage_refdata("WSREFDATA_GERMANY", german_data)
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        backup: bool = True,
+        in_place: bool = False,
+        append: bool = False,
+        verify: bool = False
+    ):
+        self.file_path = file_path
+        self.backup = backup
+        self.in_place = in_place
+        self.append = append
+        self.verify = verify
+        self.staged = {}
+        self.committed = False
+
+    def __enter__(self) -> 'AssetTransaction':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def stage(self, name: str, script: bytes | str) -> None:
+        """Stage raw m_Script content for the TextAsset called name."""
+        if self.committed:
+            raise RuntimeError("Transaction already committed")
+        self.staged[name] = script
+        logger.debug(f"Staged {name} ({len(script)} bytes)")
+
+    def stage_refdata(self, name: str, data: dict) -> None:
+        """Serialize and encrypt reference data, then stage it under name."""
+        encrypted = SaveCrypto.encrypt(serialize_json(data, in_game_data=True), SaveCrypto.REFDATA_KEY)
+        self.stage(name, encrypted)
+
+    def stage_file(self, name: str, path: str) -> None:
+        """Stage a file as the TextAsset called name.
+
+        .json files are staged as reference data. Other files must already be
+        encrypted: with the reference data key they are staged as is, with the
+        save key (WSREFDATA.bytes) they are decrypted and staged as reference data.
+
+        Raises:
+            ValueError: If the file decrypts with neither key
+        """
+        if path.lower().endswith('.json'):
+            self.stage_refdata(name, load_refdata_json(path))
+            return
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        if _decrypts(data, SaveCrypto.REFDATA_KEY):
+            self.stage(name, data)
+            return
+        text = _decrypts(data, SaveCrypto.SAVE_KEY)
+        if text is None:
+            raise ValueError(f"{path} is not encrypted with the reference data or the save key")
+        logger.debug(f"Re-encrypting {path} with the reference data key")
+        self.stage_refdata(name, json.loads(text))
+
+    def rollback(self) -> None:
+        """Discard everything staged; the assets file is never modified before commit."""
+        if self.staged:
+            logger.debug(f"Rolled back {len(self.staged)} staged changes to {self.file_path}")
+        self.staged.clear()
+
+    def _make_backup(self) -> None:
+        from backup_store import snapshot_before_write
+        snapshot_before_write(self.file_path, "asset update")
+
+    def _patch(self) -> bool:
+        """Patch the staged assets into the file; False when it has to be repacked."""
+        from asset_patch import PatchError, patch_text_assets, verify_patch
+
+        if self.backup:
+            self._make_backup()
+        original = None
+        if self.verify:
+            fd, original = tempfile.mkstemp(
+                prefix=os.path.basename(self.file_path) + ".",
+                suffix=".orig",
+                dir=os.path.dirname(os.path.abspath(self.file_path))
+            )
+            os.close(fd)
+            shutil.copy2(self.file_path, original)
+        try:
+            modes = patch_text_assets(self.file_path, self.staged, append=self.append)
+            if original:
+                with stage("verify"):
+                    result = verify_patch(original, self.file_path, self.staged)
+                logger.info(f"Patched {self.file_path} is {result} to the UnityPy repack")
+        except PatchError as e:
+            if original and os.path.exists(original):
+                os.replace(original, self.file_path)
+                AssetIndex().invalidate(self.file_path)
+            logger.warning(f"Cannot patch {self.file_path} in place, repacking instead: {str(e)}")
+            return False
+        finally:
+            if original and os.path.exists(original):
+                os.remove(original)
+        for name, mode in modes.items():
+            logger.debug(f"{name} written {mode}")
+        return True
+
+    def _repack(self) -> None:
+        packed = repack(self.file_path, self.staged)
+
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(self.file_path) + ".",
+            suffix=".tmp",
+            dir=directory
+        )
+        try:
+            with stage("write"), os.fdopen(fd, 'wb') as f:
+                f.write(packed)
+                f.flush()
+                os.fsync(f.fileno())
+            shutil.copymode(self.file_path, tmp_path)
+            if self.backup:
+                self._make_backup()
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        AssetIndex().invalidate(self.file_path)
+
+    def commit(self) -> None:
+        """Apply all staged replacements in a single load/save cycle, or patch them in place."""
+        if self.committed:
+            raise RuntimeError("Transaction already committed")
+        if not self.staged:
+            self.committed = True
+            return
+
+        try:
+            if not (self.in_place and self._patch()):
+                self._repack()
+        except Exception as e:
+            logger.error(f"Error committing changes to {self.file_path}: {str(e)}")
+            self.rollback()
+            raise
+
+        logger.debug(f"Committed {len(self.staged)} changes to {self.file_path}")
+        self.staged.clear()
+        self.committed = True
@@ -0,0 +1,233 @@
+"""Asyncio API for embedding the save and reference data crypto in a service.
+
+Every call runs on an executor, so the event loop never blocks on base64,
+AES or JSON work, and reuses pooled cipher contexts (SaveCrypto.cipher_pool)
+instead of building a cipher per call. Admission is bounded: at most
+max_concurrency jobs run at once, at most max_pending more wait for a slot,
+and anything beyond that fails fast with Overloaded so the service can
+answer 503 instead of letting every request's latency grow.
+
+Usage:
+    from async_api import AsyncCrypto
+
+    async with AsyncCrypto(max_concurrency=8, max_pending=64) as crypto:
+        save = await crypto.decrypt_save(uploaded_bytes)
+        save["gold"] = 99999
+        encrypted = await crypto.encrypt_save(save)
+
+The module-level decrypt_save, encrypt_save, extract_refdata and
+encrypt_refdata use a shared instance set up with configure().
+"""
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from crypto import SaveCrypto
+from logger import get_logger
+from utils import serialize_json
+
+logger = get_logger(__name__)
+
+
+class Overloaded(RuntimeError):
+    """Raised when a job arrives while max_pending jobs are already waiting."""
+
+
+def _default_concurrency() -> int:
+    return int(os.environ.get("HPT_ASYNC_WORKERS") or os.cpu_count() or 4)
+
+
+def _read_source(source) -> bytes:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    return bytes(source)
+
+
+# Jobs run on the executor; module-level so process pools can pickle them
+
+
+def _decrypt_save(source, key: str = None, parse: bool = True):
+    data = _read_source(source)
+    if parse:
+        return SaveCrypto.decrypt_json(data, key)
+    return SaveCrypto.decrypt(data, key)
+
+
+def _encrypt_save(data, key: str = None) -> bytes:
+    if not isinstance(data, str):
+        data = serialize_json(data)
+    return SaveCrypto.encrypt(data, key)
+
+
+def _extract_refdata(source, name: str = "WSREFDATA", use_index: bool = True) -> dict:
+    from refdata import read_refdata_scripts
+
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        scripts = read_refdata_scripts(path, [name], use_index=use_index)
+    else:
+        scripts = read_refdata_scripts(bytes(source), [name], use_index=False)
+    if name not in scripts:
+        raise ValueError(f"Could not find {name} in assets file")
+    return SaveCrypto.decrypt_json(scripts[name], filepath="resources.assets")
+
+
+def _encrypt_refdata(data) -> bytes:
+    if not isinstance(data, str):
+        data = serialize_json(data, in_game_data=True)
+    # Same framing as AssetTransaction.stage_refdata, ready to be staged
+    return SaveCrypto.encrypt(data, SaveCrypto.REFDATA_KEY)
+
+
+def _init_process(backend: str, cache) -> None:
+    from batch import _init_worker
+
+    _init_worker(backend, cache)
+    SaveCrypto.cipher_pool(SaveCrypto.REFDATA_KEY).warm()
+
+
+class AsyncCrypto:
+    """Runs crypto jobs on an executor with bounded concurrency.
+
+    Args:
+        executor (Executor): Executor to run jobs on; it is not shut down by
+            close(). By default a thread pool with max_concurrency workers,
+            or a process pool with processes=True
+        max_concurrency (int): Jobs running at once ($HPT_ASYNC_WORKERS or
+            the CPU count)
+        max_pending (int): Jobs allowed to wait for a slot before Overloaded
+            is raised; None waits without limit
+        processes (bool): Use worker processes. JSON parsing holds the GIL,
+            so processes scale further on many cores, at the cost of
+            pickling every document across
+    """
+
+    def __init__(
+        self,
+        executor: Executor = None,
+        max_concurrency: int = None,
+        max_pending: int = None,
+        processes: bool = False
+    ):
+        self.max_concurrency = max_concurrency or _default_concurrency()
+        self.max_pending = max_pending
+        self._owns_executor = executor is None
+        if executor is None:
+            backend = SaveCrypto.get_backend()
+            if processes:
+                executor = ProcessPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    initializer=_init_process,
+                    initargs=(backend, SaveCrypto.get_cache() or False)
+                )
+            else:
+                executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix="hpt-crypto"
+                )
+                SaveCrypto.cipher_pool(SaveCrypto.SAVE_KEY, backend).warm(self.max_concurrency)
+        self.executor = executor
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.running = 0
+        self.waiting = 0
+
+    async def __aenter__(self) -> 'AsyncCrypto':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
+
+    def close(self, wait: bool = True) -> None:
+        if self._owns_executor:
+            self.executor.shutdown(wait=wait)
+
+    async def run(self, func, *args):
+        """Run func(*args) on the executor once a slot is free.
+
+        Raises:
+            Overloaded: max_pending jobs are already waiting
+        """
+        if self._slots.locked():
+            if self.max_pending is not None and self.waiting >= self.max_pending:
+                raise Overloaded(
+                    f"{self.running} jobs running and {self.waiting} waiting, try again later"
+                )
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    async def decrypt_save(self, source, key: str = None, parse: bool = True):
+        """Decrypt a save given as bytes or a path.
+
+        Returns:
+            The parsed JSON, or the JSON text when parse is False
+        """
+        return await self.run(_decrypt_save, source, key, parse)
+
+    async def encrypt_save(self, data, key: str = None) -> bytes:
+        """Encrypt a save document (or its JSON text) to the save file format."""
+        return await self.run(_encrypt_save, data, key)
+
+    async def extract_refdata(self, source, name: str = "WSREFDATA", use_index: bool = True) -> dict:
+        """Decrypt the reference data TextAsset called name from an assets file path or bytes."""
+        return await self.run(_extract_refdata, source, name, use_index)
+
+    async def encrypt_refdata(self, data) -> bytes:
+        """Encrypt reference data to the m_Script bytes of a WSREFDATA TextAsset."""
+        return await self.run(_encrypt_refdata, data)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "running": self.running,
+            "waiting": self.waiting,
+        }
+
+
+_default = None
+
+
+def configure(**kwargs) -> AsyncCrypto:
+    """Replace the shared AsyncCrypto used by the module-level functions.
+
+    Takes the same arguments as AsyncCrypto.
+    """
+    global _default
+    if _default is not None:
+        _default.close(wait=False)
+    _default = AsyncCrypto(**kwargs)
+    return _default
+
+
+def get_default() -> AsyncCrypto:
+    global _default
+    if _default is None:
+        _default = AsyncCrypto()
+    return _default
+
+
+async def decrypt_save(source, key: str = None, parse: bool = True):
+    return await get_default().decrypt_save(source, key, parse)
+
+
+async def encrypt_save(data, key: str = None) -> bytes:
+    return await get_default().encrypt_save(data, key)
+
+
+async def extract_refdata(source, name: str = "WSREFDATA", use_index: bool = True) -> dict:
+    return await get_default().extract_refdata(source, name, use_index)
+
+
+async def encrypt_refdata(data) -> bytes:
+    return await get_default().encrypt_refdata(data)
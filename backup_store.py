@@ -0,0 +1,365 @@
+import glob
+import hashlib
+import json
+import lzma
+import mmap
+import os
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from logger import get_logger
+from profiler import stage
+
+logger = get_logger(__name__)
+
+STORE_DIR = Path(__file__).parent / "Cache" / "backups"
+CODECS = ("zlib", "lzma", "none")
+
+# Content-defined chunking: a chunk ends right after the first anchor found
+# at least MIN_CHUNK bytes into it, or at MAX_CHUNK. The anchors depend only
+# on the bytes around them, so inserting or removing data in one place (an
+# asset shifted by a patch) only changes the chunks around that place. Each
+# anchor is searched with bytes.find, which is far faster than a regex
+# alternation; there is one for binary data, plain text and base64.
+ANCHORS = (b"\x8e\x7c", b"\n\n", b"Qz")
+MIN_CHUNK = 16 << 10
+MAX_CHUNK = 256 << 10
+
+# Chunks this young are never garbage collected, another process may be
+# writing a snapshot that references them
+GC_GRACE_SECONDS = 3600
+DEFAULT_KEEP = 20
+
+_CODEC_TAGS = {"zlib": b"z", "lzma": b"x", "none": b"n"}
+
+
+def enabled() -> bool:
+    """Snapshots are taken before every write unless $HPT_BACKUPS=0."""
+    return os.environ.get("HPT_BACKUPS", "1") != "0"
+
+
+def split_chunks(data) -> list[tuple[int, int]]:
+    """Return the (start, end) ranges of the content-defined chunks of data."""
+    size = len(data)
+    ranges = []
+    start = 0
+    while start < size:
+        end = min(start + MAX_CHUNK, size)
+        for anchor in ANCHORS:
+            found = data.find(anchor, start + MIN_CHUNK, end)
+            if found >= 0:
+                end = found + len(anchor)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+@dataclass
+class Snapshot:
+    """One stored version of a file."""
+    id: str
+    path: str
+    size: int
+    hash: str
+    created: float
+    reason: str = ""
+    chunks: list[str] = field(default_factory=list)
+
+    def describe(self) -> str:
+        created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created))
+        reason = f"  ({self.reason})" if self.reason else ""
+        return f"{self.id}  {created}  {self.size:>12,} bytes  {self.path}{reason}"
+
+
+class BackupStore:
+    """Deduplicating, compressed store of file snapshots.
+
+    Files are split into content-defined chunks that are stored once under
+    their blake2b hash, compressed with zlib or lzma. A snapshot is a JSON
+    list of chunk hashes, so a new snapshot of a multi-hundred-MB assets
+    file only adds the chunks that changed since the last one.
+
+    Snapshots are kept in one directory per original path, with a pointer
+    to the newest one, so taking a snapshot before a write only reads that
+    path's latest snapshot however large the store grows.
+
+    Layout:
+        chunks/ab/abcdef...          codec tag byte + compressed chunk
+        paths/<sha1>/<id>.json       Snapshot, sha1 of the original path
+        paths/<sha1>/latest          ID of the newest snapshot of that path
+    """
+
+    def __init__(self, store_dir: str | Path = None, codec: str = "zlib"):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}', expected one of {', '.join(CODECS)}")
+        self.store_dir = Path(store_dir) if store_dir else STORE_DIR
+        self.codec = codec
+
+    def _chunk_path(self, chunk_hash: str) -> Path:
+        return self.store_dir / "chunks" / chunk_hash[:2] / chunk_hash
+
+    def _path_dir(self, path: str) -> Path:
+        return self.store_dir / "paths" / hashlib.sha1(path.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def _snapshot_path(self, snapshot: Snapshot) -> Path:
+        return self._path_dir(snapshot.path) / f"{snapshot.id}.json"
+
+    @staticmethod
+    def _load(entry: Path) -> Snapshot | None:
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                return Snapshot(**json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Skipping unreadable snapshot {entry}: {str(e)}")
+            return None
+
+    def _write_snapshot(self, snapshot: Snapshot) -> None:
+        self._write_atomic(self._snapshot_path(snapshot), json.dumps(asdict(snapshot)).encode('utf-8'))
+
+    def _migrate(self) -> None:
+        # Stores written before the per-path layout keep every snapshot in
+        # one flat snapshots/ directory
+        legacy_dir = self.store_dir / "snapshots"
+        if not legacy_dir.is_dir():
+            return
+        newest = {}
+        for entry in legacy_dir.glob("*.json"):
+            snapshot = self._load(entry)
+            if snapshot is None:
+                # Keep it for inspection, out of the way of the next migration
+                entry.rename(entry.with_name(f"{entry.name}.unreadable"))
+                continue
+            self._write_snapshot(snapshot)
+            entry.unlink()
+            previous = newest.get(snapshot.path)
+            if previous is None or (previous.created, previous.id) < (snapshot.created, snapshot.id):
+                newest[snapshot.path] = snapshot
+        for path, snapshot in newest.items():
+            pointer = self._path_dir(path) / "latest"
+            if not pointer.exists():
+                self._write_atomic(pointer, snapshot.id.encode('ascii'))
+        try:
+            legacy_dir.rmdir()
+        except OSError:
+            pass
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zlib":
+            packed = zlib.compress(data, 6)
+        elif self.codec == "lzma":
+            packed = lzma.compress(data, preset=6)
+        else:
+            packed = data
+        if len(packed) >= len(data):
+            return _CODEC_TAGS["none"] + data
+        return _CODEC_TAGS[self.codec] + packed
+
+    @staticmethod
+    def _decompress(stored: bytes) -> bytes:
+        tag, packed = stored[:1], stored[1:]
+        if tag == b"z":
+            return zlib.decompress(packed)
+        if tag == b"x":
+            return lzma.decompress(packed)
+        if tag == b"n":
+            return packed
+        raise ValueError(f"Unknown chunk codec tag {tag!r}")
+
+    def _store_chunks(self, data) -> tuple[list[str], str, int]:
+        """Store the chunks of data that are not in the store yet.
+
+        Returns:
+            tuple: (chunk hashes, whole-file hash, number of new chunks)
+        """
+        file_digest = hashlib.blake2b(digest_size=20)
+        chunks = []
+        added = 0
+        for start, end in split_chunks(data):
+            chunk = data[start:end]
+            file_digest.update(chunk)
+            chunk_hash = hashlib.blake2b(chunk, digest_size=20).hexdigest()
+            chunks.append(chunk_hash)
+            path = self._chunk_path(chunk_hash)
+            try:
+                # Refresh the mtime so a concurrent prune sees the chunk as in use
+                os.utime(path)
+            except FileNotFoundError:
+                self._write_atomic(path, self._compress(chunk))
+                added += 1
+        return chunks, file_digest.hexdigest(), added
+
+    def snapshot(self, path: str, reason: str = "") -> Snapshot | None:
+        """Store the current contents of path.
+
+        Returns:
+            Snapshot: The new snapshot, the latest one when path has not
+            changed since, or None when path does not exist
+        """
+        if not os.path.isfile(path):
+            return None
+        path = os.path.abspath(path)
+        with stage("backup"), open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    chunks, file_hash, added = self._store_chunks(view)
+            else:
+                chunks, file_hash, added = [], hashlib.blake2b(digest_size=20).hexdigest(), 0
+
+        latest = self.latest(path)
+        if latest is not None and latest.hash == file_hash:
+            logger.debug(f"{path} unchanged since snapshot {latest.id}")
+            return latest
+
+        created = time.time()
+        snapshot_id = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(created))}-{os.urandom(3).hex()}"
+        snapshot = Snapshot(snapshot_id, path, size, file_hash, created, reason, chunks)
+        self._write_snapshot(snapshot)
+        self._write_atomic(self._path_dir(path) / "latest", snapshot_id.encode('ascii'))
+        logger.info(f"Snapshot {snapshot_id} of {path}: {len(chunks)} chunks, {added} new")
+        return snapshot
+
+    def latest(self, path: str) -> Snapshot | None:
+        """The newest snapshot of path, read through its latest pointer."""
+        self._migrate()
+        path_dir = self._path_dir(os.path.abspath(path))
+        try:
+            snapshot_id = (path_dir / "latest").read_text(encoding='ascii').strip()
+        except OSError:
+            snapshot_id = None
+        if snapshot_id and (path_dir / f"{snapshot_id}.json").is_file():
+            return self._load(path_dir / f"{snapshot_id}.json")
+        # Pointer missing or pruned away, fall back to the path's own snapshots
+        history = self.snapshots(path)
+        return history[-1] if history else None
+
+    def snapshots(self, path: str = None) -> list[Snapshot]:
+        """Every snapshot, or those of path, oldest first."""
+        self._migrate()
+        pattern = "*/*.json" if path is None else f"{self._path_dir(os.path.abspath(path)).name}/*.json"
+        snapshots = [
+            snapshot for snapshot in map(self._load, (self.store_dir / "paths").glob(pattern))
+            if snapshot is not None
+        ]
+        snapshots.sort(key=lambda s: (s.created, s.id))
+        return snapshots
+
+    def get(self, snapshot_id: str) -> Snapshot:
+        """Look up a snapshot by its ID or a unique prefix of it.
+
+        Only the snapshot files whose name matches are read.
+        """
+        self._migrate()
+        entries = (self.store_dir / "paths").glob(f"*/{glob.escape(snapshot_id)}*.json")
+        matches = [snapshot for snapshot in map(self._load, entries) if snapshot is not None]
+        if len(matches) != 1:
+            raise ValueError(
+                f"No snapshot '{snapshot_id}'" if not matches
+                else f"Snapshot ID '{snapshot_id}' is ambiguous ({len(matches)} matches)"
+            )
+        return matches[0]
+
+    def restore(self, snapshot_id: str, output_file: str = None) -> Snapshot:
+        """Write a snapshot back to its original path or to output_file.
+
+        The file being replaced is snapshotted first, so a restore can be
+        undone. The contents are checked against the snapshot's hash before
+        anything is replaced.
+        """
+        snapshot = self.get(snapshot_id)
+        output_file = output_file or snapshot.path
+        self.snapshot(output_file, reason=f"before restoring {snapshot.id}")
+
+        digest = hashlib.blake2b(digest_size=20)
+        tmp_path = f"{output_file}.{os.getpid()}.tmp"
+        try:
+            with stage("restore"), open(tmp_path, 'wb') as out:
+                for chunk_hash in snapshot.chunks:
+                    with open(self._chunk_path(chunk_hash), 'rb') as f:
+                        chunk = self._decompress(f.read())
+                    digest.update(chunk)
+                    out.write(chunk)
+            if digest.hexdigest() != snapshot.hash:
+                raise ValueError(f"Snapshot {snapshot.id} is corrupt: content hash mismatch")
+            os.replace(tmp_path, output_file)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        logger.info(f"Restored snapshot {snapshot.id} to {output_file}")
+        return snapshot
+
+    def prune(self, keep: int = DEFAULT_KEEP, older_than: float = None, dry_run: bool = False) -> dict:
+        """Drop old snapshots and the chunks no snapshot uses any more.
+
+        Args:
+            keep (int): Newest snapshots always kept per path
+            older_than (float): Only drop snapshots older than this many days;
+                without it, everything beyond keep is dropped
+
+        Returns:
+            dict: Counts of removed snapshots, chunks and bytes
+        """
+        by_path = {}
+        for snapshot in self.snapshots():
+            by_path.setdefault(snapshot.path, []).append(snapshot)
+        cutoff = time.time() - older_than * 86400 if older_than is not None else None
+        removed = []
+        for snapshots in by_path.values():
+            for snapshot in snapshots[:max(0, len(snapshots) - keep)]:
+                if cutoff is None or snapshot.created < cutoff:
+                    removed.append(snapshot)
+
+        removed_ids = {s.id for s in removed}
+        live = {h for s in self.snapshots() if s.id not in removed_ids for h in s.chunks}
+        grace = time.time() - GC_GRACE_SECONDS
+        chunks, freed = 0, 0
+        for path in (self.store_dir / "chunks").glob("*/*"):
+            if path.name in live or path.name.endswith(".tmp"):
+                continue
+            stat = path.stat()
+            if stat.st_mtime > grace:
+                continue
+            chunks += 1
+            freed += stat.st_size
+            if not dry_run:
+                path.unlink()
+        if not dry_run:
+            for snapshot in removed:
+                self._snapshot_path(snapshot).unlink()
+        return {"snapshots": len(removed), "chunks": chunks, "bytes": freed}
+
+    def stats(self) -> dict:
+        """Logical size of every snapshot against what the chunks take on disk."""
+        snapshots = self.snapshots()
+        stored, count = 0, 0
+        for path in (self.store_dir / "chunks").glob("*/*"):
+            if not path.name.endswith(".tmp"):
+                count += 1
+                stored += path.stat().st_size
+        return {
+            "snapshots": len(snapshots),
+            "files": len({s.path for s in snapshots}),
+            "logical_bytes": sum(s.size for s in snapshots),
+            "chunks": count,
+            "stored_bytes": stored,
+        }
+
+
+def snapshot_before_write(path: str, reason: str) -> Snapshot | None:
+    """Snapshot path into the default store before it is overwritten.
+
+    Does nothing when path does not exist yet or backups are disabled.
+    """
+    if not enabled() or not os.path.isfile(path):
+        return None
+    return BackupStore().snapshot(path, reason)
@@ -0,0 +1,231 @@
+import glob
+import json
+import os
+import time
+from dataclasses import dataclass, field
+
+from crypto import SaveCrypto
+from utils import serialize_json, dump_json
+from logger import count, get_logger
+from profiler import stage
+
+logger = get_logger(__name__)
+
+DECRYPT_PATTERN = "WS_*.txt"
+ENCRYPT_PATTERN = "WS_*.json"
+
+
+def default_output_path(input_file: str, encrypt: bool) -> str:
+    """Output path used by the save command when none is given.
+
+    - When decrypting: [original_name].json in the same directory
+    - When encrypting: [original_name without .json].txt in the same directory
+    """
+    input_dir = os.path.dirname(input_file)
+    input_name = os.path.basename(input_file)
+    if encrypt:
+        # Remove .json if present and add .txt
+        output_name = os.path.splitext(input_name)[0]
+        if not output_name.endswith('.txt'):
+            output_name += '.txt'
+    else:
+        # Remove .txt if present and add .json
+        output_name = os.path.splitext(input_name)[0] + '.json'
+    return os.path.join(input_dir, output_name)
+
+
+def process_save_file(input_file: str, output_file: str, encrypt: bool, stream: bool = False) -> int:
+    """Encrypt or decrypt a single save file.
+
+    Args:
+        stream (bool): Process the file in fixed-size chunks with constant
+            memory, keeping the JSON text as-is instead of re-serializing it
+
+    Returns:
+        int: Number of bytes read from input_file
+    """
+    if encrypt:
+        from backup_store import snapshot_before_write
+        snapshot_before_write(output_file, "save --encrypt")
+    if stream:
+        import stream_crypto
+        if encrypt:
+            return stream_crypto.encrypt_save_file(input_file, output_file)
+        return stream_crypto.decrypt_save_file(input_file, output_file)
+    if encrypt:
+        # Load JSON, serialize and encrypt
+        with stage("read"), open(input_file, 'r') as f:
+            content = f.read()
+        with stage("json_loads"):
+            json_data = json.loads(content)
+        # Use serialize_json to format data exactly like the game
+        json_str = serialize_json(json_data)
+        encrypted = SaveCrypto.encrypt(json_str)
+        with stage("write"), open(output_file, 'wb') as f:
+            f.write(encrypted)
+        size = os.path.getsize(input_file)
+    else:
+        with stage("read"), open(input_file, 'rb') as f:
+            data = f.read()
+            logger.debug("Read %d bytes from input file", len(data))
+        size = len(data)
+        # Decrypt and save as JSON
+        decrypted_data = SaveCrypto.decrypt_json(data)
+        # Use serialize_json to format data exactly like the game
+        with stage("write"), open(output_file, 'w') as f:
+            dump_json(decrypted_data, f)
+    return size
+
+
+def collect_inputs(sources: list[str], encrypt: bool) -> list[tuple[str, str]]:
+    """Expand directories and glob patterns into (input_file, base_dir) pairs.
+
+    base_dir is the directory the file was found under, used to rebuild the
+    relative layout when writing into a mirror tree.
+    """
+    pattern = ENCRYPT_PATTERN if encrypt else DECRYPT_PATTERN
+    seen = set()
+    inputs = []
+    for source in sources:
+        if os.path.isdir(source):
+            base_dir = source
+            matches = glob.glob(os.path.join(glob.escape(source), "**", pattern), recursive=True)
+        elif os.path.isfile(source):
+            base_dir = os.path.dirname(source)
+            matches = [source]
+        else:
+            # Everything up to the first wildcard is the mirror root
+            magic = min(
+                (i for i, c in enumerate(source) if c in "*?["),
+                default=len(source)
+            )
+            base_dir = os.path.dirname(source[:magic])
+            matches = glob.glob(source, recursive=True)
+        for path in sorted(matches):
+            if not os.path.isfile(path):
+                continue
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                inputs.append((path, base_dir))
+    return inputs
+
+
+def _output_for(input_file: str, base_dir: str, encrypt: bool, output_dir: str = None) -> str:
+    output_file = default_output_path(input_file, encrypt)
+    if output_dir:
+        relative = os.path.relpath(output_file, base_dir or ".")
+        output_file = os.path.join(output_dir, relative)
+    return output_file
+
+
+def _init_worker(backend: str, cache) -> None:
+    """Warm the crypto state once per worker process instead of once per file."""
+    SaveCrypto.set_backend(backend)
+    SaveCrypto.CACHE = cache
+    SaveCrypto.cipher_pool(SaveCrypto.SAVE_KEY).warm()
+
+
+def _run_one(input_file: str, output_file: str, encrypt: bool, stream: bool = False) -> tuple[str, int, float, str]:
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        size = process_save_file(input_file, output_file, encrypt, stream)
+        return input_file, size, time.perf_counter() - start, None
+    except Exception as e:
+        return input_file, 0, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+
+@dataclass
+class BatchResult:
+    """Summary of a batch run."""
+    total: int = 0
+    succeeded: int = 0
+    bytes_read: int = 0
+    elapsed: float = 0.0
+    timings: list[float] = field(default_factory=list)
+    failures: list[tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def files_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes_read / (1024 * 1024) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        lines = [
+            f"Processed {self.total} files in {self.elapsed:.2f}s "
+            f"({self.succeeded} ok, {len(self.failures)} failed)",
+            f"Throughput: {self.files_per_second:.1f} files/s, {self.mb_per_second:.2f} MB/s",
+        ]
+        if self.timings:
+            ordered = sorted(self.timings)
+            lines.append(
+                f"Per file: min {ordered[0] * 1000:.1f}ms, "
+                f"median {ordered[len(ordered) // 2] * 1000:.1f}ms, "
+                f"max {ordered[-1] * 1000:.1f}ms"
+            )
+        for path, error in self.failures:
+            lines.append(f"FAILED {path}: {error}")
+        return "\n".join(lines)
+
+
+def run_batch(
+    sources: list[str],
+    encrypt: bool,
+    output_dir: str = None,
+    workers: int = None,
+    progress=None,
+    stream: bool = False
+) -> BatchResult:
+    """Encrypt or decrypt every save matched by sources using a process pool.
+
+    Args:
+        sources (list): Directories, files or glob patterns
+        encrypt (bool): Encrypt JSON saves instead of decrypting WS_*.txt saves
+        output_dir (str): Mirror tree root; outputs go next to inputs if omitted
+        workers (int): Pool size, defaults to the number of cores
+        progress (callable): Optional callback(done, total) after each file
+        stream (bool): Process every file in constant memory, see process_save_file
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    inputs = collect_inputs(sources, encrypt)
+    result = BatchResult(total=len(inputs))
+    if not inputs:
+        return result
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(inputs))
+    backend = SaveCrypto.get_backend()
+    logger.info(f"Batch {'encrypt' if encrypt else 'decrypt'} of {len(inputs)} files on {workers} workers")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(backend, SaveCrypto.get_cache() or False)
+    ) as pool:
+        futures = [
+            pool.submit(_run_one, path, _output_for(path, base_dir, encrypt, output_dir), encrypt, stream)
+            for path, base_dir in inputs
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            path, size, elapsed, error = future.result()
+            result.timings.append(elapsed)
+            if error:
+                logger.error(f"Error processing {path}: {error}")
+                result.failures.append((path, error))
+                count("batch_failures")
+            else:
+                result.succeeded += 1
+                result.bytes_read += size
+                count("batch_files")
+                count("batch_bytes", size)
+            if progress:
+                progress(done, result.total)
+    result.elapsed = time.perf_counter() - start
+    result.failures.sort()
+    return result
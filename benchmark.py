@@ -0,0 +1,623 @@
+"""Benchmarks for the Holy Potatoes Tools codecs and round-trip paths.
+
+Run with: python benchmark.py [--sizes 16K,1M,256M] [--update-baseline]
+"""
+import argparse
+import importlib.util
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from string_crypto import StringCrypto
+from mods import verify_conflict_detection
+from synthetic import synthetic_assets, synthetic_refdata, synthetic_save, synthetic_wsdir
+from utils import serialize_json, verify_dotnet_conformance
+
+SIZES = (1 << 10, 16 << 10, 256 << 10, 1 << 20, 4 << 20)
+SUITE_SIZES = "16K,1M,16M"
+SUITE_REPEAT = 5
+
+CLI = Path(__file__).parent / "cli.py"
+BASELINE_DIR = Path(__file__).parent / "baselines"
+IMPORT_BASELINE = BASELINE_DIR / "import_time.json"
+SUITE_BASELINE = BASELINE_DIR / "round_trip.json"
+# A metric may get this much worse than its baseline before it counts as a
+# regression; the slack absorbs noise on very small inputs
+TOLERANCE = 0.25
+# Startup is compared relative to a bare interpreter started in the same
+# run, so the baseline holds on any machine; the slack is about 10 ms
+IMPORT_SLACK_RATIO = 0.5
+# Imported on one OS only; left out of the baseline module lists
+PLATFORM_MODULES = (
+    "fcntl", "grp", "msvcrt", "nt", "ntpath", "org", "posix", "posixpath", "pwd", "termios", "winreg",
+)
+SUITE_SLACK_SECONDS = 0.005
+SUITE_SLACK_RSS = 16 << 20
+# Modules each command must never import
+FORBIDDEN_IMPORTS = {
+    "help": ("UnityPy", "clr", "concurrent.futures.process"),
+    "wsdir": ("UnityPy", "clr", "Crypto", "concurrent.futures.process"),
+    "save": ("UnityPy", "clr", "concurrent.futures.process"),
+}
+
+
+def _best_of(func, arg, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def verify_replacement_round_trip() -> list[str]:
+    """Check that lone surrogates round-trip to U+FFFD like .NET's Encoding.UTF8.
+
+    Returns:
+        list: Human readable descriptions of every mismatch (empty when conformant)
+    """
+    from crypto import SaveCrypto
+    from dotnet_io import read_dotnet_string, write_dotnet_string
+
+    # Lone surrogates come from JSON such as "\\ud83d" in a hand-edited save
+    cases = {
+        "\ud83d": "\ufffd",
+        "\udc00x\ud800\ud800": "\ufffdx\ufffd\ufffd",
+        "caf\u00e9 \U0001f954": "caf\u00e9 \U0001f954",
+    }
+    mismatches = []
+    for text, expected in cases.items():
+        for name, round_trip in (
+            ("SaveCrypto", lambda t: SaveCrypto.decrypt(SaveCrypto.encrypt(t))),
+            ("BinaryWriter", lambda t: read_dotnet_string(write_dotnet_string(t))),
+        ):
+            try:
+                actual = round_trip(text)
+            except Exception as e:
+                actual = f"{type(e).__name__}: {e}"
+            if actual != expected:
+                mismatches.append(f"{name} {text!r}: expected {expected!r}, got {actual!r}")
+    return mismatches
+
+
+def bench_string_crypto(sizes: tuple[int, ...] = SIZES, seed: int = 0) -> list[dict]:
+    """Time StringCrypto.encode/decode over growing inputs.
+
+    Linear scaling shows up as a flat ns/char column.
+    """
+    rng = random.Random(seed)
+    alphabet = StringCrypto.REFERENCES + "=;"
+    results = []
+    for size in sizes:
+        text = "".join(rng.choices(alphabet, k=size))
+        encoded = StringCrypto.encode(text)
+        assert StringCrypto.decode(encoded) == text
+        for name, func, arg in (
+            ("encode", StringCrypto.encode, text),
+            ("decode", StringCrypto.decode, encoded),
+            ("encode_bytes", StringCrypto.encode, text.encode('ascii')),
+        ):
+            elapsed = _best_of(func, arg)
+            results.append({
+                "benchmark": f"string_crypto.{name}",
+                "size": size,
+                "seconds": elapsed,
+                "ns_per_char": elapsed * 1e9 / size,
+            })
+    return results
+
+
+def bench_serialize_json(sizes: tuple[int, ...] = (16 << 10, 256 << 10, 4 << 20)) -> list[dict]:
+    """Time serialize_json on WSREFDATA-shaped documents (in_game_data formatting)."""
+    results = []
+    for target in sizes:
+        data = synthetic_refdata(target)
+        size = len(serialize_json(data, in_game_data=True))
+        elapsed = _best_of(lambda d: serialize_json(d, in_game_data=True), data, repeat=3)
+        results.append({
+            "benchmark": "serialize_json.in_game_data",
+            "size": size,
+            "seconds": elapsed,
+            "ns_per_char": elapsed * 1e9 / size,
+        })
+    return results
+
+
+def _parse_importtime(stderr: str) -> dict[str, int]:
+    """Map module name to self import time in microseconds from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            modules[fields[2].strip()] = int(fields[0])
+        except (IndexError, ValueError):
+            continue  # column header
+    return modules
+
+
+def _import_commands(directory: str) -> dict[str, list[str]]:
+    """Write small inputs into directory and return the CLI arguments to time."""
+    from crypto import SaveCrypto
+
+    save_path = os.path.join(directory, "WS_bench.txt")
+    with open(save_path, 'wb') as f:
+        f.write(SaveCrypto.encrypt(serialize_json({"gold": 100, "name": "bench"})))
+    wsdir_path = os.path.join(directory, "WSDir.txt")
+    StringCrypto.save_wsdir({"WS_bench": "1"}, wsdir_path)
+    return {
+        "help": ["--help"],
+        "wsdir": ["wsdir", wsdir_path, os.path.join(directory, "WSDir.json")],
+        "save": ["save", save_path, os.path.join(directory, "WS_bench.json")],
+    }
+
+
+def _time_interpreter(args: list[str], env: dict, repeat: int) -> tuple[float, float, dict[str, int]]:
+    """Best summed import time and wall time of repeat runs of python -X importtime args.
+
+    Returns:
+        tuple: (import seconds, wall seconds, modules of the last run)
+    """
+    best_import = best_wall = float('inf')
+    modules = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *args], capture_output=True, text=True, env=env)
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+        modules = _parse_importtime(proc.stderr)
+        best_import = min(best_import, sum(modules.values()) / 1e6)
+        best_wall = min(best_wall, wall)
+    return best_import, best_wall, modules
+
+
+def _portable_modules(modules, bare) -> list[str]:
+    """Modules a command imports beyond a bare interpreter, minus platform-specific ones."""
+    return sorted(
+        name for name in modules
+        if name not in bare and not name.startswith("encodings.") and name.split(".")[0] not in PLATFORM_MODULES
+        and not any(part.startswith("_") for part in name.split("."))
+    )
+
+
+def bench_import_time(repeat: int = 5) -> list[dict]:
+    """Time CLI startup per command with python -X importtime.
+
+    Every command runs in a fresh interpreter; the best of repeat runs is
+    kept for both the summed import time and the process wall time. Both
+    are also reported relative to python -c pass timed in the same run.
+    """
+    env = dict(os.environ, HPT_CRYPTO_BACKEND="native", HPT_DECRYPT_CACHE="0")
+    bare_import, bare_wall, bare = _time_interpreter(["-c", "pass"], env, repeat)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for command, args in _import_commands(directory).items():
+            best_import, best_wall, modules = _time_interpreter([str(CLI), *args], env, repeat)
+            results.append({
+                "command": command,
+                "import_seconds": best_import,
+                "wall_seconds": best_wall,
+                "import_ratio": best_import / bare_import,
+                "wall_ratio": best_wall / bare_wall,
+                "modules": len(modules),
+                "module_names": _portable_modules(modules, bare),
+                "forbidden": sorted(
+                    name for name in modules
+                    for banned in FORBIDDEN_IMPORTS.get(command, ())
+                    if name == banned or name.startswith(banned + ".")
+                ),
+            })
+    return results
+
+
+def _load_baseline(baseline_path: Path) -> dict | None:
+    try:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _update_baseline(baseline_path: Path, entries: dict) -> None:
+    """Merge entries into the baseline file, keeping entries that were not re-run."""
+    baseline = _load_baseline(baseline_path) or {}
+    baseline.update(entries)
+    baseline_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(baseline_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(baseline.items())), f, indent=2)
+        f.write("\n")
+
+
+def _regressions(name: str, current: dict, expected: dict, slack: dict) -> list[str]:
+    failures = []
+    for metric, allowed in slack.items():
+        if metric not in expected or current.get(metric) is None:
+            continue
+        limit = expected[metric] * (1 + TOLERANCE) + allowed
+        if current[metric] > limit:
+            failures.append(f"{name} {metric} regressed: {current[metric]:.6g} (baseline {expected[metric]:.6g})")
+    return failures
+
+
+def check_import_time(results: list[dict], baseline_path: Path = IMPORT_BASELINE) -> list[str]:
+    """Compare bench_import_time results with the stored baseline.
+
+    Returns:
+        list: Human readable descriptions of every regression (empty when none)
+    """
+    failures = [
+        f"{r['command']} imports {', '.join(r['forbidden'])}"
+        for r in results if r["forbidden"]
+    ]
+    baseline = _load_baseline(baseline_path)
+    if baseline is None:
+        return failures + [f"No import time baseline at {baseline_path}; run with --update-baseline"]
+
+    slack = {"import_ratio": IMPORT_SLACK_RATIO, "wall_ratio": IMPORT_SLACK_RATIO}
+    for r in results:
+        expected = baseline.get(r["command"])
+        if expected is None:
+            continue
+        failures += _regressions(f"startup.{r['command']}", r, expected, slack)
+        added = sorted(set(r["module_names"]) - set(expected.get("module_names", r["module_names"])))
+        if added:
+            failures.append(f"startup.{r['command']} imports {len(added)} new modules: {', '.join(added)}")
+    return failures
+
+
+def save_import_baseline(results: list[dict], baseline_path: Path = IMPORT_BASELINE) -> None:
+    _update_baseline(baseline_path, {
+        r["command"]: {"import_ratio": r["import_ratio"], "wall_ratio": r["wall_ratio"], "module_names": r["module_names"]}
+        for r in results
+    })
+
+
+def _parse_size(text: str) -> int:
+    """Parse sizes like 512, 16K, 1M or 1.5G."""
+    text = text.strip().upper().removesuffix("B")
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def _format_size(size: int) -> str:
+    for unit, scale in (("G", 1 << 30), ("M", 1 << 20), ("K", 1 << 10)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{unit}"
+    return str(size)
+
+
+def _write_suite_inputs(directory: str, size: int) -> dict[str, str]:
+    """Generate the synthetic inputs for one size.
+
+    Returns:
+        dict: Input kind to path
+    """
+    from crypto import SaveCrypto
+
+    paths = {
+        "save_json": os.path.join(directory, "WS_bench.json"),
+        "save_txt": os.path.join(directory, "WS_bench.txt"),
+        "wsdir_json": os.path.join(directory, "WSDir.json"),
+        "wsdir_txt": os.path.join(directory, "WSDir.txt"),
+        "refdata_json": os.path.join(directory, "WSREFDATA.json"),
+        "assets": os.path.join(directory, "resources.assets"),
+    }
+
+    save = serialize_json(synthetic_save(size))
+    with open(paths["save_json"], 'w', encoding='utf-8') as f:
+        f.write(save)
+    with open(paths["save_txt"], 'wb') as f:
+        f.write(SaveCrypto.encrypt(save))
+    del save
+
+    entries = synthetic_wsdir(size)
+    with open(paths["wsdir_json"], 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+    StringCrypto.save_wsdir(entries, paths["wsdir_txt"])
+
+    refdata = synthetic_refdata(size)
+    with open(paths["refdata_json"], 'w', encoding='utf-8') as f:
+        f.write(serialize_json(refdata, in_game_data=True))
+    with open(paths["assets"], 'wb') as f:
+        f.write(synthetic_assets(refdata))
+    return paths
+
+
+def _case_save_decrypt(paths: dict, out: str):
+    from batch import process_save_file
+    return lambda: process_save_file(paths["save_txt"], os.path.join(out, "WS_bench.json"), False)
+
+
+def _case_save_encrypt(paths: dict, out: str):
+    from batch import process_save_file
+    return lambda: process_save_file(paths["save_json"], os.path.join(out, "WS_bench.txt"), True)
+
+
+def _case_save_decrypt_stream(paths: dict, out: str):
+    from stream_crypto import decrypt_save_file
+    return lambda: decrypt_save_file(paths["save_txt"], os.path.join(out, "WS_bench.json"))
+
+
+def _case_save_encrypt_stream(paths: dict, out: str):
+    from stream_crypto import encrypt_save_file
+    return lambda: encrypt_save_file(paths["save_json"], os.path.join(out, "WS_bench.txt"))
+
+
+def _case_wsdir_decrypt(paths: dict, out: str):
+    return lambda: StringCrypto.load_wsdir(paths["wsdir_txt"])
+
+
+def _case_wsdir_encrypt(paths: dict, out: str):
+    with open(paths["wsdir_json"], 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    return lambda: StringCrypto.save_wsdir(entries, os.path.join(out, "WSDir.txt"))
+
+
+def _case_refdata_encrypt(paths: dict, out: str):
+    from crypto import SaveCrypto
+    with open(paths["refdata_json"], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return lambda: SaveCrypto.encrypt(serialize_json(data, in_game_data=True), SaveCrypto.REFDATA_KEY)
+
+
+def _case_asset_extract(paths: dict, out: str):
+    from crypto import SaveCrypto
+    return lambda: SaveCrypto.extract_refdata(paths["assets"], paths["assets"], use_index=False)
+
+
+def _case_asset_extract_indexed(paths: dict, out: str):
+    from asset_index import AssetIndex
+    from crypto import SaveCrypto
+    index = AssetIndex(os.path.join(out, "index"))
+    index.get(paths["assets"])
+    return lambda: SaveCrypto.decrypt_json(
+        index.read_text_asset(paths["assets"], "WSREFDATA")[1],
+        filepath=paths["assets"]
+    )
+
+
+def _case_asset_extract_stream(paths: dict, out: str):
+    from asset_index import AssetIndex
+    from stream_crypto import extract_refdata_file
+    index = AssetIndex(os.path.join(out, "index"))
+    index.get(paths["assets"])
+    return lambda: extract_refdata_file(paths["assets"], os.path.join(out, "WSREFDATA.json"), index=index)
+
+
+def _case_asset_update(paths: dict, out: str):
+    from asset_transaction import AssetTransaction
+    with open(paths["refdata_json"], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    target = os.path.join(out, "resources.assets")
+    shutil.copyfile(paths["assets"], target)
+
+    def update():
+        with AssetTransaction(target, backup=False) as tx:
+            tx.stage_refdata("WSREFDATA", data)
+    return update
+
+
+def _case_asset_patch(paths: dict, out: str):
+    from asset_index import AssetIndex
+    from asset_patch import patch_text_assets
+    from crypto import SaveCrypto
+    with open(paths["refdata_json"], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    script = SaveCrypto.encrypt(serialize_json(data, in_game_data=True), SaveCrypto.REFDATA_KEY)
+    target = os.path.join(out, "resources.assets")
+    shutil.copyfile(paths["assets"], target)
+    index = AssetIndex(os.path.join(out, "index"))
+    index.get(target)
+    return lambda: patch_text_assets(target, {"WSREFDATA": script}, index=index)
+
+
+# Round-trip paths: name -> (input kind whose size is reported, setup function)
+SUITE_CASES = {
+    "save.decrypt": ("save_txt", _case_save_decrypt),
+    "save.encrypt": ("save_json", _case_save_encrypt),
+    "save.decrypt_stream": ("save_txt", _case_save_decrypt_stream),
+    "save.encrypt_stream": ("save_json", _case_save_encrypt_stream),
+    "wsdir.decrypt": ("wsdir_txt", _case_wsdir_decrypt),
+    "wsdir.encrypt": ("wsdir_json", _case_wsdir_encrypt),
+    "refdata.encrypt": ("refdata_json", _case_refdata_encrypt),
+    "asset.extract": ("assets", _case_asset_extract),
+    "asset.extract_indexed": ("assets", _case_asset_extract_indexed),
+    "asset.extract_stream": ("assets", _case_asset_extract_stream),
+    "asset.update": ("assets", _case_asset_update),
+    "asset.patch": ("assets", _case_asset_patch),
+}
+UNITYPY_CASES = (
+    "asset.extract", "asset.extract_indexed", "asset.extract_stream", "asset.update", "asset.patch"
+)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _run_case(case: str, paths_file: str, repeat: int) -> dict:
+    """Run one suite case in this process and return its raw timings."""
+    from profiler import peak_rss_bytes
+
+    # The cases overwrite their outputs repeatedly; keep them out of the backup store
+    os.environ["HPT_BACKUPS"] = "0"
+
+    with open(paths_file, 'r', encoding='utf-8') as f:
+        paths = json.load(f)
+    kind, setup = SUITE_CASES[case]
+    with tempfile.TemporaryDirectory() as out:
+        func = setup(paths, out)
+        func()  # warm up: backend selection, imports, first-touch allocations
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            latencies.append(time.perf_counter() - start)
+    return {
+        "latencies": latencies,
+        "input_bytes": os.path.getsize(paths[kind]),
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def bench_round_trips(sizes: list[int], repeat: int = SUITE_REPEAT, cases: list[str] = None) -> list[dict]:
+    """Time every round-trip path on synthetic inputs of each size.
+
+    Each case runs in a fresh interpreter so that its peak RSS is its own.
+    Paths that need UnityPy are skipped when it is not installed.
+    """
+    cases = list(cases or SUITE_CASES)
+    unknown = [case for case in cases if case not in SUITE_CASES]
+    if unknown:
+        raise ValueError(f"Unknown round-trip cases: {', '.join(unknown)}")
+    if importlib.util.find_spec("UnityPy") is None:
+        skipped = [case for case in cases if case in UNITYPY_CASES]
+        if skipped:
+            print(f"UnityPy is not installed, skipping {', '.join(skipped)}")
+        cases = [case for case in cases if case not in UNITYPY_CASES]
+
+    env = dict(os.environ, HPT_DECRYPT_CACHE="0")
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            paths_file = os.path.join(directory, "inputs.json")
+            with open(paths_file, 'w', encoding='utf-8') as f:
+                json.dump(_write_suite_inputs(directory, size), f)
+            for case in cases:
+                proc = subprocess.run(
+                    [sys.executable, __file__, "--run-case", case, paths_file, str(repeat)],
+                    capture_output=True, text=True, env=env
+                )
+                if proc.returncode != 0:
+                    raise RuntimeError(f"{case} at {_format_size(size)} failed:\n{proc.stderr[-2000:]}")
+                raw = json.loads(proc.stdout.strip().splitlines()[-1])
+                p50 = _percentile(raw["latencies"], 50)
+                results.append({
+                    "case": case,
+                    "size": _format_size(size),
+                    "input_bytes": raw["input_bytes"],
+                    "p50_seconds": p50,
+                    "p95_seconds": _percentile(raw["latencies"], 95),
+                    "p99_seconds": _percentile(raw["latencies"], 99),
+                    "max_seconds": max(raw["latencies"]),
+                    "mb_per_second": raw["input_bytes"] / p50 / 1e6 if p50 else None,
+                    "peak_rss_bytes": raw["peak_rss_bytes"],
+                })
+    return results
+
+
+def _suite_key(result: dict) -> str:
+    return f"{result['case']}@{result['size']}"
+
+
+def check_round_trips(results: list[dict], baseline_path: Path = SUITE_BASELINE) -> list[str]:
+    """Compare bench_round_trips results with the stored baseline.
+
+    Returns:
+        list: Human readable descriptions of every regression (empty when none)
+    """
+    baseline = _load_baseline(baseline_path)
+    if baseline is None:
+        return [f"No round-trip baseline at {baseline_path}; run with --update-baseline"]
+
+    slack = {"p50_seconds": SUITE_SLACK_SECONDS, "peak_rss_bytes": SUITE_SLACK_RSS}
+    failures = []
+    for r in results:
+        expected = baseline.get(_suite_key(r))
+        if expected is not None:
+            failures += _regressions(_suite_key(r), r, expected, slack)
+    return failures
+
+
+def save_round_trip_baseline(results: list[dict], baseline_path: Path = SUITE_BASELINE) -> None:
+    _update_baseline(baseline_path, {
+        _suite_key(r): {"p50_seconds": r["p50_seconds"], "peak_rss_bytes": r["peak_rss_bytes"]}
+        for r in results
+    })
+
+
+def _print_import_results(results: list[dict]) -> None:
+    for r in results:
+        print(
+            f"startup.{r['command']:<20} {r['modules']:>10} mods "
+            f"{r['import_seconds'] * 1000:>10.3f} ms import {r['wall_seconds'] * 1000:>8.1f} ms wall "
+            f"{r['wall_ratio']:>5.2f}x bare interpreter"
+        )
+
+
+def _print_round_trip_results(results: list[dict]) -> None:
+    for r in results:
+        rss = r["peak_rss_bytes"]
+        print(
+            f"{_suite_key(r):<28} {r['input_bytes']:>10} bytes "
+            f"p50 {r['p50_seconds'] * 1000:>9.2f} ms p95 {r['p95_seconds'] * 1000:>9.2f} ms "
+            f"p99 {r['p99_seconds'] * 1000:>9.2f} ms {r['mb_per_second']:>8.2f} MB/s "
+            f"rss {rss / (1 << 20) if rss else 0:>7.1f} MB"
+        )
+
+
+def _print_results(results: list[dict]) -> None:
+    for r in results:
+        print(
+            f"{r['benchmark']:<28} {r['size']:>10} chars "
+            f"{r['seconds'] * 1000:>10.3f} ms {r['ns_per_char']:>8.2f} ns/char"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=SUITE_SIZES,
+                        help=f'Comma separated round-trip input sizes (default {SUITE_SIZES})')
+    parser.add_argument('--repeat', type=int, default=SUITE_REPEAT,
+                        help='Timed runs per round-trip case and size')
+    parser.add_argument('--cases', default=None,
+                        help=f'Comma separated round-trip cases (default all: {", ".join(SUITE_CASES)})')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help=f'Record the results as the new baselines in {BASELINE_DIR.name}/')
+    parser.add_argument('--run-case', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        case, paths_file, repeat = args.run_case
+        print(json.dumps(_run_case(case, paths_file, int(repeat))))
+        sys.exit(0)
+
+    failures = [
+        f"CONFORMANCE FAILURE: {m}"
+        for m in verify_dotnet_conformance() + verify_replacement_round_trip() + verify_conflict_detection()
+    ]
+    _print_results(bench_string_crypto())
+    _print_results(bench_serialize_json())
+
+    startup = bench_import_time()
+    _print_import_results(startup)
+
+    sizes = [_parse_size(size) for size in args.sizes.split(",")]
+    cases = args.cases.split(",") if args.cases else None
+    round_trips = bench_round_trips(sizes, repeat=args.repeat, cases=cases)
+    _print_round_trip_results(round_trips)
+
+    if args.update_baseline:
+        save_import_baseline(startup)
+        save_round_trip_baseline(round_trips)
+        print(f"Wrote {IMPORT_BASELINE} and {SUITE_BASELINE}")
+    else:
+        failures += [f"STARTUP REGRESSION: {m}" for m in check_import_time(startup)]
+        failures += [f"ROUND-TRIP REGRESSION: {m}" for m in check_round_trips(round_trips)]
+
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,495 @@
+import glob
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from asset_index import file_hash
+from batch import _init_worker
+from crypto import SaveCrypto
+from mods import parse_path
+from string_crypto import StringCrypto
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+CATALOG_PATH = Path(__file__).parent / "Cache" / "catalog.sqlite"
+SCHEMA_VERSION = 1
+WSDIR_NAME = "WSDir.txt"
+SAVE_NAME = re.compile(r"^WS_(.+)\.txt$", re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS saves (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    directory TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    fields_spec TEXT NOT NULL,
+    indexed_at REAL NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS fields (
+    save_id INTEGER NOT NULL REFERENCES saves(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    num REAL,
+    text TEXT,
+    PRIMARY KEY (save_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fields_num ON fields (name, num);
+CREATE INDEX IF NOT EXISTS fields_text ON fields (name, text);
+CREATE TABLE IF NOT EXISTS slots (
+    directory TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (directory, slot)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS wsdirs (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Condition syntax for query(): field, operator, value
+CONDITION = re.compile(r"^\s*([^<>=!~\s]+)\s*(>=|<=|!=|=|<|>|~)\s*(.*?)\s*$")
+SQL_OPERATORS = {">=": ">=", "<=": "<=", "!=": "!=", "=": "=", "<": "<", ">": ">"}
+
+
+class CatalogError(ValueError):
+    """Raised for bad field specs or query conditions."""
+
+
+def parse_field_spec(spec: str) -> tuple[str, str]:
+    """Parse NAME=PATH (or just PATH, named after its last segment)."""
+    name, sep, path = spec.partition("=")
+    if not sep:
+        path = name
+        name = parse_path(path)[-1]
+    if not name or not path:
+        raise CatalogError(f"Bad field spec '{spec}', expected NAME=PATH")
+    return name.strip(), path.strip()
+
+
+def _field_value(value) -> tuple[float | None, str | None]:
+    """Split a JSON value into the (num, text) columns.
+
+    Lists and objects are stored as their length. Numeric strings, which
+    reference data uses for every number, are stored as numbers too.
+    """
+    if isinstance(value, bool):
+        return float(value), "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return float(value), None
+    if isinstance(value, (list, dict)):
+        return float(len(value)), None
+    if value is None:
+        return None, None
+    text = str(value)
+    try:
+        return float(text), text
+    except ValueError:
+        return None, text
+
+
+def _resolve(data, segments: list[str]):
+    for segment in segments:
+        if isinstance(data, dict):
+            data = data.get(segment)
+        elif isinstance(data, list) and segment.lstrip("-").isdigit():
+            index = int(segment)
+            data = data[index] if -len(data) <= index < len(data) else None
+        else:
+            return None
+        if data is None:
+            return None
+    return data
+
+
+def extract_fields(data, fields: dict[str, str] | None) -> dict[str, tuple]:
+    """Pull the configured fields out of a decrypted save.
+
+    With no configured fields every top-level member is extracted.
+    """
+    if not fields:
+        if not isinstance(data, dict):
+            return {}
+        return {name: _field_value(value) for name, value in data.items()}
+    return {
+        name: _field_value(_resolve(data, parse_path(path)))
+        for name, path in fields.items()
+    }
+
+
+def _slot_name(path: str) -> str:
+    match = SAVE_NAME.match(os.path.basename(path))
+    return match.group(1) if match else os.path.splitext(os.path.basename(path))[0]
+
+
+def _index_one(path: str, fields: dict[str, str] | None) -> tuple[str, str, dict, str]:
+    """Hash, decrypt and extract one save.
+
+    Returns:
+        tuple: (path, hash, fields, error)
+    """
+    digest = file_hash(path)
+    try:
+        with open(path, 'rb') as f:
+            data = SaveCrypto.decrypt_json(f.read())
+        return path, digest, extract_fields(data, fields), None
+    except Exception as e:
+        return path, digest, {}, f"{type(e).__name__}: {e}"
+
+
+@dataclass
+class ScanResult:
+    """Summary of a catalog scan."""
+    seen: int = 0
+    indexed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    wsdirs: int = 0
+    elapsed: float = 0.0
+    failures: list[tuple[str, str]] = field(default_factory=list)
+
+    def summary(self) -> str:
+        lines = [
+            f"Scanned {self.seen} saves and {self.wsdirs} WSDir files in {self.elapsed:.2f}s: "
+            f"{self.indexed} indexed, {self.unchanged} unchanged, {self.removed} removed"
+        ]
+        for path, error in self.failures:
+            lines.append(f"FAILED {path}: {error}")
+        return "\n".join(lines)
+
+
+class Catalog:
+    """SQLite catalog of save files, WSDir slots and fields extracted from the saves.
+
+    Scans are incremental: a save is only decrypted again when its size,
+    mtime and content hash say it changed, or when the field set changed.
+    Extracted fields live in a name/value table with numeric and text
+    columns, so any of them can be compared without decrypting anything.
+
+    Usage:
+        with Catalog.open() as catalog:
+            catalog.scan(["C:/Saves"], fields={"gold": "gold"})
+            rich = catalog.query(["gold>100000"], order_by="gold", descending=True)
+    """
+
+    def __init__(self, connection: sqlite3.Connection, path: str):
+        self.db = connection
+        self.path = path
+
+    @classmethod
+    def open(cls, path: str | Path = None) -> 'Catalog':
+        path = str(path or CATALOG_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA foreign_keys=ON")
+        db.executescript(SCHEMA)
+        version = db.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if version is None:
+            db.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+            db.commit()
+        elif int(version[0]) != SCHEMA_VERSION:
+            db.close()
+            raise CatalogError(f"Catalog {path} has schema version {version[0]}, expected {SCHEMA_VERSION}; delete it to rebuild")
+        return cls(db, path)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> 'Catalog':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
+
+    @property
+    def fields(self) -> dict[str, str]:
+        """The configured NAME -> PATH field set (empty: every top-level member)."""
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'fields'").fetchone()
+        if not row or not row[0]:
+            return {}
+        return dict(parse_field_spec(spec) for spec in row[0].split("\n"))
+
+    def set_fields(self, fields: dict[str, str]) -> None:
+        spec = "\n".join(f"{name}={path}" for name, path in sorted(fields.items()))
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('fields', ?)", (spec,))
+        self.db.commit()
+
+    def _fields_spec(self) -> str:
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'fields'").fetchone()
+        return row[0] if row and row[0] else "*"
+
+    @staticmethod
+    def _collect(sources: list[str]) -> tuple[list[str], list[str]]:
+        """Expand sources into (save paths, WSDir paths)."""
+        from batch import collect_inputs
+
+        saves = []
+        wsdirs = set()
+        for path, _ in collect_inputs(sources, encrypt=False):
+            # Files and glob matches are taken as they are, WSDir.txt included
+            if os.path.basename(path).lower() == WSDIR_NAME.lower():
+                wsdirs.add(os.path.abspath(path))
+            else:
+                saves.append(os.path.abspath(path))
+        for source in sources:
+            if os.path.isdir(source):
+                pattern = os.path.join(glob.escape(source), "**", WSDIR_NAME)
+                wsdirs.update(os.path.abspath(path) for path in glob.glob(pattern, recursive=True))
+            elif os.path.basename(source).lower() == WSDIR_NAME.lower() and os.path.isfile(source):
+                wsdirs.add(os.path.abspath(source))
+        return saves, sorted(wsdirs)
+
+    def _scan_wsdir(self, path: str) -> bool:
+        stat = os.stat(path)
+        row = self.db.execute("SELECT size, mtime_ns FROM wsdirs WHERE path = ?", (path,)).fetchone()
+        if row and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+            return False
+        directory = os.path.dirname(path)
+        entries = StringCrypto.load_wsdir(path)
+        self.db.execute("DELETE FROM slots WHERE directory = ?", (directory,))
+        self.db.executemany(
+            "INSERT INTO slots VALUES (?, ?, ?)",
+            [(directory, key[:-4] if key.endswith("Load") else key, value) for key, value in entries.items()]
+        )
+        self.db.execute("INSERT OR REPLACE INTO wsdirs VALUES (?, ?, ?)", (path, stat.st_size, stat.st_mtime_ns))
+        return True
+
+    def _store(self, path: str, stat: os.stat_result, digest: str, spec: str, fields: dict, error: str) -> None:
+        self.db.execute(
+            "INSERT INTO saves (path, directory, slot, size, mtime_ns, hash, fields_spec, indexed_at, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, "
+            "hash = excluded.hash, fields_spec = excluded.fields_spec, "
+            "indexed_at = excluded.indexed_at, error = excluded.error",
+            (path, os.path.dirname(path), _slot_name(path), stat.st_size, stat.st_mtime_ns,
+             digest, spec, time.time(), error)
+        )
+        save_id = self.db.execute("SELECT id FROM saves WHERE path = ?", (path,)).fetchone()[0]
+        self.db.execute("DELETE FROM fields WHERE save_id = ?", (save_id,))
+        self.db.executemany(
+            "INSERT INTO fields VALUES (?, ?, ?, ?)",
+            [(save_id, name, num, text) for name, (num, text) in fields.items()]
+        )
+
+    def scan(self, sources: list[str], workers: int = None, prune: bool = True, progress=None) -> ScanResult:
+        """Bring the catalog up to date with the saves and WSDir files under sources.
+
+        Args:
+            sources (list): Directories, save files, WSDir.txt files or glob patterns
+            workers (int): Decrypt worker processes, defaults to the number of cores
+            prune (bool): Drop catalog entries for saves under the scanned
+                directories that no longer exist
+            progress (callable): Optional callback(done, total) after each decrypted save
+        """
+        start = time.perf_counter()
+        saves, wsdirs = self._collect(sources)
+        result = ScanResult(seen=len(saves))
+
+        for path in wsdirs:
+            if self._scan_wsdir(path):
+                result.wsdirs += 1
+
+        spec = self._fields_spec()
+        known = {
+            row["path"]: row
+            for row in self.db.execute("SELECT path, size, mtime_ns, hash, fields_spec FROM saves")
+        }
+        pending = []
+        for path in saves:
+            stat = os.stat(path)
+            row = known.get(path)
+            if row is None or row["fields_spec"] != spec or row["size"] != stat.st_size:
+                pending.append((path, stat))
+            elif row["mtime_ns"] == stat.st_mtime_ns:
+                result.unchanged += 1
+            elif row["hash"] == file_hash(path):
+                # Touched or copied without changing content
+                self.db.execute("UPDATE saves SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, path))
+                result.unchanged += 1
+            else:
+                pending.append((path, stat))
+
+        if pending:
+            logger.info(f"Indexing {len(pending)} of {len(saves)} saves")
+            fields = self.fields
+            stats = dict(pending)
+            for done, (path, digest, extracted, error) in enumerate(self._index(list(stats), fields, workers), 1):
+                self._store(path, stats[path], digest, spec, extracted, error)
+                if error:
+                    result.failures.append((path, error))
+                else:
+                    result.indexed += 1
+                if progress:
+                    progress(done, len(pending))
+
+        if prune:
+            result.removed = self._prune(sources, set(saves))
+        self.db.commit()
+        result.elapsed = time.perf_counter() - start
+        logger.info(result.summary())
+        return result
+
+    @staticmethod
+    def _index(paths: list[str], fields: dict, workers: int = None):
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+        if workers == 1:
+            for path in paths:
+                yield _index_one(path, fields)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(SaveCrypto.get_backend(), SaveCrypto.get_cache() or False)
+        ) as pool:
+            futures = [pool.submit(_index_one, path, fields) for path in paths]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _prune(self, sources: list[str], present: set[str]) -> int:
+        roots = [os.path.abspath(source) for source in sources if os.path.isdir(source)]
+        removed = 0
+        for root in roots:
+            prefix = os.path.join(root, "")
+            rows = self.db.execute(
+                "SELECT id, path FROM saves WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+            gone = [(row["id"],) for row in rows if row["path"] not in present and not os.path.exists(row["path"])]
+            self.db.executemany("DELETE FROM saves WHERE id = ?", gone)
+            removed += len(gone)
+        return removed
+
+    def field_names(self) -> list[str]:
+        return [row[0] for row in self.db.execute("SELECT DISTINCT name FROM fields ORDER BY name")]
+
+    @staticmethod
+    def parse_condition(condition: str) -> tuple[str, str, str]:
+        match = CONDITION.match(condition)
+        if not match:
+            raise CatalogError(f"Bad condition '{condition}', expected e.g. gold>1000, slot=save1 or name~pattern")
+        return match.groups()
+
+    def query(
+        self,
+        conditions: list[str] = (),
+        show: list[str] = (),
+        order_by: str = None,
+        descending: bool = False,
+        limit: int = None
+    ) -> list[dict]:
+        """Find saves whose extracted fields match every condition.
+
+        Conditions compare a field (or one of path, slot, size, hash,
+        timestamp) with a value: gold>1000, slot=save1, shopName~Potato.
+        Values that parse as numbers compare numerically; ~ is a
+        case-insensitive substring match.
+
+        Returns:
+            list: One dict per save with its path, slot, WSDir timestamp,
+            size and the fields named in show, conditions and order_by
+        """
+        columns = {"path": "s.path", "slot": "s.slot", "size": "s.size", "hash": "s.hash", "timestamp": "w.value"}
+        where = ["s.error IS NULL"]
+        params = []
+        wanted = list(show)
+
+        for condition in conditions:
+            name, op, value = self.parse_condition(condition)
+            if name not in wanted and name not in columns:
+                wanted.append(name)
+            number = _number(value)
+            if name in columns:
+                column = columns[name]
+            else:
+                column = "num" if number is not None and op != "~" else "text"
+                where.append(
+                    f"EXISTS (SELECT 1 FROM fields f WHERE f.save_id = s.id AND f.name = ? AND f.{column} "
+                    + ("LIKE ?" if op == "~" else f"{SQL_OPERATORS[op]} ?") + ")"
+                )
+                params.append(name)
+                params.append(f"%{value}%" if op == "~" else number if column == "num" else value)
+                continue
+            if op == "~":
+                where.append(f"{column} LIKE ?")
+                params.append(f"%{value}%")
+            else:
+                where.append(f"{column} {SQL_OPERATORS[op]} ?")
+                params.append(number if number is not None and name == "size" else value)
+
+        order = ""
+        if order_by:
+            if order_by in columns:
+                order = f" ORDER BY {columns[order_by]}"
+            else:
+                order = " ORDER BY (SELECT coalesce(f.num, f.text) FROM fields f WHERE f.save_id = s.id AND f.name = ?)"
+                params.append(order_by)
+                if order_by not in wanted:
+                    wanted.append(order_by)
+            order += " DESC" if descending else ""
+        sql = (
+            "SELECT s.id, s.path, s.slot, w.value AS timestamp, s.size FROM saves s "
+            "LEFT JOIN slots w ON w.directory = s.directory AND w.slot = s.slot "
+            f"WHERE {' AND '.join(where)}{order}"
+        )
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        results = []
+        for row in self.db.execute(sql, params):
+            entry = {key: row[key] for key in ("path", "slot", "timestamp", "size")}
+            if wanted:
+                values = {
+                    field_row["name"]: field_row["text"] if field_row["text"] is not None else _compact(field_row["num"])
+                    for field_row in self.db.execute(
+                        f"SELECT name, num, text FROM fields WHERE save_id = ? AND name IN ({','.join('?' * len(wanted))})",
+                        [row["id"], *wanted]
+                    )
+                }
+                entry.update((name, values.get(name)) for name in wanted if name not in columns)
+            results.append(entry)
+        return results
+
+    def stats(self) -> dict:
+        saves, failed, size = self.db.execute(
+            "SELECT count(*), count(error), coalesce(sum(size), 0) FROM saves"
+        ).fetchone()
+        return {
+            "path": self.path,
+            "saves": saves,
+            "failed": failed,
+            "bytes": size,
+            "wsdirs": self.db.execute("SELECT count(*) FROM wsdirs").fetchone()[0],
+            "fields": self.fields or "all top-level members",
+            "field_names": len(self.field_names()),
+        }
+
+
+def _number(value: str) -> float | None:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _compact(num: float | None):
+    if num is not None and num.is_integer():
+        return int(num)
+    return num
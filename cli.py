@@ -1,26 +1,91 @@
 import click
 import json
 import os
-from crypto import SaveCrypto
-from string_crypto import StringCrypto
-from utils import serialize_json
-from logger import setup_logging, get_logger
+from crypto import SaveCrypto, BACKENDS
+from utils import serialize_json, dump_json
+from profiler import PROFILER
+from logger import LEVELS, setup_logging, get_logger
 
-# Setup logging
-log_file = setup_logging()
+# Feature modules (UnityPy, multiprocessing, ...) are imported inside the
+# commands that need them so that startup stays cheap; see
+# bench_import_time in benchmark.py.
 logger = get_logger(__name__)
 
 @click.group()
-def cli():
+@click.option('--backend', type=click.Choice(BACKENDS), default=None,
+              help='Crypto backend (defaults to $HPT_CRYPTO_BACKEND or auto)')
+@click.option('--cache/--no-cache', 'use_cache', default=None,
+              help='Cache decrypted data in Cache/decrypt (defaults to $HPT_DECRYPT_CACHE)')
+@click.option('--profile', 'profile_path', type=click.Path(dir_okay=False, allow_dash=True), default=None,
+              help='Write per-stage timings and peak memory as JSON to this file ("-" for stdout)')
+@click.option('--cprofile', 'cprofile_path', type=click.Path(dir_okay=False), default=None,
+              help='Also write cProfile stats to this file (view with snakeviz or pstats)')
+@click.option('--daemon/--no-daemon', 'use_daemon', default=None,
+              help='Forward save, wsdir and asset commands to the running daemon (default: when one is running)')
+@click.option('--log-level', type=click.Choice(LEVELS, case_sensitive=False), default=None,
+              help='Log verbosity for the console and Logs/Editor.log (defaults to $HPT_LOG_LEVEL or INFO)')
+@click.pass_context
+def cli(ctx, backend, use_cache, profile_path, cprofile_path, use_daemon, log_level):
     """Holy Potatoes Tools - Command line utilities for Holy Potatoes! A Weapon Shop!"""
+    setup_logging(log_level)
     logger.info("Starting Holy Potatoes Tools CLI")
-    pass
+    # Options that change how this process works must not be forwarded
+    local_only = bool(backend or use_cache is not None or profile_path or cprofile_path)
+    if use_daemon and local_only:
+        raise click.UsageError("--daemon cannot be combined with --backend, --cache or profiling options")
+    ctx.obj = {"use_daemon": False if local_only else use_daemon}
+    if backend:
+        SaveCrypto.set_backend(backend)
+    if use_cache:
+        SaveCrypto.enable_cache()
+    elif use_cache is False:
+        SaveCrypto.disable_cache()
+    if profile_path or cprofile_path:
+        PROFILER.enable(cprofile_path=cprofile_path)
+        ctx.call_on_close(lambda: _finish_profile(profile_path, ctx.invoked_subcommand))
+
+
+def _finish_profile(profile_path: str | None, command: str | None) -> None:
+    PROFILER.disable()
+    if profile_path:
+        PROFILER.write(profile_path, command)
+
+
+def _daemon_client(ctx: click.Context):
+    """Client for the running daemon, or None when the command should run locally."""
+    use_daemon = (ctx.find_root().obj or {}).get("use_daemon")
+    if use_daemon is False or (use_daemon is None and os.environ.get("HPT_DAEMON") == "0"):
+        return None
+
+    from daemon import DaemonClient, env_settings
+
+    client = DaemonClient.connect()
+    if client is None:
+        if use_daemon:
+            raise click.UsageError("No daemon is running; start one with 'cli.py daemon start'")
+        return None
+    # HPT_* settings of this process must not be silently replaced by the daemon's
+    daemon_env = client.call("ping").get("env", {})
+    mismatched = [name for name, value in env_settings().items() if daemon_env.get(name, "") != value]
+    if mismatched:
+        client.close()
+        if use_daemon:
+            raise click.UsageError(
+                f"The daemon runs with different {', '.join(mismatched)}; restart it with this environment"
+            )
+        logger.info(f"Running locally, the daemon runs with different {', '.join(mismatched)}")
+        return None
+    logger.info("Forwarding to daemon")
+    ctx.call_on_close(client.close)
+    return client
 
 @cli.command()
 @click.argument('input_file', type=click.Path(exists=True))
 @click.argument('output_file', type=click.Path(), required=False)
 @click.option('--encrypt/--decrypt', default=False, help='Encrypt or decrypt the save file')
-def save(input_file, output_file, encrypt):
+@click.option('--stream', is_flag=True, help='Process in fixed-size chunks with constant memory, keeping the JSON text as stored')
+@click.pass_context
+def save(ctx, input_file, output_file, encrypt, stream):
     """Encrypt or decrypt save files.
     
     INPUT_FILE: Path to the input save file
@@ -28,48 +93,32 @@ def save(input_file, output_file, encrypt):
     - When decrypting: saves as [original_name].json in the same directory
     - When encrypting: saves as [original_name without .json].txt in the same directory
     """
+    from batch import default_output_path, process_save_file
+
     try:
         logger.info(f"Processing save file: {input_file}")
         logger.info(f"Operation: {'encrypt' if encrypt else 'decrypt'}")
         
         # Generate default output path if not provided
         if not output_file:
-            input_dir = os.path.dirname(input_file)
-            input_name = os.path.basename(input_file)
-            if encrypt:
-                # Remove .json if present and add .txt
-                output_name = os.path.splitext(input_name)[0]
-                if not output_name.endswith('.txt'):
-                    output_name += '.txt'
-            else:
-                # Remove .txt if present and add .json
-                output_name = os.path.splitext(input_name)[0] + '.json'
-            output_file = os.path.join(input_dir, output_name)
+            output_file = default_output_path(input_file, encrypt)
             logger.info(f"Using default output path: {output_file}")
-            
-        with open(input_file, 'rb') as f:
-            data = f.read()
-            logger.debug(f"Read {len(data)} bytes from input file")
-            
+
+        client = _daemon_client(ctx)
+        if client:
+            client.call(
+                "save.process",
+                input=os.path.abspath(input_file),
+                output=os.path.abspath(output_file),
+                encrypt=encrypt,
+                stream=stream
+            )
+        else:
+            process_save_file(input_file, output_file, encrypt, stream)
         if encrypt:
-            # Load JSON, serialize and encrypt
-            with open(input_file, 'r') as f:
-                json_data = json.load(f)
-            # Use serialize_json to format data exactly like the game
-            json_str = serialize_json(json_data)
-            encrypted = SaveCrypto.encrypt(json_str)
-            with open(output_file, 'wb') as f:
-                f.write(encrypted)
             logger.info("Successfully encrypted save file")
             click.echo(f"Encrypted save file written to {output_file}")
         else:
-            # Decrypt and save as JSON
-            decrypted = SaveCrypto.decrypt(data)
-            decrypted_data = json.loads(decrypted)
-            # Use serialize_json to format data exactly like the game
-            with open(output_file, 'w') as f:
-                json_str = serialize_json(decrypted_data)
-                f.write(json_str)
             logger.info("Successfully decrypted save file")
             click.echo(f"Decrypted save file written to {output_file}")
             
@@ -78,11 +127,173 @@ def save(input_file, output_file, encrypt):
         click.echo(f"Error: {str(e)}", err=True)
         raise click.Abort()
 
+@cli.command()
+@click.argument('sources', nargs=-1, required=True)
+@click.option('--encrypt/--decrypt', default=False, help='Encrypt or decrypt the save files')
+@click.option('--output-dir', '-o', type=click.Path(file_okay=False), default=None,
+              help='Write results into a mirror tree instead of next to the inputs')
+@click.option('--workers', '-j', type=int, default=None, help='Worker processes (defaults to the number of cores)')
+@click.option('--stream', is_flag=True, help='Process each file in fixed-size chunks with constant memory per worker')
+def batch(sources, encrypt, output_dir, workers, stream):
+    """Encrypt or decrypt many save files in parallel.
+
+    SOURCES: Directories (searched recursively for WS_*.txt, or WS_*.json
+    when encrypting), individual files or glob patterns
+    """
+    from batch import run_batch
+
+    try:
+        logger.info(f"Batch processing: {', '.join(sources)}")
+        logger.info(f"Operation: {'encrypt' if encrypt else 'decrypt'}")
+
+        result = run_batch(list(sources), encrypt, output_dir=output_dir, workers=workers, stream=stream)
+        if not result.total:
+            click.echo("No matching save files found", err=True)
+            raise click.Abort()
+
+        logger.info(result.summary())
+        click.echo(result.summary())
+        if result.failures:
+            raise SystemExit(1)
+
+    except click.Abort:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing batch: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@cli.command()
+@click.argument('sources', nargs=-1, required=True)
+@click.option('--set', '-e', 'assignments', multiple=True, metavar='EXPR=VALUE',
+              help='Set (EXPR=VALUE), add to (EXPR+=N) or multiply (EXPR*=N) every matched node; repeatable')
+@click.option('--remove', 'removals', multiple=True, metavar='EXPR', help='Remove every matched node; repeatable')
+@click.option('--script', 'script_file', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='JSON list of {"op", "path", "value"} edits, applied before --set and --remove')
+@click.option('--dry-run', is_flag=True, help='Report the matched nodes without writing anything')
+@click.option('--output-dir', '-o', type=click.Path(file_okay=False), default=None,
+              help='Write edited saves into a mirror tree instead of editing them in place')
+@click.option('--workers', '-j', type=int, default=None, help='Worker processes (defaults to the number of cores)')
+@click.option('--json', 'as_json', is_flag=True, help='Print machine-readable JSON')
+def edit(sources, assignments, removals, script_file, dry_run, output_dir, workers, as_json):
+    """Bulk-edit save files with path expressions.
+
+    SOURCES: Directories (searched recursively for WS_*.txt), individual
+    files or glob patterns
+
+    Expressions use the mod path format plus * (any member), ** (any
+    depth) and [field op value] filters, e.g.
+    --set 'heroes/*[level>=30]/xp=0' --set 'gold+=1000'
+    """
+    from edit import Edit, edit_files
+
+    try:
+        edits = Edit.load(script_file) if script_file else []
+        edits += [Edit.parse(text) for text in assignments]
+        edits += [Edit.create("remove", text) for text in removals]
+        if not edits:
+            raise ValueError("Nothing to do, pass --set, --remove or --script")
+
+        result = edit_files(list(sources), edits, output_dir=output_dir, workers=workers, dry_run=dry_run)
+        if not result.files:
+            click.echo("No matching save files found", err=True)
+            raise click.Abort()
+
+        if as_json:
+            click.echo(json.dumps(result.to_dict(), indent=2, ensure_ascii=False))
+        else:
+            for f in result.files:
+                if not f.changes:
+                    continue
+                click.echo(f"{f.path}: {len(f.changes)} nodes")
+                if dry_run:
+                    for change in f.changes:
+                        click.echo(f"  {change}")
+            click.echo(result.summary())
+        logger.info(result.summary())
+        if result.failures:
+            raise SystemExit(1)
+
+    except click.Abort:
+        raise
+    except Exception as e:
+        logger.error(f"Error editing saves: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@cli.command()
+@click.argument('sources', nargs=-1, required=True)
+@click.option('--key', '-k', 'keys', multiple=True, metavar='KEY',
+              help='Top-level member to read (e.g. day, gold); repeatable')
+@click.option('--range', 'byte_range', metavar='START:LENGTH', default=None,
+              help='Print these bytes of the decrypted text instead, decrypting only the blocks that hold them')
+@click.option('--json', 'as_json', is_flag=True, help='Print machine-readable JSON')
+def peek(sources, keys, byte_range, as_json):
+    """Read a few top-level values of saves without decrypting them fully.
+
+    SOURCES: Directories (searched recursively for WS_*.txt), individual
+    files or glob patterns
+
+    Decryption stops as soon as every --key was read, so members near the
+    start of a save (day, gold) cost one small chunk per file.
+    """
+    from batch import collect_inputs
+    from peek import peek_saves, read_plain_range
+
+    try:
+        paths = [path for path, _ in collect_inputs(list(sources), encrypt=False)]
+        if not paths:
+            click.echo("No matching save files found", err=True)
+            raise click.Abort()
+
+        if byte_range:
+            start, _, length = byte_range.partition(":")
+            start, length = int(start), int(length or 256)
+            for path in paths:
+                text = read_plain_range(path, start, length).decode('utf-8', errors='replace')
+                click.echo(json.dumps({"path": path, "start": start, "text": text}, ensure_ascii=False)
+                           if as_json else f"{path}: {text}")
+            return
+
+        if not keys:
+            raise ValueError("Nothing to read, pass --key or --range")
+
+        failures = 0
+        results = []
+        for result in peek_saves(paths, list(keys)):
+            failures += result.error is not None
+            if as_json:
+                results.append(result.to_dict())
+            elif result.error:
+                click.echo(f"{result.path}: {result.error}")
+            else:
+                values = " ".join(
+                    f"{name}={_peek_value(result.values[name]) if name in result.values else '-'}" for name in keys
+                )
+                click.echo(f"{result.path}: {values}")
+        if as_json:
+            click.echo(json.dumps(results, indent=2, ensure_ascii=False))
+        logger.info(f"Peeked into {len(paths)} saves, {failures} failed")
+        if failures:
+            raise SystemExit(1)
+
+    except click.Abort:
+        raise
+    except Exception as e:
+        logger.error(f"Error peeking into saves: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+def _peek_value(value, limit: int = 60) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
 @cli.command()
 @click.argument('input_file', type=click.Path(exists=True))
 @click.argument('output_file', type=click.Path(), required=False)
 @click.option('--encrypt/--decrypt', default=False, help='Encrypt or decrypt the WSDir file')
-def wsdir(input_file, output_file, encrypt):
+@click.pass_context
+def wsdir(ctx, input_file, output_file, encrypt):
     """Encrypt or decrypt WSDir files.
     
     INPUT_FILE: Path to the input WSDir file
@@ -90,6 +301,8 @@ def wsdir(input_file, output_file, encrypt):
     - When decrypting: saves as WSDir.json in the same directory
     - When encrypting: saves as WSDir.txt in the same directory
     """
+    from string_crypto import process_wsdir_file
+
     try:
         logger.info(f"Processing WSDir file: {input_file}")
         logger.info(f"Operation: {'encrypt' if encrypt else 'decrypt'}")
@@ -103,18 +316,20 @@ def wsdir(input_file, output_file, encrypt):
                 output_file = os.path.join(input_dir, 'WSDir.json')
             logger.info(f"Using default output path: {output_file}")
             
+        client = _daemon_client(ctx)
+        if client:
+            client.call(
+                "wsdir.process",
+                input=os.path.abspath(input_file),
+                output=os.path.abspath(output_file),
+                encrypt=encrypt
+            )
+        else:
+            process_wsdir_file(input_file, output_file, encrypt)
         if encrypt:
-            # Load JSON, encrypt and save
-            with open(input_file, 'r') as f:
-                json_data = json.load(f)
-            StringCrypto.save_wsdir(json_data, output_file)
             logger.info("Successfully encrypted WSDir file")
             click.echo(f"Encrypted WSDir file written to {output_file}")
         else:
-            # Decrypt and save as JSON
-            decrypted = StringCrypto.load_wsdir(input_file)
-            with open(output_file, 'w') as f:
-                json.dump(decrypted, f, indent=2)
             logger.info("Successfully decrypted WSDir file")
             click.echo(f"Decrypted WSDir file written to {output_file}")
             
@@ -123,68 +338,587 @@ def wsdir(input_file, output_file, encrypt):
         click.echo(f"Error: {str(e)}", err=True)
         raise click.Abort()
 
-def repair_json(content: str) -> str:
-    """Clean and repair JSON content."""
-    # Remove BOM if present
-    if content.startswith('\ufeff'):
-        content = content[1:]
-    
-    # Remove control characters except newlines and tabs
-    content = ''.join(char for char in content if char >= ' ' or char in '\n\t')
-    
-    # Fix common JSON issues
-    content = content.replace('\r\n', '\n')  # Normalize line endings
-    content = content.replace('\\u0000', '')  # Remove null characters
-    
-    return content
-
 @cli.command()
 @click.argument('input_file', type=click.Path(exists=True))
 @click.argument('output_file', type=click.Path(), required=False)
 @click.option('--extract/--encrypt', default=True, help='Whether to extract reference data from assets file or encrypt JSON back to reference data format')
-def asset(input_file, output_file, extract):
-    """Process reference data from resources.assets file"""
+@click.option('--index/--no-index', 'use_index', default=True, help='Use the cached asset index to read WSREFDATA without scanning every object')
+@click.option('--all-locales', is_flag=True, help='Extract every WSREFDATA locale variant in one pass')
+@click.option('--locale', 'locales', multiple=True, help='Extract this locale variant (e.g. GERMANY); repeatable')
+@click.option('--workers', '-j', type=int, default=None, help='Worker processes for multi-locale extraction')
+@click.option('--split', 'split_dir', type=click.Path(file_okay=False), default=None,
+              help='Extract into a directory with one file per Ref* table and a manifest')
+@click.option('--table', 'tables', multiple=True, help='Only output this Ref* table (e.g. RefHero); repeatable')
+@click.option('--stream', is_flag=True, help='Process in fixed-size chunks with constant memory, keeping the JSON text as stored')
+@click.option('--schema-from', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='When encrypting, check tables, keys and value types against this assets file or JSON')
+@click.option('--inject', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='When encrypting, also replace WSREFDATA (or the --locale variant) in this assets file')
+@click.pass_context
+def asset(ctx, input_file, output_file, extract, use_index, all_locales, locales, workers, split_dir, tables, stream,
+          schema_from, inject):
+    """Process reference data from resources.assets file
+
+    With --all-locales or --locale, OUTPUT_FILE is the directory the
+    [name].json files are written to (defaults to the assets directory).
+
+    INPUT_FILE may also be a directory written by --split. Encrypting it
+    re-serializes only the tables that changed; --table reads just the
+    requested tables and writes them to OUTPUT_FILE or stdout.
+
+    Encrypting reports every repair made to the JSON with its line and
+    column. --inject checks the input against the WSREFDATA already in the
+    assets file before replacing it; --schema-from checks against another file.
+    """
+    from refdata import (
+        REFDATA_LOCALES,
+        encrypt_refdata_file,
+        extract_locales,
+        extract_refdata_file,
+        load_refdata_json,
+        resolve_locale
+    )
+    from refdata_store import RefDataStore, is_store
+
     logger.info(f"Processing reference data: {input_file}")
     logger.info(f"Operation: {'extract' if extract else 'encrypt'}")
 
     try:
-        if extract:
-            with open(input_file, 'rb') as f:
-                data, name = SaveCrypto.extract_refdata(f.read(), input_file)
-            
-            output_path = os.path.join(os.path.dirname(input_file), f"{name}.json")
-            with open(output_path, 'w', encoding='utf-8') as f:
-                # Use custom serializer to match game format for both decryption and encryption
-                json_str = serialize_json(data, in_game_data=True)
-                f.write(json_str)
-            
-            logger.info(f"Saved extracted reference data to {output_path}")
-        else:
-            # For encryption, read and parse the JSON first
-            with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Clean control characters and repair JSON
-            content = repair_json(content)
-            
-            try:
-                data = json.loads(content)
-                logger.info("Successfully loaded JSON")
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON parsing failed: {str(e)}")
-                raise
-            
-            output_path = os.path.join(os.path.dirname(input_file), "WSREFDATA.bytes")
+        if tables:
+            if os.path.isdir(input_file):
+                source = RefDataStore.open(input_file)
+            elif input_file.lower().endswith(('.asset', '.assets')):
+                source = SaveCrypto.extract_refdata(input_file, input_file, use_index=use_index)[0]["value"]
+            else:
+                source = load_refdata_json(input_file)["value"]
+            missing = [table for table in tables if table not in source]
+            if missing:
+                raise ValueError(f"Unknown tables: {', '.join(missing)}")
+            selected = {table: source[table] for table in tables}
+            result = selected[tables[0]] if len(tables) == 1 else selected
+            if output_file:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    dump_json(result, f, in_game_data=True)
+                logger.info(f"Saved {', '.join(tables)} to {output_file}")
+            else:
+                click.echo(serialize_json(result, in_game_data=True))
+        elif extract and split_dir:
+            data, name = SaveCrypto.extract_refdata(input_file, input_file, use_index=use_index)
+            store = RefDataStore.write(data, split_dir, name=name)
+            logger.info(f"Saved {len(store)} reference data tables to {split_dir}")
+            click.echo(f"Split {name} into {len(store)} tables in {split_dir}")
+        elif not extract and is_store(input_file):
+            store = RefDataStore.open(input_file)
+            output_path = os.path.join(os.path.dirname(os.path.abspath(input_file)), "WSREFDATA.bytes")
             with open(output_path, 'wb') as f:
-                # Use custom serializer for both decryption and encryption
-                json_str = serialize_json(data, in_game_data=True)
-                f.write(SaveCrypto.encrypt(json_str))
-            
+                f.write(store.encrypt())
             logger.info(f"Saved encrypted reference data to {output_path}")
+        elif extract and (all_locales or locales):
+            names = REFDATA_LOCALES if all_locales else [resolve_locale(locale) for locale in locales]
+            outputs = extract_locales(
+                input_file,
+                output_dir=output_file,
+                names=names,
+                workers=workers,
+                use_index=use_index
+            )
+            for name, output_path in outputs.items():
+                click.echo(f"Extracted {name} to {output_path}")
+            logger.info(f"Extracted {len(outputs)} reference data variants")
+        elif extract:
+            client = _daemon_client(ctx)
+            if client:
+                client.call(
+                    "refdata.extract_file", input=os.path.abspath(input_file), use_index=use_index, stream=stream
+                )
+            else:
+                extract_refdata_file(input_file, use_index=use_index, stream=stream)
+        else:
+            name = resolve_locale(locales[0]) if locales else "WSREFDATA"
+            client = _daemon_client(ctx)
+            if client:
+                client.call(
+                    "refdata.encrypt_file",
+                    input=os.path.abspath(input_file),
+                    stream=stream,
+                    schema_from=os.path.abspath(schema_from) if schema_from else None,
+                    inject=os.path.abspath(inject) if inject else None,
+                    name=name
+                )
+            else:
+                encrypt_refdata_file(input_file, stream=stream, schema_from=schema_from, inject=inject, name=name)
 
     except Exception as e:
         logger.error(f"Error processing reference data: {str(e)}")
         raise ValueError(str(e))
 
+@cli.command('asset-update')
+@click.argument('assets_file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('changes', nargs=-1, required=True)
+@click.option('--backup/--no-backup', default=True, help='Snapshot the assets file into the backup store first')
+@click.option('--in-place', is_flag=True,
+              help='Patch the TextAssets into the file instead of repacking it (fast, not atomic)')
+@click.option('--append', is_flag=True, help='With --in-place, move grown TextAssets to the end of the file')
+@click.option('--verify', is_flag=True,
+              help='With --in-place, compare the result with a UnityPy repack and repack if they differ')
+@click.pass_context
+def asset_update(ctx, assets_file, changes, backup, in_place, append, verify):
+    """Replace several TextAssets in one load/save cycle.
+
+    ASSETS_FILE: Path to resources.assets
+
+    CHANGES: NAME=FILE pairs. A .json FILE is serialized and encrypted as
+    reference data. Any other FILE must be encrypted: WSREFDATA.bytes (save
+    key) is re-encrypted with the reference data key, a FILE that already
+    uses that key is used as is.
+    Either every change is written or, on any error, none is (unless
+    --in-place is used).
+    """
+    from asset_transaction import AssetTransaction
+
+    logger.info(f"Updating assets file: {assets_file}")
+
+    try:
+        pairs = []
+        for change in changes:
+            name, sep, path = change.partition('=')
+            if not sep or not name or not path:
+                raise click.BadParameter(f"Expected NAME=FILE, got '{change}'")
+            pairs.append((name, path))
+
+        client = _daemon_client(ctx)
+        if client:
+            client.call(
+                "refdata.update",
+                assets=os.path.abspath(assets_file),
+                changes=[[name, os.path.abspath(path)] for name, path in pairs],
+                backup=backup,
+                in_place=in_place,
+                append=append,
+                verify=verify
+            )
+        else:
+            with AssetTransaction(assets_file, backup=backup, in_place=in_place, append=append, verify=verify) as tx:
+                for name, path in pairs:
+                    tx.stage_file(name, path)
+                    logger.info(f"Staged {name} from {path}")
+
+        logger.info(f"Committed {len(changes)} changes to {assets_file}")
+        click.echo(f"Updated {len(changes)} TextAssets in {assets_file}")
+
+    except click.BadParameter:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating assets file: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@cli.command('mod-apply')
+@click.argument('base_file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('mod_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default=None,
+              help='Encrypted output path (defaults to WSREFDATA.bytes next to BASE_FILE)')
+@click.option('--inject', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Write the result straight into this resources.assets file instead')
+@click.option('--name', default='WSREFDATA', help='TextAsset to replace when injecting')
+@click.option('--json-output', type=click.Path(dir_okay=False), default=None,
+              help='Also write the merged reference data as JSON')
+@click.option('--strict', is_flag=True, help='Fail instead of letting later mods win on conflicts')
+def mod_apply(base_file, mod_files, output, inject, name, json_output, strict):
+    """Apply JSON-patch mods to reference data in load order.
+
+    BASE_FILE: Extracted WSREFDATA.json or a resources.assets file
+
+    MOD_FILES: Mod files applied in the given order
+    """
+    from asset_transaction import AssetTransaction
+    from mods import Mod, ModEngine
+
+    logger.info(f"Applying {len(mod_files)} mod files to {base_file}")
+
+    try:
+        mods = [mod for path in mod_files for mod in Mod.load(path)]
+        result = ModEngine.from_file(base_file).apply(mods)
+
+        for conflict in result.conflicts:
+            click.echo(f"Conflict: {conflict}", err=True)
+        if result.conflicts and strict:
+            raise ValueError(f"{len(result.conflicts)} conflicts between mods")
+
+        if json_output:
+            with open(json_output, 'w', encoding='utf-8') as f:
+                dump_json(result.data, f, in_game_data=True)
+
+        if inject:
+            with AssetTransaction(inject) as tx:
+                tx.stage_refdata(name, result.data)
+            click.echo(f"Applied {result.applied} operations from {len(mods)} mods into {inject}")
+        else:
+            from backup_store import snapshot_before_write
+
+            output = output or os.path.join(os.path.dirname(base_file), "WSREFDATA.bytes")
+            snapshot_before_write(output, "mod-apply")
+            with open(output, 'wb') as f:
+                f.write(SaveCrypto.encrypt(serialize_json(result.data, in_game_data=True)))
+            click.echo(f"Applied {result.applied} operations from {len(mods)} mods to {output}")
+        logger.info(f"Applied {result.applied} mod operations with {len(result.conflicts)} conflicts")
+
+    except Exception as e:
+        logger.error(f"Error applying mods: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@cli.command('diff')
+@click.argument('old_file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('new_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--json', 'as_json', is_flag=True, help='Print machine-readable JSON')
+@click.option('--id-field', 'id_fields', multiple=True,
+              help='Match list items on this field before guessing one; repeatable')
+@click.option('--exit-code', is_flag=True, help='Exit with status 1 when the files differ')
+def diff(old_file, new_file, as_json, id_fields, exit_code):
+    """Show what changed between two saves or reference data files.
+
+    OLD_FILE, NEW_FILE: Encrypted saves, decrypted .json files or
+    resources.assets files, in any combination
+
+    Changes are reported per path in the mod path format, with list items
+    matched by their ID field where every item has one.
+    """
+    from diff import diff_files, summarize
+
+    logger.info(f"Diffing {old_file} against {new_file}")
+
+    try:
+        changes = diff_files(old_file, new_file, id_fields=list(id_fields))
+        if as_json:
+            click.echo(json.dumps({
+                "old": old_file,
+                "new": new_file,
+                "changes": [change.to_dict() for change in changes],
+            }, indent=2, ensure_ascii=False))
+        else:
+            for change in changes:
+                click.echo(str(change))
+            click.echo(summarize(changes))
+        logger.info(f"{summarize(changes)} between {old_file} and {new_file}")
+
+    except Exception as e:
+        logger.error(f"Error diffing files: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+    if changes and exit_code:
+        raise SystemExit(1)
+
+@cli.command('scan')
+@click.argument('data_dirs', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default=None,
+              help='Write the index of every TextAsset found as JSON')
+@click.option('--all', 'show_all', is_flag=True, help='List TextAssets that are not encrypted too')
+@click.option('--rescan', is_flag=True, help='Ignore the per-file cache and load every file again')
+@click.option('--workers', '-j', type=int, default=None, help='Worker processes (defaults to the number of cores)')
+@click.option('--json', 'as_json', is_flag=True, help='Print machine-readable JSON')
+def scan(data_dirs, output, show_all, rescan, workers, as_json):
+    """Find the encrypted TextAssets in a game Data folder.
+
+    DATA_DIRS: Data folders (searched recursively for *.assets, level*,
+    bundles, ...) or individual Unity files
+
+    Every TextAsset is tried against the save and reference data keys and
+    listed with its file, name, size, key and content hash. Files that did
+    not change since the last scan are served from Cache/asset_scan.
+    """
+    from asset_scan import AssetScanner
+
+    try:
+        result = AssetScanner().scan(list(data_dirs), workers=workers, rescan=rescan)
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(result.to_dict(), f, indent=2, ensure_ascii=False)
+            logger.info(f"Saved asset scan to {output}")
+        if as_json:
+            click.echo(json.dumps(result.to_dict(), indent=2, ensure_ascii=False))
+        else:
+            for asset in (result.assets if show_all else result.encrypted()):
+                click.echo(asset.describe())
+            click.echo(result.summary())
+
+    except Exception as e:
+        logger.error(f"Error scanning asset files: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@cli.group()
+def cache():
+    """Inspect or clear the decrypt cache."""
+    pass
+
+@cache.command('stats')
+@click.option('--json', 'as_json', is_flag=True, help='Print machine-readable JSON')
+def cache_stats(as_json):
+    """Show decrypt cache size and usage."""
+    from decrypt_cache import DecryptCache
+
+    stats = DecryptCache().stats()
+    if as_json:
+        click.echo(json.dumps(stats, indent=2))
+    else:
+        for key, value in stats.items():
+            click.echo(f"{key}: {value}")
+
+@cache.command('clear')
+def cache_clear():
+    """Delete every decrypt cache entry."""
+    from decrypt_cache import DecryptCache
+
+    removed = DecryptCache().clear()
+    logger.info(f"Cleared {removed} decrypt cache files")
+    click.echo(f"Removed {removed} cached files")
+
+@cli.group('index')
+def index_group():
+    """Catalog saves and WSDir files in SQLite and query them without decrypting."""
+    pass
+
+@index_group.command('scan')
+@click.argument('sources', nargs=-1, required=True)
+@click.option('--db', 'db_path', type=click.Path(dir_okay=False), default=None,
+              help='Catalog database (defaults to Cache/catalog.sqlite)')
+@click.option('--field', 'fields', multiple=True,
+              help='Extract NAME=PATH from every save (e.g. gold=gold, heroes=heroes); replaces the stored field set')
+@click.option('--all-fields', is_flag=True, help='Go back to extracting every top-level member')
+@click.option('--workers', '-j', type=int, default=None, help='Worker processes (defaults to the number of cores)')
+@click.option('--prune/--no-prune', default=True, help='Forget saves that were deleted from the scanned directories')
+def index_scan(sources, db_path, fields, all_fields, workers, prune):
+    """Add or refresh the saves and WSDir files under SOURCES.
+
+    Only saves whose size, mtime or content changed since the last scan are
+    decrypted again. Changing the field set re-extracts every save.
+    """
+    from catalog import Catalog, parse_field_spec
+
+    try:
+        with Catalog.open(db_path) as catalog:
+            if fields or all_fields:
+                catalog.set_fields(dict(parse_field_spec(spec) for spec in fields))
+            result = catalog.scan(list(sources), workers=workers, prune=prune)
+        click.echo(result.summary())
+        if result.failures:
+            raise SystemExit(1)
+    except Exception as e:
+        logger.error(f"Error scanning saves: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@index_group.command('query')
+@click.argument('conditions', nargs=-1)
+@click.option('--db', 'db_path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Catalog database (defaults to Cache/catalog.sqlite)')
+@click.option('--show', multiple=True, help='Also print this field; repeatable')
+@click.option('--order-by', default=None, help='Sort by this field or by path, slot, size or timestamp')
+@click.option('--desc', is_flag=True, help='Sort descending')
+@click.option('--limit', type=int, default=None, help='Print at most this many saves')
+@click.option('--json', 'as_json', is_flag=True, help='Print machine-readable JSON')
+def index_query(conditions, db_path, show, order_by, desc, limit, as_json):
+    """List catalogued saves matching every condition.
+
+    CONDITIONS look like gold>100000, day<=30, slot=autosave or
+    shopName~potato (substring match).
+    """
+    from catalog import Catalog
+
+    try:
+        with Catalog.open(db_path) as catalog:
+            rows = catalog.query(list(conditions), show=list(show), order_by=order_by, descending=desc, limit=limit)
+        if as_json:
+            click.echo(json.dumps(rows, indent=2))
+            return
+        for row in rows:
+            extra = " ".join(
+                f"{key}={value}" for key, value in row.items()
+                if key not in ("path", "slot", "timestamp", "size")
+            )
+            timestamp = f" [{row['timestamp']}]" if row["timestamp"] else ""
+            click.echo(f"{row['path']} ({row['slot']}{timestamp}) {extra}".rstrip())
+        click.echo(f"{len(rows)} saves", err=True)
+    except Exception as e:
+        logger.error(f"Error querying catalog: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@index_group.command('stats')
+@click.option('--db', 'db_path', type=click.Path(dir_okay=False), default=None,
+              help='Catalog database (defaults to Cache/catalog.sqlite)')
+@click.option('--json', 'as_json', is_flag=True, help='Print machine-readable JSON')
+def index_stats(db_path, as_json):
+    """Show what the catalog holds."""
+    from catalog import Catalog
+
+    with Catalog.open(db_path) as catalog:
+        stats = catalog.stats()
+    if as_json:
+        click.echo(json.dumps(stats, indent=2))
+    else:
+        for key, value in stats.items():
+            click.echo(f"{key}: {value}")
+
+@cli.group('backup')
+def backup_group():
+    """Snapshots taken before saves, WSDir files and assets are overwritten."""
+    pass
+
+@backup_group.command('list')
+@click.argument('path', required=False)
+@click.option('--json', 'as_json', is_flag=True, help='Print machine-readable JSON')
+def backup_list(path, as_json):
+    """List snapshots, oldest first, optionally only those of PATH."""
+    from backup_store import BackupStore
+
+    store = BackupStore()
+    snapshots = store.snapshots(path)
+    stats = store.stats()
+    if as_json:
+        click.echo(json.dumps({
+            "snapshots": [{k: v for k, v in vars(s).items() if k != "chunks"} for s in snapshots],
+            "stats": stats,
+        }, indent=2))
+        return
+    for snapshot in snapshots:
+        click.echo(snapshot.describe())
+    ratio = stats["logical_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0.0
+    click.echo(
+        f"{stats['snapshots']} snapshots of {stats['files']} files: {stats['logical_bytes']:,} bytes "
+        f"stored in {stats['stored_bytes']:,} ({ratio:.1f}x)",
+        err=True
+    )
+
+@backup_group.command('create')
+@click.argument('files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--codec', type=click.Choice(['zlib', 'lzma', 'none']), default='zlib',
+              help='Compression for new chunks (lzma is smaller and slower)')
+@click.option('--reason', default='manual', help='Note stored with the snapshot')
+def backup_create(files, codec, reason):
+    """Snapshot FILES now."""
+    from backup_store import BackupStore
+
+    try:
+        store = BackupStore(codec=codec)
+        for path in files:
+            snapshot = store.snapshot(path, reason)
+            click.echo(snapshot.describe())
+    except Exception as e:
+        logger.error(f"Error creating snapshot: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@backup_group.command('restore')
+@click.argument('snapshot_id')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default=None,
+              help='Write here instead of over the original file')
+def backup_restore(snapshot_id, output):
+    """Restore a snapshot by its ID (or a unique prefix of it).
+
+    The file being replaced is snapshotted first, so restores can be undone.
+    """
+    from backup_store import BackupStore
+
+    try:
+        snapshot = BackupStore().restore(snapshot_id, output)
+        click.echo(f"Restored {snapshot.id} to {output or snapshot.path}")
+    except Exception as e:
+        logger.error(f"Error restoring snapshot: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@backup_group.command('prune')
+@click.option('--keep', type=int, default=20, help='Newest snapshots always kept per file')
+@click.option('--older-than', type=float, default=None,
+              help='Only drop snapshots older than this many days')
+@click.option('--dry-run', is_flag=True, help='Only report what would be removed')
+def backup_prune(keep, older_than, dry_run):
+    """Drop old snapshots and the chunks nothing refers to any more."""
+    from backup_store import BackupStore
+
+    try:
+        result = BackupStore().prune(keep=keep, older_than=older_than, dry_run=dry_run)
+        verb = "Would remove" if dry_run else "Removed"
+        click.echo(f"{verb} {result['snapshots']} snapshots and {result['chunks']} chunks ({result['bytes']:,} bytes)")
+    except Exception as e:
+        logger.error(f"Error pruning backups: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@cli.group('daemon')
+def daemon_group():
+    """Run a warm background process that other commands forward to."""
+    pass
+
+@daemon_group.command('start')
+@click.option('--socket', 'socket_file', type=click.Path(dir_okay=False), default=None,
+              help='Unix socket path (defaults to $HPT_DAEMON_SOCKET or Cache/daemon.sock)')
+@click.option('--foreground', is_flag=True, help='Serve in this process instead of detaching')
+@click.pass_context
+def daemon_start(ctx, socket_file, foreground):
+    """Start the daemon.
+
+    It imports UnityPy, boots the crypto backend and builds the ciphers once;
+    save, wsdir, asset and asset-update then forward to it automatically.
+    """
+    from daemon import serve, start_background
+
+    try:
+        if foreground:
+            serve(socket_file)
+            return
+        root = ctx.find_root().params
+        args = ["--backend", root["backend"]] if root["backend"] else []
+        if root["use_cache"] is not None:
+            args.append("--cache" if root["use_cache"] else "--no-cache")
+        if root["log_level"]:
+            args += ["--log-level", root["log_level"]]
+        info = start_background(socket_file, args=args)
+        click.echo(f"Daemon {info['pid']} running with the {info['backend']} backend")
+    except Exception as e:
+        logger.error(f"Error starting daemon: {str(e)}", exc_info=True)
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+@daemon_group.command('stop')
+@click.option('--socket', 'socket_file', type=click.Path(dir_okay=False), default=None,
+              help='Unix socket path (defaults to $HPT_DAEMON_SOCKET or Cache/daemon.sock)')
+def daemon_stop(socket_file):
+    """Stop the running daemon."""
+    from daemon import DaemonClient
+
+    client = DaemonClient.connect(socket_file)
+    if client is None:
+        click.echo("No daemon is running")
+        return
+    with client:
+        client.call("shutdown")
+    click.echo("Daemon stopped")
+
+@daemon_group.command('status')
+@click.option('--socket', 'socket_file', type=click.Path(dir_okay=False), default=None,
+              help='Unix socket path (defaults to $HPT_DAEMON_SOCKET or Cache/daemon.sock)')
+@click.option('--json', 'as_json', is_flag=True, help='Print machine-readable JSON')
+def daemon_status(socket_file, as_json):
+    """Show whether the daemon is running."""
+    from daemon import DaemonClient
+
+    client = DaemonClient.connect(socket_file)
+    info = None
+    if client is not None:
+        with client:
+            info = client.call("ping")
+    if as_json:
+        click.echo(json.dumps({"running": info is not None, **(info or {})}, indent=2))
+    elif info:
+        click.echo(f"Daemon {info['pid']} running for {info['uptime']:.0f}s with the {info['backend']} backend")
+    else:
+        click.echo("No daemon is running")
+    if info is None:
+        raise SystemExit(1)
+
 if __name__ == '__main__':
     cli() 
\ No newline at end of file
@@ -1,25 +1,93 @@
 import json
-import UnityPy
-import clr
+import logging
 import os
-import shutil
+import threading
+from collections import deque
+from contextlib import contextmanager
+from types import SimpleNamespace
 
-clr.AddReference('System.Security')
-clr.AddReference('System.IO')
+from asset_index import AssetIndex
+from logger import count, get_logger, payload_sampling
+from profiler import stage
 
-from System.Security.Cryptography import (
-    RijndaelManaged,
-    CipherMode,
-    PaddingMode
-)
-from System.Text import Encoding
-from System.IO import BinaryReader, BinaryWriter, MemoryStream
-from System import Convert
+logger = get_logger(__name__)
 
-from logger import get_logger
-from utils import serialize_json
+BACKENDS = ("auto", "native", "clr")
 
-logger = get_logger(__name__)
+_clr = None
+
+
+def _load_clr() -> SimpleNamespace:
+    """Boot the .NET runtime and import the types used by the CLR backend."""
+    global _clr
+    if _clr is None:
+        import clr
+
+        clr.AddReference('System.Security')
+        clr.AddReference('System.IO')
+
+        from System.Security.Cryptography import (
+            RijndaelManaged,
+            CipherMode,
+            PaddingMode
+        )
+        from System.Text import Encoding
+        from System.IO import BinaryReader, BinaryWriter, MemoryStream
+        from System import Convert
+
+        _clr = SimpleNamespace(
+            RijndaelManaged=RijndaelManaged,
+            CipherMode=CipherMode,
+            PaddingMode=PaddingMode,
+            Encoding=Encoding,
+            BinaryReader=BinaryReader,
+            BinaryWriter=BinaryWriter,
+            MemoryStream=MemoryStream,
+            Convert=Convert,
+        )
+    return _clr
+
+
+def _native_available() -> bool:
+    try:
+        import native_crypto  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CipherPool:
+    """Thread-safe pool of reusable cipher contexts for one backend and key.
+
+    A context is only used by one thread at a time: acquire() hands out an
+    idle one, or builds a new one when every context is busy, and takes it
+    back afterwards. The pool therefore grows to the peak number of
+    concurrent callers and then stops allocating.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        # deque.append and deque.pop are atomic, no lock is needed
+        self._idle = deque()
+        self.created = 0
+
+    @contextmanager
+    def acquire(self):
+        try:
+            context = self._idle.pop()
+        except IndexError:
+            context = self._factory()
+            self.created += 1
+        try:
+            yield context
+        finally:
+            self._idle.append(context)
+
+    def warm(self, count: int = 1) -> None:
+        """Build contexts up front so the first calls do not pay for it."""
+        while len(self._idle) < count:
+            self._idle.append(self._factory())
+            self.created += 1
 
 
 class SaveCrypto:
@@ -28,85 +96,287 @@ class SaveCrypto:
     REFDATA_KEY = "e7nc3r2e6f8k2e0y" 
 
     BLOCK_SIZE = 128
-    CIPHER_MODE = CipherMode.ECB
-    PADDING_MODE = PaddingMode.PKCS7
+    CIPHER_MODE = "ECB"
+    PADDING_MODE = "PKCS7"
+
+    # "native" uses pycryptodome and pure-Python framing, "clr" goes through
+    # pythonnet's RijndaelManaged. "auto" prefers native when it is installed.
+    BACKEND = os.environ.get("HPT_CRYPTO_BACKEND", "auto").lower()
+
+    # DecryptCache instance, None until configured, False when disabled
+    CACHE = None
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    @staticmethod
+    def set_backend(backend: str) -> None:
+        backend = backend.lower()
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown crypto backend '{backend}', expected one of {', '.join(BACKENDS)}"
+            )
+        SaveCrypto.BACKEND = backend
+
+    @staticmethod
+    def get_backend() -> str:
+        """Resolve the configured backend to either "native" or "clr"."""
+        backend = SaveCrypto.BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown crypto backend '{backend}', expected one of {', '.join(BACKENDS)}"
+            )
+        if backend == "auto":
+            backend = "native" if _native_available() else "clr"
+            SaveCrypto.BACKEND = backend
+            logger.debug("Using %s crypto backend", backend)
+        return backend
 
     @staticmethod
-    def _create_rijndael(key: str) -> RijndaelManaged:
-        rijndael = RijndaelManaged()
-        rijndael.Key = Encoding.UTF8.GetBytes(key)
-        rijndael.Mode = SaveCrypto.CIPHER_MODE
-        rijndael.Padding = SaveCrypto.PADDING_MODE
+    def _create_rijndael(key: str):
+        net = _load_clr()
+        rijndael = net.RijndaelManaged()
+        rijndael.Key = net.Encoding.UTF8.GetBytes(key)
+        rijndael.Mode = getattr(net.CipherMode, SaveCrypto.CIPHER_MODE)
+        rijndael.Padding = getattr(net.PaddingMode, SaveCrypto.PADDING_MODE)
         rijndael.BlockSize = SaveCrypto.BLOCK_SIZE
         return rijndael
 
     @staticmethod
-    def _decrypt_data(encrypted_str: str, key: str) -> str:
+    def _native_cipher(key: str):
+        from native_crypto import NativeRijndael
+        return NativeRijndael.for_key(key)
+
+    @staticmethod
+    def _create_context(backend: str, key: str):
+        if backend == "native":
+            from native_crypto import NativeRijndael
+            return NativeRijndael(key)
         rijndael = SaveCrypto._create_rijndael(key)
-        encrypted = Convert.FromBase64String(encrypted_str)
-        decryptor = rijndael.CreateDecryptor()
-        decrypted = decryptor.TransformFinalBlock(
-            encrypted,
-            0,
-            len(encrypted)
+        # ECB transforms reset after TransformFinalBlock and can be reused
+        return SimpleNamespace(
+            rijndael=rijndael,
+            decryptor=rijndael.CreateDecryptor(),
+            encryptor=rijndael.CreateEncryptor(),
         )
-        return Encoding.UTF8.GetString(decrypted)
+
+    @staticmethod
+    def cipher_pool(key: str, backend: str = None) -> CipherPool:
+        """Return the shared pool of cipher contexts for key.
+
+        Contexts are a NativeRijndael for the native backend and a
+        RijndaelManaged with its decryptor and encryptor for the CLR one.
+        """
+        backend = backend or SaveCrypto.get_backend()
+        pool = SaveCrypto._pools.get((backend, key))
+        if pool is None:
+            with SaveCrypto._pools_lock:
+                pool = SaveCrypto._pools.get((backend, key))
+                if pool is None:
+                    pool = SaveCrypto._pools[(backend, key)] = CipherPool(
+                        lambda: SaveCrypto._create_context(backend, key)
+                    )
+        return pool
+
+    @staticmethod
+    def _decrypt_data(encrypted_str: str | bytes, key: str) -> str:
+        backend = SaveCrypto.get_backend()
+        with SaveCrypto.cipher_pool(key, backend).acquire() as context:
+            if backend == "native":
+                return context.decrypt(encrypted_str)
+
+            net = _load_clr()
+            if not isinstance(encrypted_str, str):
+                encrypted_str = bytes(encrypted_str).decode('utf-8')
+            with stage("base64"):
+                encrypted = net.Convert.FromBase64String(encrypted_str)
+            with stage("aes"):
+                decrypted = context.decryptor.TransformFinalBlock(
+                    encrypted,
+                    0,
+                    len(encrypted)
+                )
+            with stage("utf8_decode"):
+                return net.Encoding.UTF8.GetString(decrypted)
 
     @staticmethod
     def _encrypt_data(data: str, key: str) -> str:
-        rijndael = SaveCrypto._create_rijndael(key)
-        bytes_to_encrypt = Encoding.UTF8.GetBytes(data)
-        encryptor = rijndael.CreateEncryptor()
-        encrypted = encryptor.TransformFinalBlock(
-            bytes_to_encrypt,
-            0,
-            len(bytes_to_encrypt)
-        )
-        # Return base64 string directly, don't encode to bytes
-        return Convert.ToBase64String(encrypted)
+        backend = SaveCrypto.get_backend()
+        with SaveCrypto.cipher_pool(key, backend).acquire() as context:
+            if backend == "native":
+                return context.encrypt(data)
+
+            net = _load_clr()
+            with stage("utf8_encode"):
+                bytes_to_encrypt = net.Encoding.UTF8.GetBytes(data)
+            with stage("aes"):
+                encrypted = context.encryptor.TransformFinalBlock(
+                    bytes_to_encrypt,
+                    0,
+                    len(bytes_to_encrypt)
+                )
+        with stage("base64"):
+            # Return base64 string directly, don't encode to bytes
+            return net.Convert.ToBase64String(encrypted)
+
+    @staticmethod
+    def _read_prefixed(data: bytes) -> str | memoryview:
+        """Read the BinaryWriter length-prefixed base64 payload of a save."""
+        with stage("length_prefix"):
+            return SaveCrypto._read_prefixed_payload(data)
+
+    @staticmethod
+    def _read_prefixed_payload(data: bytes) -> str | memoryview:
+        if SaveCrypto.get_backend() == "native":
+            from dotnet_io import read_prefixed_bytes
+            return read_prefixed_bytes(data)
+
+        net = _load_clr()
+        mem_stream = None
+        binary_reader = None
+        try:
+            mem_stream = net.MemoryStream(data)
+            binary_reader = net.BinaryReader(mem_stream)
+            return binary_reader.ReadString()
+        finally:
+            if binary_reader:
+                binary_reader.Close()
+            if mem_stream:
+                mem_stream.Close()
+
+    @staticmethod
+    def _write_prefixed(value: str) -> bytes:
+        """Write value with a BinaryWriter length prefix."""
+        with stage("length_prefix"):
+            return SaveCrypto._write_prefixed_payload(value)
+
+    @staticmethod
+    def _write_prefixed_payload(value: str) -> bytes:
+        if SaveCrypto.get_backend() == "native":
+            from dotnet_io import write_dotnet_string
+            return write_dotnet_string(value)
+
+        net = _load_clr()
+        mem_stream = None
+        binary_writer = None
+        try:
+            mem_stream = net.MemoryStream()
+            binary_writer = net.BinaryWriter(mem_stream)
+            binary_writer.Write(value)
+            binary_writer.Flush()
+            mem_stream.Position = 0
+            return bytes(mem_stream.ToArray())
+        finally:
+            if binary_writer:
+                binary_writer.Close()
+            if mem_stream:
+                mem_stream.Close()
+
+    @staticmethod
+    def get_cache():
+        """Return the DecryptCache in use, or None when caching is off.
+
+        Caching is opt-in through enable_cache() or $HPT_DECRYPT_CACHE=1.
+        """
+        if SaveCrypto.CACHE is None and os.environ.get("HPT_DECRYPT_CACHE", "") not in ("", "0"):
+            SaveCrypto.enable_cache()
+        return SaveCrypto.CACHE or None
+
+    @staticmethod
+    def enable_cache(cache=None) -> None:
+        from decrypt_cache import DecryptCache, DEFAULT_MAX_BYTES
+
+        if cache is None:
+            max_mb = os.environ.get("HPT_DECRYPT_CACHE_MB")
+            cache = DecryptCache(
+                max_bytes=int(max_mb) * 1024 * 1024 if max_mb else DEFAULT_MAX_BYTES
+            )
+        SaveCrypto.CACHE = cache
+
+    @staticmethod
+    def disable_cache() -> None:
+        # False (not None) so the environment does not turn it back on
+        SaveCrypto.CACHE = False
+
+    @staticmethod
+    def _resolve_key(key: str = None, filepath: str = None) -> str:
+        if filepath and filepath.lower().endswith(('.asset', '.assets')):
+            return SaveCrypto.REFDATA_KEY
+        return key or SaveCrypto.SAVE_KEY
 
     @staticmethod
     def decrypt(
         data: bytes | str,
         key: str = None,
         filepath: str = None
+    ) -> str:
+        cache = SaveCrypto.get_cache()
+        if not cache:
+            return SaveCrypto._decrypt(data, key, filepath)
+
+        cache_key = cache.make_key(data, SaveCrypto._resolve_key(key, filepath))
+        result = cache.get_text(cache_key)
+        if result is None:
+            result = SaveCrypto._decrypt(data, key, filepath)
+            cache.put_text(cache_key, result)
+        else:
+            logger.debug("Decrypted data served from cache")
+        return result
+
+    @staticmethod
+    def decrypt_json(
+        data: bytes | str,
+        key: str = None,
+        filepath: str = None
+    ):
+        """Decrypt and parse JSON, reusing the cached parse when caching is on."""
+        cache = SaveCrypto.get_cache()
+        if not cache:
+            decrypted = SaveCrypto._decrypt(data, key, filepath)
+            with stage("json_loads"):
+                return json.loads(decrypted)
+
+        cache_key = cache.make_key(data, SaveCrypto._resolve_key(key, filepath))
+        parsed = cache.get_parsed(cache_key)
+        if parsed is None:
+            decrypted = SaveCrypto.decrypt(data, key, filepath)
+            with stage("json_loads"):
+                parsed = json.loads(decrypted)
+            cache.put_parsed(cache_key, parsed)
+        else:
+            logger.debug("Parsed data served from cache")
+        return parsed
+
+    @staticmethod
+    def _decrypt(
+        data: bytes | str,
+        key: str = None,
+        filepath: str = None
     ) -> str:
         try:
             if filepath and (filepath.lower().endswith('.asset') or filepath.lower().endswith('.assets')):
                 key = SaveCrypto.REFDATA_KEY
+                # The BinaryWriter length prefix is not valid UTF-8 once the
+                # payload is longer than 127 bytes; decode it like UnityPy does
                 encrypted_str = (
-                    data if isinstance(data, str) else data.decode('utf-8')
+                    data if isinstance(data, str) else data.decode('utf-8', 'surrogateescape')
                 )
                 encrypted_str = encrypted_str[len(encrypted_str) % 4:]
+                count("refdata_decrypts")
+                count("refdata_decrypt_bytes", len(encrypted_str))
                 return SaveCrypto._decrypt_data(encrypted_str, key)
             else:
                 key = key or SaveCrypto.SAVE_KEY
-                logger.debug("Decrypting save data...")
-                logger.debug(f"Input data length: {len(data)} bytes")
-
-                mem_stream = None
-                binary_reader = None
-                try:
-                    mem_stream = MemoryStream(data)
-                    binary_reader = BinaryReader(mem_stream)
-                    encrypted_str = binary_reader.ReadString()
-                    logger.debug(f"Read string length: {len(encrypted_str)}")
-
-                    result = SaveCrypto._decrypt_data(encrypted_str, key)
-                    logger.debug("Successfully decoded using UTF8")
-
-                    sample_size = min(200, len(result))
-                    logger.debug(
-                        f"First {sample_size} chars of decrypted data: "
-                        f"{result[:sample_size]}"
-                    )
+                encrypted_str = SaveCrypto._read_prefixed(data)
+                result = SaveCrypto._decrypt_data(encrypted_str, key)
+                count("save_decrypts")
+                count("save_decrypt_bytes", len(data))
+
+                sample_size = payload_sampling()
+                if sample_size and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("First %d chars of decrypted data: %s", sample_size, result[:sample_size])
 
-                    return result
-                finally:
-                    if binary_reader:
-                        binary_reader.Close()
-                    if mem_stream:
-                        mem_stream.Close()
+                return result
 
         except Exception as e:
             error_type = (
@@ -126,33 +396,16 @@ class SaveCrypto:
             if filepath and (filepath.lower().endswith('.asset') or filepath.lower().endswith('.assets')):
                 key = SaveCrypto.REFDATA_KEY
                 result = SaveCrypto._encrypt_data(data, key)
+                count("refdata_encrypts")
                 # For assets files, return bytes directly
                 return result.encode('utf-8')
             else:
                 key = key or SaveCrypto.SAVE_KEY
-                logger.debug("Encrypting text...")
-                logger.debug(f"Raw data length: {len(data)} bytes")
-
                 result = SaveCrypto._encrypt_data(data, key)
-                logger.debug(f"UTF8 bytes length: {len(data)} bytes")
-
-                mem_stream = None
-                binary_writer = None
-                try:
-                    mem_stream = MemoryStream()
-                    binary_writer = BinaryWriter(mem_stream)
-                    binary_writer.Write(result)
-                    binary_writer.Flush()
-                    mem_stream.Position = 0
-                    output = bytes(mem_stream.ToArray())
-
-                    logger.debug(f"Final output length: {len(output)} bytes")
-                    return output
-                finally:
-                    if binary_writer:
-                        binary_writer.Close()
-                    if mem_stream:
-                        mem_stream.Close()
+                output = SaveCrypto._write_prefixed(result)
+                count("save_encrypts")
+                count("save_encrypt_bytes", len(output))
+                return output
 
         except Exception as e:
             error_type = (
@@ -165,35 +418,58 @@ class SaveCrypto:
     @staticmethod
     def extract_refdata(
         file_data: bytes | str,
-        filename: str = None
+        filename: str = None,
+        use_index: bool = True
     ) -> tuple[dict, str]:
+        """Extract and decrypt WSREFDATA.
+
+        file_data is either the assets file contents or its path. When it is
+        a path and use_index is set, the asset index is used to read the
+        TextAsset straight from disk instead of scanning every object.
+        """
         try:
             if not filename or not (filename.lower().endswith('.asset') or filename.lower().endswith('.assets')):
                 raise ValueError("Please select a resources.asset or resources.assets file")
 
-            env = UnityPy.load(file_data) 
-            logger.debug("Loaded assets file")
-
-            wsrefdata = None
-            for obj in env.objects:
-                if obj.type.name == "TextAsset":
-                    data = obj.read()
-                    logger.debug(f"  Name: {data.m_Name}")
-                    if data.m_Name == "WSREFDATA":
-                        logger.debug("Found WSREFDATA!")
-                        wsrefdata = data
-                        break
-
-            if not wsrefdata:
-                raise ValueError("Could not find WSREFDATA in assets file")
-
-            encrypted_bytes = wsrefdata.m_Script
-            decrypted_json = SaveCrypto.decrypt(
+            encrypted_bytes = None
+            name = None
+            if use_index and isinstance(file_data, str) and os.path.isfile(file_data):
+                with stage("index_read"):
+                    hit = AssetIndex().read_text_asset(file_data, "WSREFDATA")
+                if hit:
+                    logger.debug("Read WSREFDATA through the asset index")
+                    name, encrypted_bytes = hit
+
+            if encrypted_bytes is None:
+                import UnityPy
+
+                with stage("unity_load"):
+                    env = UnityPy.load(file_data) 
+                logger.debug("Loaded assets file")
+
+                wsrefdata = None
+                with stage("unity_scan"):
+                    for obj in env.objects:
+                        if obj.type.name == "TextAsset":
+                            data = obj.read()
+                            logger.debug("  Name: %s", data.m_Name)
+                            if data.m_Name == "WSREFDATA":
+                                logger.debug("Found WSREFDATA!")
+                                wsrefdata = data
+                                break
+
+                if not wsrefdata:
+                    raise ValueError("Could not find WSREFDATA in assets file")
+
+                encrypted_bytes = wsrefdata.m_Script
+                name = wsrefdata.m_Name
+
+            data = SaveCrypto.decrypt_json(
                 encrypted_bytes,
                 filepath=filename
             )
 
-            return json.loads(decrypted_json), wsrefdata.m_Name
+            return data, name
 
         except Exception as e:
             logger.error(f"Error extracting reference data: {str(e)}")
@@ -202,31 +478,8 @@ class SaveCrypto:
     @staticmethod
     def update_refdata(file_path: str, new_data: dict) -> None:
         """Update WSREFDATA in assets file with new encrypted data"""
-        logger.debug(f"Creating backup at {file_path}.backup")
-        if not os.path.exists(f"{file_path}.backup"):
-            shutil.copy2(file_path, f"{file_path}.backup")
-        
-        # Encrypt the new data first using custom serializer
-        encrypted_data = SaveCrypto.encrypt(serialize_json(new_data, in_game_data=True), SaveCrypto.REFDATA_KEY)
-        
-        # Load and modify the assets file
-        logger.debug(f"open file: {file_path}")
-        env = UnityPy.load(file_path)
-        logger.debug("Loaded assets file")
-
-        # Find and update WSREFDATA TextAsset
-        for obj in env.objects:
-            if obj.type.name == "TextAsset":
-                data = obj.read()
-                if data.m_Name == "WSREFDATA":
-                    # Update the script content directly
-                    data.m_Script = encrypted_data
-                    data.save()  # Save changes back to the object
-                    logger.debug("Updated WSREFDATA content")
-                    break
-
-        # Save the modified file with original packer
-        with open(file_path, "wb") as f:
-            f.write(env.file.save(packer="original"))
+        from asset_transaction import AssetTransaction
+
+        with AssetTransaction(file_path) as tx:
+            tx.stage_refdata("WSREFDATA", new_data)
         logger.debug("Saved modified assets file")
-    
@@ -0,0 +1,362 @@
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+SOCKET_PATH = Path(__file__).parent / "Cache" / "daemon.sock"
+PROTOCOL_VERSION = 1
+START_TIMEOUT = 30.0
+_STARTED = time.monotonic()
+# Environment variables that change how a command runs; commands only
+# forward to a daemon that was started with the same values
+LOCAL_ENV = ("HPT_CRYPTO_BACKEND", "HPT_DECRYPT_CACHE", "HPT_DECRYPT_CACHE_MB", "HPT_BACKUPS")
+
+
+class DaemonError(RuntimeError):
+    """Raised by DaemonClient when the daemon is unreachable or a request fails."""
+
+
+def socket_path() -> str:
+    """Socket path from $HPT_DAEMON_SOCKET, defaulting to Cache/daemon.sock."""
+    return os.environ.get("HPT_DAEMON_SOCKET") or str(SOCKET_PATH)
+
+
+def env_settings() -> dict[str, str]:
+    """This process's values of LOCAL_ENV, empty when unset."""
+    return {name: os.environ.get(name, "") for name in LOCAL_ENV}
+
+
+def _require_unix_sockets() -> None:
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonError("The daemon needs Unix domain sockets, which this platform does not provide")
+
+
+# JSON-RPC style methods: name -> callable taking keyword params
+METHODS = {}
+
+
+def method(name: str):
+    def register(func):
+        METHODS[name] = func
+        return func
+    return register
+
+
+@method("ping")
+def _ping() -> dict:
+    from crypto import SaveCrypto
+    return {
+        "pid": os.getpid(),
+        "protocol": PROTOCOL_VERSION,
+        "backend": SaveCrypto.get_backend(),
+        "uptime": time.monotonic() - _STARTED,
+        "env": env_settings(),
+    }
+
+
+@method("save.process")
+def _save_process(input: str, output: str, encrypt: bool, stream: bool = False) -> int:
+    from batch import process_save_file
+    return process_save_file(input, output, encrypt, stream)
+
+
+@method("save.load")
+def _save_load(path: str):
+    from crypto import SaveCrypto
+    with open(path, 'rb') as f:
+        return SaveCrypto.decrypt_json(f.read())
+
+
+@method("save.store")
+def _save_store(path: str, data) -> int:
+    from crypto import SaveCrypto
+    from utils import serialize_json
+    encrypted = SaveCrypto.encrypt(serialize_json(data))
+    with open(path, 'wb') as f:
+        f.write(encrypted)
+    return len(encrypted)
+
+
+@method("wsdir.process")
+def _wsdir_process(input: str, output: str, encrypt: bool) -> None:
+    from string_crypto import process_wsdir_file
+    process_wsdir_file(input, output, encrypt)
+
+
+@method("wsdir.load")
+def _wsdir_load(path: str) -> dict:
+    from string_crypto import StringCrypto
+    return StringCrypto.load_wsdir(path)
+
+
+@method("wsdir.store")
+def _wsdir_store(path: str, data: dict) -> None:
+    from string_crypto import StringCrypto
+    StringCrypto.save_wsdir(data, path)
+
+
+@method("string.encode")
+def _string_encode(text: str) -> str:
+    from string_crypto import StringCrypto
+    return StringCrypto.encode(text)
+
+
+@method("string.decode")
+def _string_decode(text: str) -> str:
+    from string_crypto import StringCrypto
+    return StringCrypto.decode(text)
+
+
+@method("refdata.extract")
+def _refdata_extract(path: str, use_index: bool = True) -> dict:
+    from crypto import SaveCrypto
+    data, name = SaveCrypto.extract_refdata(path, path, use_index=use_index)
+    return {"name": name, "data": data}
+
+
+@method("refdata.extract_file")
+def _refdata_extract_file(input: str, use_index: bool = True, stream: bool = False) -> str:
+    from refdata import extract_refdata_file
+    return extract_refdata_file(input, use_index=use_index, stream=stream)
+
+
+@method("refdata.encrypt_file")
+def _refdata_encrypt_file(
+    input: str,
+    stream: bool = False,
+    schema_from: str = None,
+    inject: str = None,
+    name: str = "WSREFDATA"
+) -> str:
+    from refdata import encrypt_refdata_file
+    return encrypt_refdata_file(input, stream=stream, schema_from=schema_from, inject=inject, name=name)
+
+
+@method("refdata.update")
+def _refdata_update(
+    assets: str,
+    changes: list[list[str]],
+    backup: bool = True,
+    in_place: bool = False,
+    append: bool = False,
+    verify: bool = False
+) -> int:
+    """Apply [name, path] pairs to assets in one transaction, like asset-update."""
+    from asset_transaction import AssetTransaction
+    with AssetTransaction(assets, backup=backup, in_place=in_place, append=append, verify=verify) as tx:
+        for name, path in changes:
+            tx.stage_file(name, path)
+    return len(changes)
+
+
+def warm_up() -> None:
+    """Import everything and build the ciphers once so requests skip startup."""
+    from crypto import SaveCrypto
+    import batch  # noqa: F401
+    import refdata  # noqa: F401
+    import string_crypto  # noqa: F401
+
+    backend = SaveCrypto.get_backend()
+    SaveCrypto.cipher_pool(SaveCrypto.SAVE_KEY).warm()
+    SaveCrypto.cipher_pool(SaveCrypto.REFDATA_KEY).warm()
+    if backend == "native":
+        # The streaming paths share one cipher per key
+        from native_crypto import NativeRijndael
+        NativeRijndael.for_key(SaveCrypto.SAVE_KEY)
+        NativeRijndael.for_key(SaveCrypto.REFDATA_KEY)
+    try:
+        import UnityPy  # noqa: F401
+    except ImportError:
+        logger.warning("UnityPy is not installed, refdata methods will fail")
+    logger.info(f"Daemon warmed up with the {backend} crypto backend")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Newline-delimited JSON: one request object per line, one response per line."""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.dispatch(line)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves METHODS over a Unix socket.
+
+    Connections are handled on their own threads; requests run one at a
+    time so the shared crypto state never sees concurrent use.
+
+    Request:  {"id": 1, "method": "save.load", "params": {"path": "..."}}
+    Response: {"id": 1, "result": ...} or {"id": 1, "error": {"type": ..., "message": ...}}
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str):
+        _require_unix_sockets()
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            probe = DaemonClient.connect(path)
+            if probe is not None:
+                probe.close()
+                raise DaemonError(f"A daemon is already listening on {path}")
+            os.remove(path)  # stale socket of a daemon that did not shut down cleanly
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o600)
+
+    def dispatch(self, line: bytes) -> dict:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            name = request.get("method")
+            func = METHODS.get(name)
+            if func is None:
+                raise DaemonError(f"Unknown method '{name}'")
+            params = request.get("params") or {}
+            start = time.perf_counter()
+            with self.lock:
+                result = func(**params)
+            logger.info(f"{name} done in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return {"id": request_id, "result": result}
+        except Exception as e:
+            logger.error(f"Daemon request failed: {str(e)}", exc_info=True)
+            return {"id": request_id, "error": {"type": type(e).__name__, "message": str(e)}}
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.remove(self.server_address)
+        except OSError:
+            pass
+
+
+def serve(path: str = None) -> None:
+    """Run the daemon in this process until a shutdown request arrives."""
+    path = path or socket_path()
+    warm_up()
+    server = DaemonServer(path)
+
+    @method("shutdown")
+    def _shutdown() -> None:
+        # shutdown() waits for serve_forever, so it cannot run on the handler thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    logger.info(f"Daemon {os.getpid()} listening on {path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        logger.info("Daemon stopped")
+
+
+def start_background(path: str = None, args: list[str] = (), timeout: float = START_TIMEOUT) -> dict:
+    """Start the daemon as a detached process and wait until it answers.
+
+    Args:
+        path (str): Socket path
+        args (list): Extra global CLI options for the daemon, e.g. ["--backend", "native"]
+
+    Returns:
+        dict: The daemon's ping response
+    """
+    import subprocess
+
+    _require_unix_sockets()
+    path = path or socket_path()
+    command = [
+        sys.executable, str(Path(__file__).parent / "cli.py"), *args,
+        "daemon", "start", "--foreground", "--socket", path
+    ]
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        client = DaemonClient.connect(path)
+        if client is not None:
+            with client:
+                return client.call("ping")
+        if process.poll() is not None:
+            raise DaemonError(f"Daemon exited with status {process.returncode}, see Logs/Editor.log")
+        time.sleep(0.05)
+    raise DaemonError(f"Daemon did not start listening on {path} within {timeout:.0f}s")
+
+
+class DaemonClient:
+    """Connection to a running daemon.
+
+    Usage:
+        client = DaemonClient.connect()
+        if client:
+            with client:
+                data = client.call("save.load", path="WS_save1.txt")
+    """
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+        self._next_id = 0
+
+    @classmethod
+    def connect(cls, path: str = None, timeout: float = None) -> 'DaemonClient | None':
+        """Connect to the daemon, or return None when none is running."""
+        if not hasattr(socket, "AF_UNIX"):
+            return None
+        path = path or socket_path()
+        if not os.path.exists(path):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path)
+        except OSError:
+            sock.close()
+            return None
+        return cls(sock)
+
+    def call(self, name: str, **params):
+        """Run a method on the daemon and return its result."""
+        self._next_id += 1
+        request = {"id": self._next_id, "method": name, "params": params}
+        try:
+            self.sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+            line = self.reader.readline()
+        except OSError as e:
+            raise DaemonError(f"Lost connection to daemon: {str(e)}") from e
+        if not line:
+            if name == "shutdown":
+                return None
+            raise DaemonError("Daemon closed the connection")
+        response = json.loads(line)
+        error = response.get("error")
+        if error:
+            raise DaemonError(f"{error['type']}: {error['message']}")
+        return response.get("result")
+
+    def close(self) -> None:
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self) -> 'DaemonClient':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
@@ -0,0 +1,185 @@
+import hashlib
+import marshal
+import os
+import threading
+import time
+from pathlib import Path
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_DIR = Path(__file__).parent / "Cache" / "decrypt"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+TEXT_SUFFIX = ".txt"
+PARSED_SUFFIX = ".marshal"
+# Eviction frees down to this share of max_bytes, so the next puts do not
+# cross the limit again straight away
+EVICT_TARGET = 0.9
+# Puts between rescans of the cache size, to pick up what other processes wrote
+RESCAN_PUTS = 256
+
+
+class DecryptCache:
+    """Content-addressed on-disk cache of decrypted payloads.
+
+    Entries are keyed by a hash of the key and the encrypted bytes, and hold
+    the decrypted text plus a marshal dump of the parsed JSON, which reloads
+    much faster than json.loads. The least recently used entries are evicted
+    once the cache grows beyond max_bytes; a hit refreshes the entry's mtime.
+    The size is tracked as a running total, so a put only scans the cache
+    directory when eviction is due or every RESCAN_PUTS puts.
+    """
+
+    def __init__(self, cache_dir: str | Path = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir else CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._puts = 0
+
+    @staticmethod
+    def make_key(encrypted: bytes | str | memoryview, key: str) -> str:
+        if isinstance(encrypted, str):
+            encrypted = encrypted.encode('utf-8', 'surrogateescape')
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=20)
+        digest.update(b'\0')
+        digest.update(encrypted)
+        return digest.hexdigest()
+
+    def _path(self, cache_key: str, suffix: str) -> Path:
+        return self.cache_dir / cache_key[:2] / f"{cache_key}{suffix}"
+
+    def _read(self, cache_key: str, suffix: str) -> bytes | None:
+        path = self._path(cache_key, suffix)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write(self, cache_key: str, suffix: str, data: bytes) -> None:
+        path = self._path(cache_key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Threads of one process may write the same entry at once
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)
+        self._added(len(data) - replaced)
+
+    def _added(self, size: int) -> None:
+        self._puts += 1
+        if self._size is None or self._puts % RESCAN_PUTS == 0:
+            self._size = sum(entry_size for _, entry_size, _ in self._entries())
+        else:
+            self._size += size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def get_text(self, cache_key: str) -> str | None:
+        data = self._read(cache_key, TEXT_SUFFIX)
+        return None if data is None else data.decode('utf-8', 'surrogatepass')
+
+    def get_parsed(self, cache_key: str):
+        """Return the cached parsed JSON, or None when not cached."""
+        data = self._read(cache_key, PARSED_SUFFIX)
+        if data is None:
+            return None
+        try:
+            return marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            logger.warning(f"Dropping corrupt decrypt cache entry {cache_key}")
+            self._path(cache_key, PARSED_SUFFIX).unlink(missing_ok=True)
+            return None
+
+    def put_text(self, cache_key: str, text: str) -> None:
+        self._write(cache_key, TEXT_SUFFIX, text.encode('utf-8', 'surrogatepass'))
+
+    def put_parsed(self, cache_key: str, parsed) -> None:
+        try:
+            data = marshal.dumps(parsed, 4)
+        except ValueError:
+            return
+        self._write(cache_key, PARSED_SUFFIX, data)
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        for path in self.cache_dir.glob("*/*"):
+            if path.suffix not in (TEXT_SUFFIX, PARSED_SUFFIX):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> int:
+        """Delete least recently used files once the cache exceeds max_bytes.
+
+        Returns:
+            int: Number of bytes freed
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        if total <= self.max_bytes:
+            self._size = total
+            return freed
+        target = int(self.max_bytes * EVICT_TARGET)
+        for _, size, path in sorted(entries):
+            if total - freed <= target:
+                break
+            try:
+                path.unlink()
+                freed += size
+            except OSError:
+                pass
+        self._size = total - freed
+        logger.debug(f"Evicted {freed} bytes from decrypt cache")
+        return freed
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        keys = {path.stem for _, _, path in entries}
+        return {
+            "path": str(self.cache_dir),
+            "entries": len(keys),
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "oldest_access": time.ctime(min(m for m, _, _ in entries)) if entries else None,
+            "newest_access": time.ctime(max(m for m, _, _ in entries)) if entries else None,
+        }
+
+    def clear(self) -> int:
+        """Remove every cached entry.
+
+        Returns:
+            int: Number of files removed
+        """
+        removed = 0
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        self._size = None
+        return removed
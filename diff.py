@@ -0,0 +1,221 @@
+import difflib
+import hashlib
+import json
+from dataclasses import dataclass
+
+from mods import detect_id_field
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+
+@dataclass
+class Change:
+    """One path-level difference between two documents.
+
+    path uses the mod path format: list items matched by ID are addressed
+    by their ID, other list items by their index (in the old list for
+    removals, in the new list otherwise).
+    """
+    op: str
+    path: str
+    old: object = None
+    new: object = None
+
+    def to_dict(self) -> dict:
+        result = {"op": self.op, "path": self.path}
+        if self.op != ADDED:
+            result["old"] = self.old
+        if self.op != REMOVED:
+            result["new"] = self.new
+        return result
+
+    def __str__(self) -> str:
+        if self.op == ADDED:
+            return f"+ {self.path}: {_preview(self.new)}"
+        if self.op == REMOVED:
+            return f"- {self.path}: {_preview(self.old)}"
+        return f"~ {self.path}: {_preview(self.old)} -> {_preview(self.new)}"
+
+
+def _preview(value, limit: int = 80) -> str:
+    text = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _join(path: str, segment) -> str:
+    segment = str(segment).replace("~", "~0").replace("/", "~1")
+    return f"{path}/{segment}" if path else segment
+
+
+class SubtreeHasher:
+    """blake2b digests of JSON subtrees, memoized per container.
+
+    Subtrees are serialized canonically (sorted keys) by the C JSON encoder
+    before hashing, so equal subtrees get equal digests wherever they sit.
+    """
+
+    def __init__(self):
+        # id() -> (node, digest); the node is kept so its id is not reused
+        self._memo = {}
+        self._encode = json.JSONEncoder(
+            sort_keys=True, separators=(',', ':'), ensure_ascii=False, check_circular=False
+        ).encode
+
+    def digest(self, node) -> bytes:
+        hit = self._memo.get(id(node))
+        if hit is not None and hit[0] is node:
+            return hit[1]
+        digest = hashlib.blake2b(
+            self._encode(node).encode('utf-8', 'surrogatepass'), digest_size=16
+        ).digest()
+        if isinstance(node, (dict, list)):
+            self._memo[id(node)] = (node, digest)
+        return digest
+
+
+class StructuralDiff:
+    """Path-level diff of two parsed JSON documents.
+
+    Only branches that differ are descended into. List items are matched by
+    an ID field when every item has a unique one, otherwise they are aligned
+    on their subtree digests so an insertion is reported as one added item.
+
+    Usage:
+        changes = StructuralDiff().diff(old_save, new_save)
+        for change in changes:
+            print(change)
+    """
+
+    def __init__(self, id_fields: list[str] = None):
+        """
+        Args:
+            id_fields (list): ID field names tried before auto-detection when
+                matching list items
+        """
+        self.id_fields = list(id_fields or [])
+        self.hasher = SubtreeHasher()
+
+    def diff(self, old, new) -> list[Change]:
+        changes = []
+        self._diff(old, new, "", changes)
+        logger.debug(f"Found {len(changes)} changes")
+        return changes
+
+    def _same(self, old, new) -> bool:
+        # Equal branches are skipped at C speed without being walked. Python
+        # equality treats 1, 1.0 and True alike, so equal containers are only
+        # the same when their digests match too
+        if old != new or type(old) is not type(new):
+            return False
+        return not isinstance(old, (dict, list)) or self.hasher.digest(old) == self.hasher.digest(new)
+
+    def _diff(self, old, new, path: str, changes: list) -> None:
+        if self._same(old, new):
+            return
+        if isinstance(old, dict) and isinstance(new, dict):
+            self._diff_dict(old, new, path, changes)
+        elif isinstance(old, list) and isinstance(new, list):
+            self._diff_list(old, new, path, changes)
+        else:
+            changes.append(Change(MODIFIED, path or "/", old, new))
+
+    def _diff_dict(self, old: dict, new: dict, path: str, changes: list) -> None:
+        for key in old:
+            if key not in new:
+                changes.append(Change(REMOVED, _join(path, key), old=old[key]))
+        for key, value in new.items():
+            if key not in old:
+                changes.append(Change(ADDED, _join(path, key), new=value))
+            else:
+                self._diff(old[key], value, _join(path, key), changes)
+
+    def _id_field(self, old: list, new: list) -> str | None:
+        """Field that uniquely identifies every item of both lists, if any."""
+        items = old + new
+        if not items or not all(isinstance(item, dict) for item in items):
+            return None
+        candidates = self.id_fields + [detect_id_field(items[0])]
+        for field in candidates:
+            if not field:
+                continue
+            for records in (old, new):
+                ids = [record.get(field) for record in records]
+                if None in ids or len(set(map(str, ids))) != len(ids):
+                    break
+            else:
+                return field
+        return None
+
+    def _diff_list(self, old: list, new: list, path: str, changes: list) -> None:
+        id_field = self._id_field(old, new)
+        if id_field:
+            old_by_id = {str(record[id_field]): record for record in old}
+            new_by_id = {str(record[id_field]): record for record in new}
+            for record_id, record in old_by_id.items():
+                if record_id not in new_by_id:
+                    changes.append(Change(REMOVED, _join(path, record_id), old=record))
+            for record_id, record in new_by_id.items():
+                if record_id in old_by_id:
+                    self._diff(old_by_id[record_id], record, _join(path, record_id), changes)
+                else:
+                    changes.append(Change(ADDED, _join(path, record_id), new=record))
+            return
+
+        # No IDs: skip the equal head and tail, then align the rest on
+        # subtree digests so an insertion does not show up as every later
+        # item being modified
+        start = 0
+        limit = min(len(old), len(new))
+        while start < limit and self._same(old[start], new[start]):
+            start += 1
+        end = 0
+        while end < limit - start and self._same(old[-1 - end], new[-1 - end]):
+            end += 1
+        old_middle = old[start:len(old) - end]
+        new_middle = new[start:len(new) - end]
+
+        digest = self.hasher.digest
+        matcher = difflib.SequenceMatcher(
+            None, [digest(item) for item in old_middle], [digest(item) for item in new_middle], autojunk=False
+        )
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+            for k in range(paired):
+                self._diff(old_middle[i1 + k], new_middle[j1 + k], _join(path, start + j1 + k), changes)
+            for i in range(i1 + paired, i2):
+                changes.append(Change(REMOVED, _join(path, start + i), old=old_middle[i]))
+            for j in range(j1 + paired, j2):
+                changes.append(Change(ADDED, _join(path, start + j), new=new_middle[j]))
+
+
+def load_document(path: str):
+    """Parse a JSON file, an encrypted save, or the WSREFDATA of an assets file."""
+    from crypto import SaveCrypto
+
+    lower = path.lower()
+    if lower.endswith(('.asset', '.assets')):
+        return SaveCrypto.extract_refdata(path, path)[0]
+    if lower.endswith('.json'):
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return json.load(f)
+    with open(path, 'rb') as f:
+        return SaveCrypto.decrypt_json(f.read())
+
+
+def diff_files(old_path: str, new_path: str, id_fields: list[str] = None) -> list[Change]:
+    """Decrypt or parse both files and diff them."""
+    return StructuralDiff(id_fields).diff(load_document(old_path), load_document(new_path))
+
+
+def summarize(changes: list[Change]) -> str:
+    counts = {op: 0 for op in (MODIFIED, ADDED, REMOVED)}
+    for change in changes:
+        counts[change.op] += 1
+    return ", ".join(f"{count} {op}" for op, count in counts.items())
@@ -0,0 +1,87 @@
+import codecs
+
+
+def _dotnet_replace(error):
+    """Replace unencodable/undecodable input with U+FFFD like .NET's UTF8Encoding.
+
+    The UTF-8 encoder only takes ASCII str replacements, so lone surrogates
+    are replaced with the encoded EF BF BD, one per surrogate.
+    """
+    if isinstance(error, UnicodeEncodeError):
+        return b'\xef\xbf\xbd' * (error.end - error.start), error.end
+    return '\ufffd', error.end
+
+
+codecs.register_error('dotnet_replace', _dotnet_replace)
+
+
+def read_7bit_int(view: memoryview, pos: int = 0) -> tuple[int, int]:
+    """Read a .NET 7-bit encoded Int32 starting at pos.
+
+    Returns:
+        tuple: (value, position after the encoded integer)
+    """
+    result = 0
+    shift = 0
+    while True:
+        if shift == 35:
+            raise ValueError("Bad 7-bit encoded Int32 format")
+        if pos >= len(view):
+            raise EOFError("Unable to read beyond the end of the stream")
+        byte = view[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    if result >= 1 << 31:
+        result -= 1 << 32
+    return result, pos
+
+
+def read_7bit_int_from(fp) -> int:
+    """Read a .NET 7-bit encoded Int32 from a binary file object."""
+    encoded = bytearray()
+    while not encoded or encoded[-1] & 0x80:
+        if len(encoded) == 5:
+            raise ValueError("Bad 7-bit encoded Int32 format")
+        byte = fp.read(1)
+        if not byte:
+            raise EOFError("Unable to read beyond the end of the stream")
+        encoded += byte
+    return read_7bit_int(memoryview(encoded))[0]
+
+
+def write_7bit_int(value: int) -> bytes:
+    """Encode an Int32 the way BinaryWriter.Write7BitEncodedInt does."""
+    value &= 0xFFFFFFFF
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def read_prefixed_bytes(data: bytes | bytearray | memoryview) -> memoryview:
+    """Return the payload of a BinaryWriter length-prefixed string without copying."""
+    view = memoryview(data)
+    length, pos = read_7bit_int(view)
+    if length < 0:
+        raise ValueError(f"Invalid string length: {length}")
+    end = pos + length
+    if end > len(view):
+        raise EOFError("Unable to read beyond the end of the stream")
+    return view[pos:end]
+
+
+def read_dotnet_string(data: bytes | bytearray | memoryview) -> str:
+    """Equivalent of BinaryReader.ReadString() for UTF-8 encoded data."""
+    return str(read_prefixed_bytes(data), 'utf-8', 'dotnet_replace')
+
+
+def write_dotnet_string(value: str | bytes) -> bytes:
+    """Equivalent of BinaryWriter.Write(string) for UTF-8 encoded data."""
+    if isinstance(value, str):
+        value = value.encode('utf-8', 'dotnet_replace')
+    return write_7bit_int(len(value)) + value
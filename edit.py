@@ -0,0 +1,470 @@
+import json
+import math
+import os
+import re
+import time
+from dataclasses import dataclass, field
+
+from crypto import SaveCrypto
+from diff import MODIFIED, REMOVED, Change
+from utils import serialize_json
+from logger import get_logger
+from profiler import stage
+
+logger = get_logger(__name__)
+
+OPS = ("set", "inc", "mul", "remove")
+FILTER = re.compile(r'^\s*([^<>=!~]+?)\s*(>=|<=|!=|=|<|>|~)\s*(.*?)\s*$')
+
+
+class EditError(ValueError):
+    """Raised when an edit expression is malformed or cannot be applied."""
+
+
+def parse_value(text: str):
+    """Parse a command-line value as a JSON literal, falling back to a plain string."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def _number(value) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+@dataclass(frozen=True)
+class Filter:
+    """One field comparison inside [...] that a node must satisfy.
+
+    field is a '.'-separated path relative to the node; numbers (and
+    numeric strings) compare numerically, ~ is a case-insensitive
+    substring match.
+    """
+    field: tuple[str, ...]
+    op: str
+    value: object
+
+    @classmethod
+    def parse(cls, text: str) -> 'Filter':
+        match = FILTER.match(text)
+        if not match:
+            raise EditError(f"Bad filter '{text}', expected e.g. level>=30 or name~smith")
+        name, op, value = match.groups()
+        return cls(tuple(name.split(".")), op, parse_value(value))
+
+    def test(self, node) -> bool:
+        for key in self.field:
+            if isinstance(node, dict) and key in node:
+                node = node[key]
+            elif isinstance(node, list) and key.isdigit() and int(key) < len(node):
+                node = node[int(key)]
+            else:
+                return self.op == "!="
+        if self.op == "~":
+            return str(self.value).lower() in str(node).lower()
+        left, right = _number(node), _number(self.value)
+        if left is None or right is None:
+            left, right = node, self.value
+            if self.op not in ("=", "!="):
+                left, right = str(left), str(right)
+        if self.op == "=":
+            return left == right
+        if self.op == "!=":
+            return left != right
+        if self.op == ">":
+            return left > right
+        if self.op == "<":
+            return left < right
+        if self.op == ">=":
+            return left >= right
+        return left <= right
+
+
+@dataclass(frozen=True)
+class Step:
+    """One '/'-separated segment of a path expression.
+
+    kind is "key" (a member name or list index), "any" (*) or "deep"
+    (**, zero or more levels).
+    """
+    kind: str
+    key: str = None
+    filters: tuple[Filter, ...] = ()
+
+    def children(self, node):
+        if isinstance(node, dict):
+            if self.kind == "key":
+                return [self.key] if self.key in node else []
+            return list(node)
+        if isinstance(node, list):
+            if self.kind == "key":
+                return [int(self.key)] if self.key.isdigit() and int(self.key) < len(node) else []
+            return list(range(len(node)))
+        return []
+
+    def accepts(self, node) -> bool:
+        return all(f.test(node) for f in self.filters)
+
+
+def _split(text: str, separator: str) -> list[str]:
+    """Split text on separator outside [...] filters."""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+            if depth < 0:
+                raise EditError(f"Unbalanced ']' in '{text}'")
+        elif char == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    if depth:
+        raise EditError(f"Unbalanced '[' in '{text}'")
+    parts.append(text[start:])
+    return parts
+
+
+def _parse_step(segment: str) -> Step:
+    filters = []
+    head = segment
+    bracket = segment.find("[")
+    if bracket >= 0:
+        head = segment[:bracket]
+        rest = segment[bracket:]
+        for part in re.findall(r'\[([^\]]*)\]', rest):
+            filters.extend(Filter.parse(condition) for condition in part.split("&"))
+        if re.sub(r'\[[^\]]*\]', "", rest):
+            raise EditError(f"Unexpected text after filter in '{segment}'")
+    head = head.replace("~1", "/").replace("~0", "~")
+    if head == "**":
+        if filters:
+            raise EditError("** cannot be filtered, filter the next segment instead")
+        return Step("deep")
+    if head == "*":
+        return Step("any", filters=tuple(filters))
+    if not head:
+        raise EditError(f"Empty segment '{segment}'")
+    return Step("key", head, tuple(filters))
+
+
+class PathExpression:
+    """A path with wildcards and filters, compiled once and matched against any document.
+
+    Uses the mod path format (see mods.parse_path) plus:
+        *            every member of a map or item of a list
+        **           any number of levels, including none
+        [field op v] keep only nodes whose field compares true; combine
+                     conditions with & and nest fields with '.'
+
+    Example:
+        heroes/*[level>=30 & name~smith]/xp
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.steps = tuple(_parse_step(segment) for segment in _split(text.strip("/"), "/"))
+        if self.steps[-1].kind == "deep":
+            raise EditError(f"'{text}' cannot end with **")
+
+    def __repr__(self) -> str:
+        return f"PathExpression({self.text!r})"
+
+    def find(self, document) -> list[tuple[object, object, str]]:
+        """Return (container, key, path) for every node the expression matches, in document order."""
+        matches = []
+        seen = set()
+        self._walk(document, 0, [], matches, seen)
+        return matches
+
+    def _walk(self, node, index: int, trail: list, matches: list, seen: set) -> None:
+        step = self.steps[index]
+        if step.kind == "deep":
+            self._walk(node, index + 1, trail, matches, seen)
+            for key in Step("any").children(node):
+                child = node[key]
+                if isinstance(child, (dict, list)):
+                    self._walk(child, index, trail + [key], matches, seen)
+            return
+        last = index == len(self.steps) - 1
+        for key in step.children(node):
+            child = node[key]
+            if not step.accepts(child):
+                continue
+            if last:
+                # ** can reach the same node along several routes
+                marker = (id(node), key)
+                if marker not in seen:
+                    seen.add(marker)
+                    matches.append((node, key, _format_path(trail + [key])))
+            elif isinstance(child, (dict, list)):
+                self._walk(child, index + 1, trail + [key], matches, seen)
+
+
+def _format_path(trail: list) -> str:
+    return "/".join(str(key).replace("~", "~0").replace("/", "~1") for key in trail)
+
+
+@dataclass(frozen=True)
+class Edit:
+    """One operation applied to every node matched by its path expression."""
+    op: str
+    path: PathExpression
+    value: object = None
+
+    @classmethod
+    def parse(cls, text: str) -> 'Edit':
+        """Parse EXPR=VALUE, EXPR+=N or EXPR*=N from the command line."""
+        depth = 0
+        for i, char in enumerate(text):
+            if char == "[":
+                depth += 1
+            elif char == "]":
+                depth -= 1
+            elif char == "=" and depth == 0:
+                # The first '=' outside a filter separates the path from the value
+                path, value = text[:i], text[i + 1:]
+                op = "set"
+                if path.endswith("+"):
+                    op, path = "inc", path[:-1]
+                elif path.endswith("*") and path != "*" and not path.endswith("/*"):
+                    op, path = "mul", path[:-1]
+                return cls.create(op, path.strip(), parse_value(value))
+        raise EditError(f"Bad edit '{text}', expected EXPR=VALUE, EXPR+=N or EXPR*=N")
+
+    @classmethod
+    def create(cls, op: str, path: str, value=None) -> 'Edit':
+        if op not in OPS:
+            raise EditError(f"Unknown op '{op}', expected one of {', '.join(OPS)}")
+        if op in ("inc", "mul"):
+            number = _number(value)
+            if number is None or not math.isfinite(number):
+                raise EditError(f"{op} needs a number, got {value!r}")
+            # A numeric string such as "5" is applied as the number it holds
+            value = int(number) if isinstance(value, str) and number.is_integer() else number
+        return cls(op, PathExpression(path), value)
+
+    @classmethod
+    def load(cls, path: str) -> list['Edit']:
+        """Load an edit script: a JSON list of {"op", "path", "value"} like a mod's ops."""
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("ops")
+        if not isinstance(data, list):
+            raise EditError(f"{path} does not contain a list of edits")
+        return [cls.create(item.get("op"), item.get("path", ""), item.get("value")) for item in data]
+
+    def compute(self, old, path: str):
+        if self.op == "set":
+            return self.value
+        number = _number(old)
+        if number is None:
+            raise EditError(f"Cannot {self.op} non-numeric value {old!r} at {path}")
+        result = number + self.value if self.op == "inc" else number * self.value
+        if isinstance(old, int) and not isinstance(old, bool):
+            # Integer fields stay integers, the game cannot load 1.5 into an int
+            result = int(round(result))
+        if isinstance(old, str):
+            # In-game numbers stored as strings stay strings
+            return str(int(result)) if float(result).is_integer() else str(result)
+        return result
+
+
+def apply_edits(document, edits: list[Edit]) -> list[Change]:
+    """Apply edits in order to document in place.
+
+    Returns:
+        list: One Change per node that was set, updated or removed
+    """
+    changes = []
+    for edit in edits:
+        matches = edit.path.find(document)
+        if edit.op == "remove":
+            # Later list items first so earlier indices stay valid
+            for container, key, path in sorted(
+                matches, key=lambda m: m[1] if isinstance(m[1], int) else -1, reverse=True
+            ):
+                changes.append(Change(REMOVED, path, old=container[key]))
+                del container[key]
+            continue
+        for container, key, path in matches:
+            old = container[key]
+            new = edit.compute(old, path)
+            if new != old or type(new) is not type(old):
+                container[key] = new
+                changes.append(Change(MODIFIED, path, old, new))
+    return changes
+
+
+@dataclass
+class FileEdit:
+    """Outcome of editing one save."""
+    path: str
+    changes: list[Change] = field(default_factory=list)
+    output: str = None
+    error: str = None
+
+
+def edit_save_file(input_file: str, edits: list[Edit], output_file: str = None, dry_run: bool = False) -> FileEdit:
+    """Decrypt a save once, apply every edit and encrypt it again.
+
+    Args:
+        output_file (str): Where to write the result, the input file by default
+        dry_run (bool): Only report what would change
+    """
+    with stage("read"), open(input_file, 'rb') as f:
+        data = SaveCrypto.decrypt_json(f.read())
+    with stage("edit"):
+        changes = apply_edits(data, edits)
+    result = FileEdit(input_file, changes)
+    if changes and not dry_run:
+        from backup_store import snapshot_before_write
+
+        output_file = output_file or input_file
+        encrypted = SaveCrypto.encrypt(serialize_json(data))
+        snapshot_before_write(output_file, "edit")
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        tmp_path = f"{output_file}.{os.getpid()}.tmp"
+        try:
+            with stage("write"), open(tmp_path, 'wb') as f:
+                f.write(encrypted)
+            os.replace(tmp_path, output_file)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        result.output = output_file
+    return result
+
+
+_EDITS = None
+
+
+def _init_worker(backend: str, cache, edits: list[Edit]) -> None:
+    """Warm the crypto state and receive the compiled edits once per worker."""
+    global _EDITS
+    from batch import _init_worker as init_crypto
+
+    init_crypto(backend, cache)
+    _EDITS = edits
+
+
+def _run_one(input_file: str, output_file: str, dry_run: bool) -> FileEdit:
+    try:
+        return edit_save_file(input_file, _EDITS, output_file, dry_run)
+    except Exception as e:
+        return FileEdit(input_file, error=f"{type(e).__name__}: {e}")
+
+
+@dataclass
+class EditResult:
+    """Summary of an edit run over many saves."""
+    files: list[FileEdit] = field(default_factory=list)
+    dry_run: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def matched(self) -> int:
+        return sum(len(f.changes) for f in self.files)
+
+    @property
+    def changed(self) -> int:
+        return sum(1 for f in self.files if f.changes and not f.error)
+
+    @property
+    def failures(self) -> list[FileEdit]:
+        return [f for f in self.files if f.error]
+
+    def summary(self) -> str:
+        verb = "Would change" if self.dry_run else "Changed"
+        lines = [
+            f"{verb} {self.matched} nodes in {self.changed} of {len(self.files)} files "
+            f"in {self.elapsed:.2f}s ({len(self.failures)} failed)"
+        ]
+        for f in self.failures:
+            lines.append(f"FAILED {f.path}: {f.error}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            "dry_run": self.dry_run,
+            "files": [
+                {
+                    "path": f.path,
+                    "output": f.output,
+                    "error": f.error,
+                    "changes": [change.to_dict() for change in f.changes],
+                }
+                for f in self.files
+            ],
+        }
+
+
+def edit_files(
+    sources: list[str],
+    edits: list[Edit],
+    output_dir: str = None,
+    workers: int = None,
+    dry_run: bool = False,
+    progress=None
+) -> EditResult:
+    """Apply compiled edits to every save matched by sources using a process pool.
+
+    Args:
+        sources (list): Directories, files or glob patterns of WS_*.txt saves
+        output_dir (str): Mirror tree root; saves are edited in place if omitted
+        workers (int): Pool size, defaults to the number of cores
+        dry_run (bool): Report matched nodes without writing anything
+        progress (callable): Optional callback(done, total) after each file
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from batch import collect_inputs
+
+    inputs = collect_inputs(sources, encrypt=False)
+    result = EditResult(dry_run=dry_run)
+    if not inputs:
+        return result
+
+    def output_for(path: str, base_dir: str) -> str | None:
+        if not output_dir:
+            return None
+        return os.path.join(output_dir, os.path.relpath(path, base_dir or "."))
+
+    start = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, len(inputs))
+    logger.info(f"Applying {len(edits)} edits to {len(inputs)} saves on {workers} workers")
+    if workers == 1:
+        _init_worker(SaveCrypto.get_backend(), SaveCrypto.get_cache() or False, edits)
+        for done, (path, base_dir) in enumerate(inputs, 1):
+            result.files.append(_run_one(path, output_for(path, base_dir), dry_run))
+            if progress:
+                progress(done, len(inputs))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(SaveCrypto.get_backend(), SaveCrypto.get_cache() or False, edits)
+        ) as pool:
+            futures = [
+                pool.submit(_run_one, path, output_for(path, base_dir), dry_run)
+                for path, base_dir in inputs
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                result.files.append(future.result())
+                if progress:
+                    progress(done, len(inputs))
+    result.elapsed = time.perf_counter() - start
+    result.files.sort(key=lambda f: f.path)
+    for f in result.failures:
+        logger.error(f"Error editing {f.path}: {f.error}")
+    return result
@@ -0,0 +1,261 @@
+"""Incremental JSON event parser.
+
+Consumes JSON text in arbitrary chunks and yields (event, value) pairs
+without ever holding the whole document, so decrypted saves can be
+inspected while they are still being decrypted.
+
+Events:
+    start_map, end_map, start_array, end_array   value is None
+    map_key                                      value is the key
+    string, number, boolean, null                value is the parsed scalar
+"""
+import re
+from json.decoder import scanstring
+
+# One match per value: the separator before it (if any) is folded into the
+# same match, which halves the number of regex calls. Strings may not hold
+# raw control characters, like json.loads
+_TOKEN = re.compile(
+    r'[ \t\r\n]*([,:]?)[ \t\r\n]*(?:'
+    r'([{}\[\]])'
+    r'|"([^"\\\x00-\x1f]*(?:\\[^\x00-\x1f][^"\\\x00-\x1f]*)*)"'
+    r'|(-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?)'
+    r'|(true|false|null)'
+    r')',
+    re.DOTALL
+)
+# A string that is valid so far but not closed yet
+_OPEN_STRING = re.compile(r'"[^"\\\x00-\x1f]*(?:\\[^\x00-\x1f][^"\\\x00-\x1f]*)*\\?')
+_CONTROL = re.compile(r'[\x00-\x1f]')
+_PREFIX = re.compile(r'[ \t\r\n]*[,:]?[ \t\r\n]*')
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+_LITERALS = {"true": True, "false": False, "null": None}
+
+# Parser states
+_VALUE = 0          # a value is required
+_VALUE_OR_END = 1   # just after '['
+_KEY_OR_END = 2     # just after '{'
+_KEY = 3            # after ',' in a map
+_COLON = 4
+_COMMA_OR_END = 5
+_DONE = 6
+
+
+class JsonEventError(ValueError):
+    """Raised when the text is not valid JSON."""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(f"{message} at offset {offset}")
+        self.offset = offset
+
+
+def _number(text: str):
+    if "." in text or "e" in text or "E" in text:
+        return float(text)
+    return int(text)
+
+
+class JsonEventParser:
+    """Push parser: feed() text chunks, get back the events they complete.
+
+    Usage:
+        parser = JsonEventParser()
+        for chunk in chunks:
+            for event, value in parser.feed(chunk):
+                ...
+        for event, value in parser.close():
+            ...
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._offset = 0  # offset of _buffer[0] in the whole document
+        self._stack = []  # "map" or "array" for every open container
+        self._state = _VALUE
+
+    @property
+    def depth(self) -> int:
+        """Number of containers currently open."""
+        return len(self._stack)
+
+    def feed(self, chunk: str) -> list[tuple[str, object]]:
+        self._buffer += chunk
+        return self._parse(final=False)
+
+    def close(self) -> list[tuple[str, object]]:
+        """Parse what is left and check that the document is complete."""
+        events = self._parse(final=True)
+        if self._state != _DONE:
+            raise JsonEventError("Unexpected end of JSON", self._offset)
+        return events
+
+    def _parse(self, final: bool) -> list[tuple[str, object]]:
+        buffer = self._buffer
+        size = len(buffer)
+        offset = self._offset
+        stack = self._stack
+        state = self._state
+        pos = 0
+        events = []
+        append = events.append
+        match = _TOKEN.match
+        while True:
+            token = match(buffer, pos)
+            if token is None:
+                end = _PREFIX.match(buffer, pos).end()
+                if not final and (end == size or self._could_continue(buffer, end)):
+                    # A token split across chunks: wait for the rest
+                    break
+                if end == size and _WHITESPACE.match(buffer, pos).end() == size:
+                    pos = size
+                    break
+                if end < size and buffer[end] == '"':
+                    control = _CONTROL.search(buffer, end)
+                    if control is not None:
+                        raise JsonEventError("Invalid control character in string", offset + control.start())
+                raise JsonEventError(
+                    f"Unexpected {repr(buffer[end]) if end < size else 'end of JSON'}", offset + end
+                )
+            group = token.lastindex
+            end = token.end()
+            if not final and (end == size or group == 4 and buffer[end] in ".eE+-"):
+                # The token may continue in the next chunk
+                break
+            separator = token.group(1)
+            if separator:
+                if separator == ",":
+                    if state != _COMMA_OR_END or not stack:
+                        raise JsonEventError("Unexpected ','", offset + token.start(1))
+                    state = _KEY if stack[-1] == "map" else _VALUE
+                else:
+                    if state != _COLON:
+                        raise JsonEventError("Unexpected ':'", offset + token.start(1))
+                    state = _VALUE
+            start = token.start(group)
+            if group == 3:
+                value = token.group(3)
+                if "\\" in value:
+                    value = scanstring(buffer, start)[0]
+                if state == _KEY_OR_END or state == _KEY:
+                    state = _COLON
+                    append(("map_key", value))
+                elif state <= _VALUE_OR_END:
+                    state = _COMMA_OR_END if stack else _DONE
+                    append(("string", value))
+                else:
+                    raise JsonEventError("Unexpected string", offset + start - 1)
+            elif group == 2:
+                bracket = token.group(2)
+                if bracket == "{" or bracket == "[":
+                    if state > _VALUE_OR_END:
+                        raise JsonEventError(f"Unexpected {bracket!r}", offset + start)
+                    if bracket == "{":
+                        stack.append("map")
+                        state = _KEY_OR_END
+                        append(("start_map", None))
+                    else:
+                        stack.append("array")
+                        state = _VALUE_OR_END
+                        append(("start_array", None))
+                else:
+                    kind = "map" if bracket == "}" else "array"
+                    allowed = _KEY_OR_END if kind == "map" else _VALUE_OR_END
+                    if state != _COMMA_OR_END and state != allowed or not stack or stack[-1] != kind:
+                        raise JsonEventError(f"Unexpected {bracket!r}", offset + start)
+                    stack.pop()
+                    state = _COMMA_OR_END if stack else _DONE
+                    append(("end_" + kind, None))
+            else:
+                if state > _VALUE_OR_END:
+                    raise JsonEventError("Unexpected value", offset + start)
+                state = _COMMA_OR_END if stack else _DONE
+                if group == 4:
+                    append(("number", _number(token.group(4))))
+                else:
+                    value = _LITERALS[token.group(5)]
+                    append(("null" if value is None else "boolean", value))
+            pos = end
+
+        self._buffer = buffer[pos:]
+        self._offset = offset + pos
+        self._state = state
+        return events
+
+    @staticmethod
+    def _could_continue(buffer: str, pos: int) -> bool:
+        """Whether the unmatched tail of a chunk may still become a token."""
+        head = buffer[pos]
+        if head == '"':
+            return _OPEN_STRING.fullmatch(buffer, pos) is not None
+        if head == "-" or head.isdigit():
+            return True
+        return any(literal.startswith(buffer[pos:]) for literal in _LITERALS)
+
+
+def iter_events(chunks):
+    """Yield (event, value) pairs for JSON text arriving as an iterable of str chunks."""
+    parser = JsonEventParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def build_value(events):
+    """Assemble the next complete value from an event iterator."""
+    event, value = next(events)
+    return _build(event, value, events)
+
+
+def _build(event: str, value, events):
+    if event == "start_map":
+        result = {}
+        for event, key in events:
+            if event == "end_map":
+                break
+            result[key] = build_value(events)
+        return result
+    if event == "start_array":
+        result = []
+        for event, value in events:
+            if event == "end_array":
+                break
+            result.append(_build(event, value, events))
+        return result
+    return value
+
+
+def skip_value(events) -> None:
+    """Consume the events of the next value without building it."""
+    depth = 0
+    for event, _ in events:
+        if event == "start_map" or event == "start_array":
+            depth += 1
+        elif event == "end_map" or event == "end_array":
+            depth -= 1
+        if depth == 0:
+            return
+
+
+def iter_items(events, keys=None):
+    """Yield (key, value) for the top-level members of a JSON object, one at a time.
+
+    Only one member is built at once, so a huge save can be walked key by
+    key. When keys is given, other members are skipped without being built
+    and iteration stops as soon as every requested key has been seen.
+    """
+    events = iter(events)
+    event, _ = next(events)
+    if event != "start_map":
+        raise ValueError("Expected a JSON object")
+    wanted = set(keys) if keys is not None else None
+    for event, key in events:
+        if event == "end_map":
+            return
+        if wanted is None or key in wanted:
+            yield key, build_value(events)
+            if wanted is not None:
+                wanted.discard(key)
+                if not wanted:
+                    return
+        else:
+            skip_value(events)
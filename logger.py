@@ -1,26 +1,144 @@
+import atexit
 import logging
+import os
+import queue
+import threading
+from collections import Counter
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
 from pathlib import Path
 
-def setup_logging():
-    """Setup logging to file"""
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+DEFAULT_LEVEL = "INFO"
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 3
+FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+
+_listener = None
+_queue_handler = None
+_log_file = None
+_report_in_worker = False
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def _resolve_level(level: str = None) -> int:
+    name = (level or os.environ.get("HPT_LOG_LEVEL") or DEFAULT_LEVEL).upper()
+    if name not in LEVELS:
+        raise ValueError(f"Unknown log level '{name}', expected one of {', '.join(LEVELS)}")
+    return getattr(logging, name)
+
+
+def setup_logging(level: str = None):
+    """Setup logging to file and console through a background writer thread.
+
+    Records are put on a queue by the calling thread and formatted and
+    written by a QueueListener, so a slow disk or terminal never stalls
+    the hot path. Logs/Editor.log rotates at MAX_LOG_BYTES.
+
+    Args:
+        level (str): DEBUG, INFO, WARNING or ERROR; defaults to
+            $HPT_LOG_LEVEL, then INFO. Records below it are dropped before
+            their message is formatted.
+    """
+    global _listener, _queue_handler, _log_file
     log_dir = Path(__file__).parent / "Logs"
     log_dir.mkdir(exist_ok=True)
-    
-    log_file = log_dir / "Editor.log"
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s [%(levelname)s] %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
-    logging.info("="*50)
-    logging.info(f"Holy Potatoes Tools Started - {datetime.now()}")
-    logging.info("="*50)
+
+    log_file = _log_file = log_dir / "Editor.log"
+    root = logging.getLogger()
+    root.setLevel(_resolve_level(level))
+    if _listener is not None:
+        return log_file
+
+    max_bytes = int(os.environ.get("HPT_LOG_MAX_MB", 0)) * 1024 * 1024 or MAX_LOG_BYTES
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=LOG_BACKUPS, encoding='utf-8')
+    handlers = (file_handler, logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(FORMAT))
+
+    _queue_handler = QueueHandler(queue.SimpleQueue())
+    root.addHandler(_queue_handler)
+    _listener = QueueListener(_queue_handler.queue, *handlers)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    logging.info("=" * 50)
+    logging.info("Holy Potatoes Tools Started - %s", datetime.now())
+    logging.info("=" * 50)
     return log_file
 
+
+def shutdown_logging() -> None:
+    """Log the run counters and wait until every queued record is written."""
+    global _listener
+    if _listener is None:
+        return
+    log_counters()
+    _listener.stop()
+    _listener = None
+
+
+def _after_fork() -> None:
+    # A forked worker inherits the queue handler but not the writer thread,
+    # and worker processes end with os._exit, which would drop queued
+    # records; write directly from workers instead. Only the parent rotates
+    # Editor.log, workers append and reopen the file once it was rotated
+    global _listener, _queue_handler, _report_in_worker, _counters_lock
+    if _listener is not None:
+        root = logging.getLogger()
+        root.removeHandler(_queue_handler)
+        for handler in (WatchedFileHandler(_log_file, mode='a', encoding='utf-8'), logging.StreamHandler()):
+            handler.setFormatter(logging.Formatter(FORMAT))
+            root.addHandler(handler)
+        _listener = _queue_handler = None
+        _report_in_worker = True
+    # Another thread may have held the lock at the fork
+    _counters_lock = threading.Lock()
+    _counters.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add to a per-run counter; counters are logged once when the run ends.
+
+    Use this instead of a debug line per processed item.
+    """
+    global _report_in_worker
+    with _counters_lock:
+        _counters[name] += amount
+    if _report_in_worker:
+        # Pool workers end with os._exit and skip atexit, but multiprocessing
+        # runs its finalizers first. Registered on the first count because
+        # a new multiprocessing process clears the finalizers it inherits
+        from multiprocessing import util
+
+        _report_in_worker = False
+        util.Finalize(None, log_counters, exitpriority=0)
+
+
+def counters() -> dict[str, int]:
+    with _counters_lock:
+        return dict(_counters)
+
+
+def log_counters() -> None:
+    values = counters()
+    if values:
+        logging.getLogger(__name__).info(
+            "Run counters (pid %d): %s", os.getpid(),
+            ", ".join(f"{name}={value}" for name, value in sorted(values.items()))
+        )
+
+
+def payload_sampling() -> int:
+    """Characters of decrypted payload to log at DEBUG, 0 (off) unless $HPT_LOG_PAYLOAD is set."""
+    return int(os.environ.get("HPT_LOG_PAYLOAD") or 0)
+
+
 def get_logger(name):
     """Get a logger instance for a specific module"""
-    return logging.getLogger(name) 
\ No newline at end of file
+    return logging.getLogger(name)
@@ -0,0 +1,367 @@
+import hashlib
+import json
+import os
+import pickle
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_DIR = Path(__file__).parent / "Cache" / "mods"
+CONFLICT_CORPUS = Path(__file__).parent / "conformance" / "mod_conflicts.json"
+OPS = ("set", "remove", "add", "merge")
+
+
+class ModError(ValueError):
+    """Raised when a mod cannot be applied to the reference data."""
+
+
+def parse_path(path: str) -> list[str]:
+    """Split a mod path like RefHero/H01/attack into segments.
+
+    Segments use JSON pointer escaping: ~1 for '/' and ~0 for '~'.
+    """
+    return [
+        segment.replace("~1", "/").replace("~0", "~")
+        for segment in path.strip("/").split("/")
+    ]
+
+
+@dataclass
+class Mod:
+    """A named list of path-addressed operations against WSREFDATA's value tables.
+
+    File format:
+        {
+            "name": "BetterSwords",
+            "keys": {"RefItem": "itemRefID"},
+            "ops": [
+                {"op": "set", "path": "RefItem/sword01/attack", "value": "50"},
+                {"op": "merge", "path": "RefItem/sword02", "value": {"attack": "60"}},
+                {"op": "add", "path": "RefItem", "value": {"itemRefID": "sword99", ...}},
+                {"op": "remove", "path": "RefItem/sword03"}
+            ]
+        }
+
+    Records are addressed by ID rather than array index. The ID field of a
+    table is taken from "keys" or detected from the first record.
+    """
+    name: str
+    ops: list[dict]
+    keys: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict, default_name: str = "mod") -> 'Mod':
+        ops = data.get("ops")
+        if not isinstance(ops, list):
+            raise ModError(f"Mod '{data.get('name', default_name)}' has no ops list")
+        for op in ops:
+            if op.get("op") not in OPS:
+                raise ModError(f"Unknown op '{op.get('op')}', expected one of {', '.join(OPS)}")
+            if "path" not in op:
+                raise ModError(f"Op {op} has no path")
+        return cls(name=data.get("name", default_name), ops=ops, keys=data.get("keys", {}))
+
+    @classmethod
+    def load(cls, path: str) -> list['Mod']:
+        """Load a mod file containing one mod or a list of mods."""
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            data = json.load(f)
+        default_name = os.path.splitext(os.path.basename(path))[0]
+        if isinstance(data, list):
+            return [cls.from_dict(item, f"{default_name}[{i}]") for i, item in enumerate(data)]
+        return [cls.from_dict(data, default_name)]
+
+
+@dataclass
+class Conflict:
+    """Two mods touched the same record or field; the later one won."""
+    path: str
+    first: str
+    second: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: '{self.second}' overrides '{self.first}'"
+
+
+@dataclass
+class ModResult:
+    data: dict
+    applied: int = 0
+    conflicts: list[Conflict] = field(default_factory=list)
+
+
+def detect_id_field(record: dict) -> str | None:
+    """Guess the ID field of a Ref* record, preferring names like heroRefID."""
+    candidates = [k for k in record if k.lower().endswith("id")]
+    for key in candidates:
+        if "ref" in key.lower():
+            return key
+    for key in candidates:
+        if key.lower() == "id":
+            return key
+    return candidates[0] if candidates else None
+
+
+class _Table:
+    """Copy-on-write view of one Ref* list with an ID -> position map."""
+
+    def __init__(self, name: str, records: list, id_field: str):
+        self.name = name
+        self.records = list(records)
+        self.id_field = id_field
+        self.positions = {}
+        self._copied = set()
+        for i, record in enumerate(self.records):
+            if isinstance(record, dict) and id_field in record:
+                self.positions.setdefault(str(record[id_field]), i)
+
+    def get(self, record_id: str, writable: bool = False) -> dict:
+        pos = self.positions.get(record_id)
+        if pos is None or self.records[pos] is None:
+            raise ModError(f"{self.name} has no record with {self.id_field}={record_id}")
+        if writable and pos not in self._copied:
+            self.records[pos] = _deep_copy(self.records[pos])
+            self._copied.add(pos)
+        return self.records[pos]
+
+    def add(self, record: dict) -> str:
+        if self.id_field not in record:
+            raise ModError(f"Record added to {self.name} has no {self.id_field}")
+        record_id = str(record[self.id_field])
+        pos = self.positions.get(record_id)
+        if pos is not None and self.records[pos] is not None:
+            self.records[pos] = _deep_copy(record)
+        else:
+            self.positions[record_id] = len(self.records)
+            self.records.append(_deep_copy(record))
+        self._copied.add(self.positions[record_id])
+        return record_id
+
+    def remove(self, record_id: str) -> None:
+        self.get(record_id)
+        # Tombstone keeps the other positions valid; compacted in finish()
+        self.records[self.positions.pop(record_id)] = None
+
+    def finish(self) -> list:
+        return [record for record in self.records if record is not None]
+
+
+def _deep_copy(value):
+    if isinstance(value, dict):
+        return {k: _deep_copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_deep_copy(v) for v in value]
+    return value
+
+
+def _navigate(container, segments: list[str], path: str):
+    for segment in segments:
+        if isinstance(container, list):
+            try:
+                container = container[int(segment)]
+            except (ValueError, IndexError):
+                raise ModError(f"Invalid list index '{segment}' in {path}")
+        elif isinstance(container, dict):
+            if segment not in container:
+                raise ModError(f"Missing key '{segment}' in {path}")
+            container = container[segment]
+        else:
+            raise ModError(f"Cannot descend into a value at '{segment}' in {path}")
+    return container
+
+
+def _assign(container, key: str, value, path: str) -> None:
+    if isinstance(container, list):
+        try:
+            container[int(key)] = value
+        except (ValueError, IndexError):
+            raise ModError(f"Invalid list index '{key}' in {path}")
+    elif isinstance(container, dict):
+        container[key] = value
+    else:
+        raise ModError(f"Cannot set '{key}' on a value in {path}")
+
+
+def _delete(container, key: str, path: str) -> None:
+    try:
+        if isinstance(container, list):
+            del container[int(key)]
+        else:
+            del container[key]
+    except (ValueError, IndexError, KeyError, TypeError):
+        raise ModError(f"Nothing to remove at {path}")
+
+
+class ModEngine:
+    """Applies a load order of mods to a parsed WSREFDATA document in one pass."""
+
+    def __init__(self, base: dict):
+        if not isinstance(base.get("value"), dict):
+            raise ModError("Reference data has no 'value' object")
+        self.base = base
+
+    @classmethod
+    def from_file(cls, path: str, use_cache: bool = True) -> 'ModEngine':
+        """Load base reference data from an extracted JSON or an assets file.
+
+        The parsed document is pickled under Cache/mods so unchanged bases
+        are not decrypted or parsed again.
+        """
+        stat = os.stat(path)
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        cache_path = CACHE_DIR / f"{key}.pickle"
+        stamp = (stat.st_size, stat.st_mtime_ns)
+
+        if use_cache:
+            try:
+                with open(cache_path, 'rb') as f:
+                    if pickle.load(f) == stamp:
+                        logger.debug(f"Loaded parsed base from {cache_path}")
+                        return cls(pickle.load(f))
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+
+        if path.lower().endswith(('.asset', '.assets')):
+            from crypto import SaveCrypto
+            base, _ = SaveCrypto.extract_refdata(path, path)
+        else:
+            with open(path, 'r', encoding='utf-8-sig') as f:
+                base = json.load(f)
+
+        if use_cache:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(".tmp")
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(stamp, f)
+                pickle.dump(base, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        return cls(base)
+
+    def apply(self, mods: list[Mod]) -> ModResult:
+        """Apply mods in order without modifying the base document.
+
+        Later mods win when two mods touch the same field or record; every
+        such overlap is reported as a Conflict.
+        """
+        tables = {}
+        # Who replaced/added/removed each record, and who changed which field
+        whole_records = {}
+        # record -> {field path: mod that last wrote it}
+        field_owners = {}
+        result = ModResult(data=None)
+
+        def table_for(name: str, mod: Mod) -> _Table:
+            table = tables.get(name)
+            if table is None:
+                records = self.base["value"].get(name)
+                if not isinstance(records, list):
+                    raise ModError(f"Mod '{mod.name}': unknown table {name}")
+                id_field = mod.keys.get(name) or next(
+                    (detect_id_field(r) for r in records if isinstance(r, dict)), None
+                )
+                if not id_field:
+                    raise ModError(f"Mod '{mod.name}': cannot find the ID field of {name}, set it in keys")
+                table = tables[name] = _Table(name, records, id_field)
+            return table
+
+        def conflict(path: tuple, first: str, mod: Mod) -> None:
+            result.conflicts.append(Conflict("/".join(path), first, mod.name))
+
+        def touch_record(record: tuple, mod: Mod) -> None:
+            first = whole_records.get(record)
+            if first is not None and first != mod.name:
+                conflict(record, first, mod)
+            else:
+                others = set(field_owners.get(record, {}).values()) - {mod.name}
+                if others:
+                    conflict(record, sorted(others)[0], mod)
+            whole_records[record] = mod.name
+
+        def touch_field(path: tuple, mod: Mod) -> None:
+            record = path[:2]
+            owners = field_owners.setdefault(record, {})
+            first = whole_records.get(record)
+            if first is None or first == mod.name:
+                # The field itself or any enclosing field
+                first = next(
+                    (owners[path[:i]] for i in range(len(path), 2, -1)
+                     if owners.get(path[:i], mod.name) != mod.name),
+                    None
+                )
+            if first is None:
+                # Or a field inside it, which this write replaces
+                first = next(
+                    (owner for field, owner in owners.items()
+                     if owner != mod.name and len(field) > len(path) and field[:len(path)] == path),
+                    None
+                )
+            if first is not None and first != mod.name:
+                conflict(path, first, mod)
+            owners[path] = mod.name
+
+        for mod in mods:
+            for op in mod.ops:
+                path = op["path"]
+                segments = parse_path(path)
+                table = table_for(segments[0], mod)
+                kind = op["op"]
+
+                if kind == "add":
+                    if len(segments) != 1 or not isinstance(op.get("value"), dict):
+                        raise ModError(f"Mod '{mod.name}': add needs a table path and a record value")
+                    record_id = table.add(op["value"])
+                    touch_record((table.name, record_id), mod)
+                elif len(segments) < 2:
+                    raise ModError(f"Mod '{mod.name}': {kind} needs a record in {path}")
+                elif kind == "remove" and len(segments) == 2:
+                    table.remove(segments[1])
+                    touch_record((table.name, segments[1]), mod)
+                elif kind == "merge":
+                    if not isinstance(op.get("value"), dict):
+                        raise ModError(f"Mod '{mod.name}': merge needs an object value")
+                    target = _navigate(table.get(segments[1], writable=True), segments[2:], path)
+                    if not isinstance(target, dict):
+                        raise ModError(f"Mod '{mod.name}': merge target {path} is not an object")
+                    for key, value in op["value"].items():
+                        target[key] = _deep_copy(value)
+                        touch_field((table.name, *segments[1:], key), mod)
+                else:
+                    parent = _navigate(table.get(segments[1], writable=True), segments[2:-1], path)
+                    if kind == "set":
+                        if len(segments) == 2:
+                            raise ModError(f"Mod '{mod.name}': use add or merge to replace a record")
+                        _assign(parent, segments[-1], _deep_copy(op.get("value")), path)
+                    else:
+                        _delete(parent, segments[-1], path)
+                    touch_field((table.name, *segments[1:]), mod)
+                result.applied += 1
+
+        value = dict(self.base["value"])
+        for name, table in tables.items():
+            value[name] = table.finish()
+        result.data = {**self.base, "value": value}
+
+        for item in result.conflicts:
+            logger.warning(f"Mod conflict at {item}")
+        return result
+
+
+def verify_conflict_detection(corpus_path: str | Path = CONFLICT_CORPUS) -> list[str]:
+    """Check the conflicts ModEngine.apply reports against the conformance corpus.
+
+    Returns:
+        list: Human readable descriptions of every mismatch (empty when conformant)
+    """
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    mismatches = []
+    for case in corpus["cases"]:
+        mods = [Mod(name=f"mod{i}", ops=ops) for i, ops in enumerate(case["mods"], 1)]
+        actual = [c.path for c in ModEngine(corpus["base"]).apply(mods).conflicts]
+        if actual != case["conflicts"]:
+            mismatches.append(f"mods {case['name']}: expected conflicts {case['conflicts']}, got {actual}")
+    return mismatches
@@ -0,0 +1,105 @@
+import binascii
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+
+import dotnet_io  # noqa: F401 - registers the dotnet_replace codec error handler
+from profiler import stage
+
+AES_BLOCK = 16
+# Plaintext/ciphertext bytes per base64 group boundary and AES block boundary
+STREAM_ALIGN = 48
+
+
+class NativeRijndael:
+    """Rijndael-128/ECB/PKCS7 cipher matching the game's RijndaelManaged setup."""
+
+    _instances = {}
+
+    def __init__(self, key: str):
+        self.key = key
+        self._cipher = AES.new(key.encode('utf-8'), AES.MODE_ECB)
+
+    @classmethod
+    def for_key(cls, key: str) -> 'NativeRijndael':
+        """Return a cached cipher for key (ECB carries no per-call state)."""
+        cipher = cls._instances.get(key)
+        if cipher is None:
+            cipher = cls._instances[key] = cls(key)
+        return cipher
+
+    def decrypt_bytes(self, encrypted: bytes | memoryview) -> bytes:
+        if len(encrypted) % AES_BLOCK:
+            raise ValueError("Length of the data to decrypt is invalid")
+        return unpad(self._cipher.decrypt(encrypted), AES_BLOCK)
+
+    def decrypt_blocks(self, encrypted: bytes | memoryview) -> bytes:
+        """Decrypt whole blocks without removing the padding.
+
+        ECB blocks are independent, so any block can be decrypted on its own.
+        """
+        return self._cipher.decrypt(encrypted)
+
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        return self._cipher.encrypt(pad(data, AES_BLOCK))
+
+    def decrypt(self, encrypted_b64: str | bytes | memoryview) -> str:
+        """Base64 decode, decrypt and UTF-8 decode in one pass."""
+        with stage("base64"):
+            if isinstance(encrypted_b64, str):
+                encrypted_b64 = encrypted_b64.encode('ascii', 'ignore')
+            encrypted = binascii.a2b_base64(encrypted_b64)
+        with stage("aes"):
+            decrypted = self.decrypt_bytes(encrypted)
+        with stage("utf8_decode"):
+            return decrypted.decode('utf-8', 'dotnet_replace')
+
+    def encrypt(self, data: str) -> str:
+        """UTF-8 encode, encrypt and base64 encode in one pass."""
+        with stage("utf8_encode"):
+            encoded = data.encode('utf-8', 'dotnet_replace')
+        with stage("aes"):
+            encrypted = self.encrypt_bytes(encoded)
+        with stage("base64"):
+            return binascii.b2a_base64(encrypted, newline=False).decode('ascii')
+
+    def decrypt_chunks(self, b64_chunks):
+        """Decrypt base64 text arriving in chunks, yielding plaintext bytes.
+
+        Base64 is decoded in whole 4-character groups and AES in whole
+        blocks; the last block is held back until the end so its PKCS7
+        padding can be removed. Memory use is bounded by the chunk size.
+        """
+        pending_b64 = b""
+        pending = b""
+        for chunk in b64_chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('ascii', 'ignore')
+            data = pending_b64 + bytes(chunk).translate(None, b" \t\r\n")
+            cut = len(data) - len(data) % 4
+            pending_b64 = data[cut:]
+            data = pending + binascii.a2b_base64(data[:cut])
+            cut = max(0, (len(data) - 1) // AES_BLOCK * AES_BLOCK)
+            pending = data[cut:]
+            if cut:
+                yield self._cipher.decrypt(data[:cut])
+        if pending_b64:
+            pending += binascii.a2b_base64(pending_b64)
+        yield self.decrypt_bytes(pending)
+
+    def encrypt_chunks(self, chunks):
+        """Encrypt plaintext bytes arriving in chunks, yielding base64 bytes."""
+        pending = b""
+        for chunk in chunks:
+            data = pending + chunk
+            cut = len(data) - len(data) % STREAM_ALIGN
+            pending = data[cut:]
+            if cut:
+                yield binascii.b2a_base64(self._cipher.encrypt(data[:cut]), newline=False)
+        yield binascii.b2a_base64(self.encrypt_bytes(pending), newline=False)
+
+    @staticmethod
+    def encrypted_b64_length(plain_length: int) -> int:
+        """Length of the base64 text encrypt() produces for plain_length bytes."""
+        encrypted = (plain_length // AES_BLOCK + 1) * AES_BLOCK
+        return (encrypted + 2) // 3 * 4
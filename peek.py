@@ -0,0 +1,138 @@
+"""Read a few top-level values of a save without decrypting all of it.
+
+A save is base64 text behind a BinaryReader length prefix, encrypted with
+AES in ECB mode, so every 64 characters of base64 decode to 48 bytes that
+decrypt on their own. peek_save() decrypts the payload from the start in
+small chunks and feeds the text to the incremental JSON parser, stopping
+as soon as every requested top-level key has been read; the rest of the
+file is never read. Members in front of the wanted ones are skipped
+without being built. read_plain_range() decrypts an arbitrary byte range
+of the plaintext by seeking straight to the blocks that hold it.
+"""
+import binascii
+import os
+import time
+from dataclasses import dataclass, field
+
+from crypto import SaveCrypto
+from dotnet_io import read_7bit_int_from
+from json_events import iter_events, iter_items
+from native_crypto import STREAM_ALIGN, NativeRijndael
+from stream_crypto import iter_decrypt
+from logger import count, get_logger
+
+logger = get_logger(__name__)
+
+# Small enough that the leading keys cost one chunk
+PEEK_CHUNK = 16 << 10
+
+
+
+@dataclass
+class PeekResult:
+    """Values read from one save and how much of it had to be decrypted."""
+    path: str
+    values: dict = field(default_factory=dict)
+    missing: list[str] = field(default_factory=list)
+    size: int = 0
+    decrypted: int = 0
+    elapsed: float = 0.0
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "values": self.values,
+            "missing": self.missing,
+            "size": self.size,
+            "decrypted": self.decrypted,
+            "elapsed": self.elapsed,
+            "error": self.error,
+        }
+
+
+def _open_payload(f) -> int:
+    length = read_7bit_int_from(f)
+    if length < 0:
+        raise ValueError(f"Invalid string length: {length}")
+    return length
+
+
+def iter_members(chunks, keys: list[str]):
+    """Yield (key, value) for the requested top-level members of a JSON object.
+
+    Reads text chunks only until every key was found; other members are
+    skipped without being built.
+    """
+    if keys:
+        yield from iter_items(iter_events(chunks), keys)
+
+
+def peek_save(path: str, keys: list[str], key: str = None, chunk_size: int = PEEK_CHUNK) -> PeekResult:
+    """Read the top-level members keys of a save, decrypting only as far as needed.
+
+    Returns:
+        PeekResult: values holds the members that were found, missing the
+        ones the save does not have (only known once it was read to the end)
+    """
+    start = time.perf_counter()
+    result = PeekResult(path=path, size=os.path.getsize(path))
+    with open(path, 'rb') as f:
+        length = _open_payload(f)
+        payload_start = f.tell()
+        chunks = iter_decrypt(f, key or SaveCrypto.SAVE_KEY, length, chunk_size)
+        try:
+            for name, value in iter_members(chunks, keys):
+                result.values[name] = value
+        finally:
+            chunks.close()
+        result.decrypted = f.tell() - payload_start
+    result.missing = [name for name in keys if name not in result.values]
+    result.elapsed = time.perf_counter() - start
+    count("peeked_saves")
+    count("peek_decrypted_bytes", result.decrypted)
+    return result
+
+
+def read_plain_range(path: str, start: int, length: int, key: str = None) -> bytes:
+    """Decrypt plaintext bytes [start, start + length) of a save.
+
+    Only the base64 groups covering those bytes are read and decrypted.
+    The range may split a UTF-8 character; decode with errors='replace'.
+    """
+    if start < 0 or length < 0:
+        raise ValueError("start and length must not be negative")
+    cipher = NativeRijndael.for_key(key or SaveCrypto.SAVE_KEY)
+    with open(path, 'rb') as f:
+        payload_length = _open_payload(f)
+        payload_start = f.tell()
+        if payload_length < 4 or payload_length % 4:
+            raise ValueError("Save payload is not plain base64 text")
+        f.seek(payload_start + payload_length - 4)
+        cipher_length = payload_length // 4 * 3 - f.read(4).count(b"=")
+
+        # Whole base64 groups and AES blocks: STREAM_ALIGN bytes are 64 characters
+        first = start // STREAM_ALIGN * STREAM_ALIGN
+        last = min(cipher_length, -(-(start + length) // STREAM_ALIGN) * STREAM_ALIGN)
+        if first >= last:
+            return b""
+        f.seek(payload_start + first // 3 * 4)
+        encoded = f.read((last // 3 * 4 if last < cipher_length else payload_length) - first // 3 * 4)
+    encrypted = binascii.a2b_base64(encoded)
+    if last == cipher_length:
+        # The final block carries the PKCS7 padding
+        plain = cipher.decrypt_bytes(encrypted)
+    else:
+        plain = cipher.decrypt_blocks(encrypted)
+    count("peek_decrypted_bytes", len(encrypted))
+    return plain[start - first:start - first + length]
+
+
+def peek_saves(paths: list[str], keys: list[str], key: str = None):
+    """Yield a PeekResult per save; errors are reported in the result rather than raised."""
+    for path in paths:
+        try:
+            yield peek_save(path, keys, key)
+        except Exception as e:
+            logger.warning(f"Could not peek into {path}: {str(e)}")
+            yield PeekResult(path=path, error=f"{type(e).__name__}: {e}")
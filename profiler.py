@@ -0,0 +1,189 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+from datetime import datetime
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+_NULL_STAGE = nullcontext()
+
+
+class _Stage:
+    """Context manager timing one pipeline stage; stages may nest."""
+
+    __slots__ = ("profiler", "name", "start", "start_memory", "child_peak")
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> '_Stage':
+        profiler = self.profiler
+        self.child_peak = 0
+        if profiler.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if profiler._stack:
+                # reset_peak() below would lose the enclosing stage's peak
+                parent = profiler._stack[-1]
+                parent.child_peak = max(parent.child_peak, peak)
+            tracemalloc.reset_peak()
+            self.start_memory = current
+        profiler._stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self.start
+        profiler = self.profiler
+        profiler._stack.pop()
+        peak_memory = None
+        if profiler.memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            peak_memory = peak - self.start_memory
+            if profiler._stack:
+                parent = profiler._stack[-1]
+                parent.child_peak = max(parent.child_peak, peak)
+        profiler._record(self.name, elapsed, peak_memory)
+        return False
+
+
+class Profiler:
+    """Collects wall time and peak memory for named pipeline stages.
+
+    Disabled by default; stage() then returns a shared no-op context so
+    instrumented hot paths cost next to nothing. Stage times are inclusive
+    of any stages nested inside them.
+
+    Usage:
+        PROFILER.enable()
+        with stage("aes"):
+            ...
+        PROFILER.write("profile.json")
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.stages = {}
+        self.started = None
+        self._start = None
+        self._stack = []
+        self._cprofile = None
+        self._cprofile_path = None
+        self._peak_traced = None
+
+    def enable(self, memory: bool = True, cprofile_path: str = None) -> None:
+        """Start recording stages, optionally under tracemalloc and cProfile."""
+        self.enabled = True
+        self.memory = memory
+        self.stages = {}
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._start = time.perf_counter()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if cprofile_path:
+            import cProfile
+            self._cprofile_path = cprofile_path
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def disable(self) -> None:
+        if self._cprofile:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self._cprofile_path)
+            logger.info(f"Wrote cProfile stats to {self._cprofile_path}")
+            self._cprofile = None
+        if self.memory and tracemalloc.is_tracing():
+            self._peak_traced = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self.enabled = False
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def _record(self, name: str, elapsed: float, peak_memory: int | None) -> None:
+        record = self.stages.get(name)
+        if record is None:
+            record = self.stages[name] = {
+                "stage": name,
+                "calls": 0,
+                "wall_seconds": 0.0,
+                "max_wall_seconds": 0.0,
+                "peak_memory_bytes": None,
+            }
+        record["calls"] += 1
+        record["wall_seconds"] += elapsed
+        record["max_wall_seconds"] = max(record["max_wall_seconds"], elapsed)
+        if peak_memory is not None:
+            record["peak_memory_bytes"] = max(record["peak_memory_bytes"] or 0, peak_memory)
+
+    def report(self, command: str = None) -> dict:
+        """Machine-readable summary of the run."""
+        import platform
+        from crypto import SaveCrypto
+
+        report = {
+            "command": command,
+            "argv": sys.argv[1:],
+            "started": self.started,
+            "total_wall_seconds": time.perf_counter() - self._start if self._start else None,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.node(),
+            "cpu_count": os.cpu_count(),
+            "crypto_backend": SaveCrypto.BACKEND,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": list(self.stages.values()),
+        }
+        if self.memory:
+            report["peak_traced_memory_bytes"] = (
+                tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else self._peak_traced
+            )
+        return report
+
+    def write(self, path: str, command: str = None) -> dict:
+        """Write report() as JSON to path, or to stdout when path is '-'."""
+        report = self.report(command)
+        if path == "-":
+            json.dump(report, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            logger.info(f"Wrote profile to {path}")
+        return report
+
+
+def peak_rss_bytes() -> int | None:
+    """Peak resident set size of this process, where the platform exposes it."""
+    # ru_maxrss survives exec on Linux, so a fresh child would report its
+    # parent's peak; VmHWM belongs to this process image only
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+PROFILER = Profiler()
+
+
+def stage(name: str):
+    """Time a block as a named stage of the global profiler."""
+    return PROFILER.stage(name)
@@ -0,0 +1,393 @@
+import codecs
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+
+from asset_index import AssetIndex
+from crypto import SaveCrypto
+from utils import dump_json, serialize_json
+from logger import get_logger
+from profiler import stage
+
+logger = get_logger(__name__)
+
+# WSREFDATA variants shipped in resources.assets, see TechDocs.md
+REFDATA_LOCALES = (
+    "WSREFDATA",
+    "WSREFDATA_GERMANY",
+    "WSREFDATA_RUSSIA",
+    "WSREFDATA_JAP",
+    "WSREFDATA_CHINESE",
+    "WSREFDATA_FRENCH",
+    "WSREFDATA_ITALIAN",
+    "WSREFDATA_SPANISH",
+)
+
+
+def resolve_locale(locale: str) -> str:
+    """Map a locale given as GERMANY, WSREFDATA_GERMANY or default to its asset name."""
+    name = locale.upper()
+    if name in ("DEFAULT", "ENGLISH", "EN"):
+        name = "WSREFDATA"
+    elif not name.startswith("WSREFDATA"):
+        name = f"WSREFDATA_{name}"
+    if name not in REFDATA_LOCALES:
+        raise ValueError(
+            f"Unknown reference data locale '{locale}', expected one of {', '.join(REFDATA_LOCALES)}"
+        )
+    return name
+
+
+# Bytes stripped from hand-edited JSON: every C0 control character except
+# tab and newline. None of them can occur inside a multi-byte UTF-8
+# sequence, so they are removed from the raw bytes before decoding.
+CONTROL_BYTES = bytes(c for c in range(32) if c not in (9, 10))
+_CONTROL = re.compile(rb'\r(?!\n)|[\x00-\x08\x0b\x0c\x0e-\x1f]')
+NULL_ESCAPE = b'\\u0000'
+MAX_REPORTED = 100
+
+
+class RefDataError(ValueError):
+    """Raised when a reference data file cannot be parsed or does not match the schema."""
+
+
+@dataclass
+class Repair:
+    """One change sanitize_json made to the input, located in the original file."""
+    kind: str
+    line: int
+    column: int
+    detail: str
+
+    def __str__(self) -> str:
+        return f"line {self.line}, column {self.column}: {self.detail}"
+
+
+def _locate(raw: bytes, offsets: list[int]) -> list[tuple[int, int]]:
+    """Turn sorted byte offsets into 1-based (line, column) pairs, columns in characters."""
+    positions = []
+    line, line_start, last = 1, 0, 0
+    for offset in offsets:
+        newlines = raw.count(b'\n', last, offset)
+        if newlines:
+            line += newlines
+            line_start = raw.rfind(b'\n', last, offset) + 1
+        last = offset
+        positions.append((line, len(raw[line_start:offset].decode('utf-8', 'replace')) + 1))
+    return positions
+
+
+def _invalid_utf8(raw: bytes) -> list[int]:
+    """Offsets of the undecodable bytes in raw, up to MAX_REPORTED of them."""
+    offsets = []
+    pos = 0
+    while len(offsets) < MAX_REPORTED:
+        try:
+            raw[pos:].decode('utf-8')
+            break
+        except UnicodeDecodeError as e:
+            offsets.extend(range(pos + e.start, pos + e.end))
+            pos += e.end
+    return offsets[:MAX_REPORTED]
+
+
+def sanitize_json(raw: bytes) -> tuple[str, list[Repair]]:
+    """Clean hand-edited JSON bytes and report every repair.
+
+    Removes a UTF-8 BOM, normalizes CRLF line endings, strips control
+    characters other than tab and newline, drops \\u0000 escapes and bytes
+    that are not valid UTF-8. The work is done with bytes.translate and
+    bytes.replace; positions are only computed when something was found.
+
+    Returns:
+        tuple: (text, repairs). At most MAX_REPORTED repairs of each kind
+        are listed; a final entry per kind gives the total when there were more.
+    """
+    repairs = []
+    if raw.startswith(codecs.BOM_UTF8):
+        raw = raw[len(codecs.BOM_UTF8):]
+        repairs.append(Repair("bom", 1, 1, "removed UTF-8 byte order mark"))
+
+    crlf = raw.count(b'\r\n')
+    if crlf:
+        ((line, column),) = _locate(raw, [raw.find(b'\r\n')])
+        repairs.append(Repair("crlf", line, column, f"converted {crlf} CRLF line endings to LF (first one here)"))
+
+    found = {}
+    if len(raw.translate(None, CONTROL_BYTES)) + crlf != len(raw):
+        found["control"] = [m.start() for m in _CONTROL.finditer(raw)]
+    if NULL_ESCAPE in raw:
+        found["null"] = [m.start() for m in re.finditer(re.escape(NULL_ESCAPE), raw)]
+    try:
+        raw.decode('utf-8')
+    except UnicodeDecodeError:
+        found["utf8"] = _invalid_utf8(raw)
+
+    for kind, offsets in found.items():
+        for (line, column), offset in zip(_locate(raw, offsets[:MAX_REPORTED]), offsets):
+            if kind == "control":
+                detail = f"removed control character U+{raw[offset]:04X}"
+            elif kind == "null":
+                detail = "removed \\u0000 escape"
+            else:
+                detail = f"removed invalid UTF-8 byte 0x{raw[offset]:02X}"
+            repairs.append(Repair(kind, line, column, detail))
+        if len(offsets) > MAX_REPORTED:
+            repairs.append(Repair(kind, 0, 0, f"{len(offsets)} {kind} repairs in total"))
+
+    with stage("repair_json"):
+        # CR is in CONTROL_BYTES, so this also turns CRLF into LF
+        raw = raw.translate(None, CONTROL_BYTES)
+        if "null" in found:
+            raw = raw.replace(NULL_ESCAPE, b'')
+        text = raw.decode('utf-8', 'ignore' if "utf8" in found else 'strict')
+    return text, repairs
+
+
+def parse_json(text: str, source: str = "input"):
+    """json.loads with an error that points at the offending line."""
+    try:
+        with stage("json_loads"):
+            return json.loads(text)
+    except json.JSONDecodeError as e:
+        lines = text.splitlines()
+        context = lines[e.lineno - 1] if e.lineno <= len(lines) else ""
+        if len(context) > 120:
+            start = max(0, e.colno - 60)
+            context, caret = context[start:start + 120], e.colno - start
+        else:
+            caret = e.colno
+        raise RefDataError(
+            f"{source} is not valid JSON: {e.msg} at line {e.lineno}, column {e.colno}\n"
+            f"  {context}\n  {' ' * (caret - 1)}^"
+        ) from e
+
+
+def _report(repairs: list[Repair], source: str) -> None:
+    if repairs:
+        logger.warning(f"Repaired {source}:")
+        for repair in repairs:
+            logger.warning(f"  {repair}")
+
+
+def load_refdata_json(path: str, schema=None) -> dict:
+    """Read a reference data JSON file the same way asset --encrypt does.
+
+    Args:
+        schema (RefDataSchema): Check the tables, record keys and value
+            types against this schema (see refdata_schema)
+
+    Raises:
+        RefDataError: The file is not valid JSON or does not match schema
+    """
+    with stage("read"), open(path, 'rb') as f:
+        raw = f.read()
+    content, repairs = sanitize_json(raw)
+    _report(repairs, path)
+    data = parse_json(content, path)
+    logger.info("Successfully loaded JSON")
+    if schema is not None:
+        with stage("validate"):
+            problems = schema.validate(data)
+        if problems:
+            raise RefDataError(schema.describe_problems(problems, path))
+    return data
+
+
+def extract_refdata_file(input_file: str, use_index: bool = True, stream: bool = False) -> str:
+    """Extract and decrypt WSREFDATA to [name].json next to the assets file.
+
+    With stream, the text is decrypted in chunks straight from the assets
+    file and written as stored instead of being parsed and re-serialized.
+
+    Returns:
+        str: Path of the written JSON file
+    """
+    if stream:
+        import stream_crypto
+        return stream_crypto.extract_refdata_file(input_file)
+
+    data, name = SaveCrypto.extract_refdata(input_file, input_file, use_index=use_index)
+
+    output_path = os.path.join(os.path.dirname(input_file), f"{name}.json")
+    with stage("write"), open(output_path, 'w', encoding='utf-8') as f:
+        # Use custom serializer to match game format for both decryption and encryption
+        dump_json(data, f, in_game_data=True)
+
+    logger.info(f"Saved extracted reference data to {output_path}")
+    return output_path
+
+
+def encrypt_refdata_file(
+    input_file: str,
+    stream: bool = False,
+    schema_from: str = None,
+    inject: str = None,
+    name: str = "WSREFDATA"
+) -> str:
+    """Encrypt a reference data JSON file to WSREFDATA.bytes next to it.
+
+    The file is sanitized first (see sanitize_json) and every repair is
+    logged with its line and column. With stream, the file is encrypted
+    verbatim in chunks; it is neither repaired nor re-serialized.
+
+    Args:
+        schema_from (str): Assets file or reference data JSON to infer the
+            schema from; the input must have the same tables, record keys
+            and value types. Defaults to inject
+        inject (str): Also replace the TextAsset called name in this assets file
+
+    Returns:
+        str: Path of the written WSREFDATA.bytes
+
+    Raises:
+        RefDataError: The input is not valid JSON or does not match the schema
+    """
+    from backup_store import snapshot_before_write
+
+    schema_from = schema_from or inject
+    if stream and schema_from:
+        raise ValueError("--stream encrypts the file verbatim and cannot be combined with a schema check or injection")
+
+    output_path = os.path.join(os.path.dirname(input_file), "WSREFDATA.bytes")
+    if stream:
+        snapshot_before_write(output_path, "asset --encrypt")
+        import stream_crypto
+        stream_crypto.encrypt_save_file(input_file, output_path)
+        logger.info(f"Saved encrypted reference data to {output_path}")
+        return output_path
+
+    schema = None
+    if schema_from:
+        from refdata_schema import RefDataSchema
+        with stage("schema"):
+            schema = RefDataSchema.from_file(schema_from, name)
+    data = load_refdata_json(input_file, schema)
+
+    # Use custom serializer for both decryption and encryption
+    json_str = serialize_json(data, in_game_data=True)
+    encrypted = SaveCrypto.encrypt(json_str)
+    snapshot_before_write(output_path, "asset --encrypt")
+    with stage("write"), open(output_path, 'wb') as f:
+        f.write(encrypted)
+    logger.info(f"Saved encrypted reference data to {output_path}")
+
+    if inject:
+        from asset_transaction import AssetTransaction
+        with AssetTransaction(inject) as tx:
+            # The TextAsset uses the reference data key, WSREFDATA.bytes the save key
+            tx.stage(name, SaveCrypto.encrypt(json_str, SaveCrypto.REFDATA_KEY))
+        logger.info(f"Injected {name} into {inject}")
+    return output_path
+
+
+def read_refdata_scripts(
+    file_path: str,
+    names: list[str] = REFDATA_LOCALES,
+    use_index: bool = True
+) -> dict[str, bytes | str]:
+    """Read the encrypted m_Script of every requested TextAsset in one pass.
+
+    Uses the asset index when possible; otherwise loads the assets file once
+    and stops scanning as soon as every requested name has been seen.
+    """
+    wanted = set(names)
+    scripts = {}
+
+    if use_index:
+        index = AssetIndex()
+        entry = index.get(file_path)
+        if entry["direct"]:
+            for name in wanted & entry["objects"].keys():
+                hit = index.read_text_asset(file_path, name)
+                if hit:
+                    scripts[name] = hit[1]
+            if len(scripts) == len(wanted & entry["objects"].keys()):
+                return scripts
+            scripts.clear()
+
+    import UnityPy
+
+    with stage("unity_load"):
+        env = UnityPy.load(file_path)
+    logger.debug("Loaded assets file")
+    with stage("unity_scan"):
+        for obj in env.objects:
+            if obj.type.name != "TextAsset":
+                continue
+            data = obj.read()
+            if data.m_Name in wanted and data.m_Name not in scripts:
+                logger.debug("Found %s", data.m_Name)
+                scripts[data.m_Name] = data.m_Script
+                if len(scripts) == len(wanted):
+                    break
+    return scripts
+
+
+def _init_worker(backend: str, cache) -> None:
+    SaveCrypto.set_backend(backend)
+    SaveCrypto.CACHE = cache
+
+
+def _decrypt_to_file(name: str, encrypted: bytes | str, filename: str, output_path: str) -> tuple[str, str, float]:
+    start = time.perf_counter()
+    data = SaveCrypto.decrypt_json(encrypted, filepath=filename)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        dump_json(data, f, in_game_data=True)
+    return name, output_path, time.perf_counter() - start
+
+
+def extract_locales(
+    file_path: str,
+    output_dir: str = None,
+    names: list[str] = REFDATA_LOCALES,
+    workers: int = None,
+    use_index: bool = True
+) -> dict[str, str]:
+    """Extract several WSREFDATA variants from one load of the assets file.
+
+    Each variant is decrypted, parsed and written to [output_dir]/[name].json
+    in its own worker process.
+
+    Returns:
+        dict: Asset name to output path for every variant that was found
+    """
+    if not file_path.lower().endswith(('.asset', '.assets')):
+        raise ValueError("Please select a resources.asset or resources.assets file")
+
+    output_dir = output_dir or os.path.dirname(file_path)
+    os.makedirs(output_dir or ".", exist_ok=True)
+
+    scripts = read_refdata_scripts(file_path, names, use_index=use_index)
+    missing = [name for name in names if name not in scripts]
+    if missing:
+        logger.warning(f"Not found in {file_path}: {', '.join(missing)}")
+    if not scripts:
+        raise ValueError("Could not find any WSREFDATA variant in assets file")
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers or os.cpu_count() or 1, len(scripts))
+    outputs = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(SaveCrypto.get_backend(), SaveCrypto.get_cache() or False)
+    ) as pool:
+        futures = [
+            pool.submit(
+                _decrypt_to_file,
+                name,
+                encrypted,
+                file_path,
+                os.path.join(output_dir, f"{name}.json")
+            )
+            for name, encrypted in scripts.items()
+        ]
+        for future in futures:
+            name, output_path, elapsed = future.result()
+            logger.info(f"Extracted {name} to {output_path} in {elapsed:.2f}s")
+            outputs[name] = output_path
+    return outputs
@@ -0,0 +1,221 @@
+"""Structural checks of edited reference data against the original WSREFDATA.
+
+The game reads every Ref* table into typed classes, so a misspelled table
+or key, or "abc" where it expects a number, only shows up as a crash or a
+silently defaulted field in game. RefDataSchema is inferred from a known
+good WSREFDATA and lists what an edited file does differently before it is
+encrypted.
+
+Values are stored as strings (serialize_json with in_game_data), so their
+kind is taken from the content: "12" is an int, "1.5" a number, "True" a
+bool and "" empty.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+
+from mods import detect_id_field
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+_INT = re.compile(r"^-?\d+$")
+_NUMBER = re.compile(r"^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$")
+_BOOLS = ("True", "False", "true", "false")
+
+# A value of the key's kind is accepted where one of the value's kinds was seen
+_ACCEPTED_BY = {
+    "int": ("number", "text"),
+    "number": ("text",),
+    "bool": ("text",),
+    "empty": ("text", "null"),
+    "null": ("empty",),
+}
+MAX_PROBLEMS = 200
+
+
+def kind_of(value) -> str:
+    """Classify a JSON value as bool, int, number, text, empty, null, array or object."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    value = str(value)
+    if not value:
+        return "empty"
+    if value in _BOOLS:
+        return "bool"
+    if _INT.match(value):
+        return "int"
+    if _NUMBER.match(value):
+        return "number"
+    return "text"
+
+
+def _accepts(kinds, kind: str) -> bool:
+    return kind in kinds or any(k in kinds for k in _ACCEPTED_BY.get(kind, ()))
+
+
+@dataclass
+class FieldSchema:
+    kinds: set[str] = field(default_factory=set)
+    # Kinds seen inside array values
+    items: set[str] = field(default_factory=set)
+    count: int = 0
+
+
+@dataclass
+class TableSchema:
+    id_field: str | None = None
+    fields: dict[str, FieldSchema] = field(default_factory=dict)
+    records: int = 0
+
+    def required(self) -> list[str]:
+        """Keys every original record has."""
+        return [key for key, schema in self.fields.items() if schema.count == self.records]
+
+
+@dataclass
+class Problem:
+    """One difference between a reference data file and the schema."""
+    path: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}" if self.path else self.message
+
+
+@dataclass
+class RefDataSchema:
+    """Table names, record keys and value kinds of a reference data document."""
+    top_level: dict[str, str] = field(default_factory=dict)
+    tables: dict[str, TableSchema] = field(default_factory=dict)
+
+    @classmethod
+    def infer(cls, data: dict) -> 'RefDataSchema':
+        """Build the schema of a known good document."""
+        schema = cls(top_level={key: kind_of(value) for key, value in data.items()})
+        for name, records in (data.get("value") or {}).items():
+            table = TableSchema()
+            schema.tables[name] = table
+            if not isinstance(records, list):
+                continue
+            for record in records:
+                if not isinstance(record, dict):
+                    continue
+                table.records += 1
+                if table.id_field is None:
+                    table.id_field = detect_id_field(record)
+                for key, value in record.items():
+                    field_schema = table.fields.setdefault(key, FieldSchema())
+                    field_schema.count += 1
+                    field_schema.kinds.add(kind_of(value))
+                    if isinstance(value, list):
+                        field_schema.items.update(kind_of(item) for item in value)
+        logger.debug(f"Inferred schema of {len(schema.tables)} tables")
+        return schema
+
+    @classmethod
+    def from_file(cls, path: str, name: str = "WSREFDATA") -> 'RefDataSchema':
+        """Infer the schema from an assets file or a reference data JSON file."""
+        if os.path.splitext(path)[1].lower() == ".json":
+            from refdata import load_refdata_json
+            return cls.infer(load_refdata_json(path))
+
+        from refdata import read_refdata_scripts
+        from crypto import SaveCrypto
+
+        scripts = read_refdata_scripts(path, [name])
+        if name not in scripts:
+            raise ValueError(f"Could not find {name} in {path}")
+        return cls.infer(SaveCrypto.decrypt_json(scripts[name], filepath=path))
+
+    def _check_value(self, path: str, value, field_schema: FieldSchema, problems: list) -> None:
+        kind = kind_of(value)
+        if not _accepts(field_schema.kinds, kind):
+            expected = " or ".join(sorted(field_schema.kinds))
+            problems.append(Problem(path, f"expected {expected}, got {kind} {_preview(value)}"))
+        elif kind == "array" and field_schema.items:
+            for i, item in enumerate(value):
+                item_kind = kind_of(item)
+                if not _accepts(field_schema.items, item_kind):
+                    expected = " or ".join(sorted(field_schema.items))
+                    problems.append(Problem(f"{path}/{i}", f"expected {expected}, got {item_kind} {_preview(item)}"))
+
+    def _check_table(self, name: str, records, table: TableSchema, problems: list) -> None:
+        if not isinstance(records, list):
+            problems.append(Problem(name, f"expected a list of records, got {kind_of(records)}"))
+            return
+        required = table.required()
+        seen_ids = {}
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                problems.append(Problem(f"{name}/{i}", f"expected a record, got {kind_of(record)}"))
+                continue
+            record_id = record.get(table.id_field) if table.id_field else None
+            # Address records like mods do, by ID when there is one
+            path = f"{name}/{record_id}" if record_id is not None else f"{name}/{i}"
+            if record_id is not None:
+                if str(record_id) in seen_ids:
+                    problems.append(Problem(path, f"duplicate {table.id_field}, also record {seen_ids[str(record_id)]}"))
+                else:
+                    seen_ids[str(record_id)] = i
+            for key in required:
+                if key not in record:
+                    problems.append(Problem(path, f"missing key '{key}'"))
+            for key, value in record.items():
+                field_schema = table.fields.get(key)
+                if field_schema is None:
+                    problems.append(Problem(f"{path}/{key}", "unknown key"))
+                else:
+                    self._check_value(f"{path}/{key}", value, field_schema, problems)
+
+    def validate(self, data) -> list[Problem]:
+        """List every place where data does not match the schema."""
+        if not isinstance(data, dict):
+            return [Problem("", f"expected an object at the top level, got {kind_of(data)}")]
+        problems = []
+        for key, kind in self.top_level.items():
+            if key not in data:
+                problems.append(Problem(key, "missing top-level key"))
+            elif key != "value" and not _accepts({kind}, kind_of(data[key])):
+                problems.append(Problem(key, f"expected {kind}, got {kind_of(data[key])}"))
+        for key in data.keys() - self.top_level.keys():
+            problems.append(Problem(key, "unknown top-level key"))
+
+        tables = data.get("value")
+        if not isinstance(tables, dict):
+            if "value" in data:
+                problems.append(Problem("value", f"expected an object of tables, got {kind_of(tables)}"))
+            return problems
+        for name in self.tables.keys() - tables.keys():
+            problems.append(Problem(name, "missing table"))
+        for name, records in tables.items():
+            table = self.tables.get(name)
+            if table is None:
+                problems.append(Problem(name, "unknown table"))
+            else:
+                self._check_table(name, records, table, problems)
+        return problems
+
+    @staticmethod
+    def describe_problems(problems: list[Problem], source: str = "input") -> str:
+        """Format problems for an error message, up to MAX_PROBLEMS of them."""
+        lines = [f"{source} does not match the reference data schema ({len(problems)} problems):"]
+        lines.extend(f"  {problem}" for problem in problems[:MAX_PROBLEMS])
+        if len(problems) > MAX_PROBLEMS:
+            lines.append(f"  ... and {len(problems) - MAX_PROBLEMS} more")
+        return "\n".join(lines)
+
+
+def _preview(value) -> str:
+    text = repr(value)
+    return text if len(text) <= 40 else f"{text[:37]}..."
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import re
+from collections.abc import Mapping
+
+from utils import serialize_json
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+STORE_VERSION = 1
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def _table_file(name: str) -> str:
+    if _SAFE_NAME.match(name):
+        return f"{name}.json"
+    return f"table_{hashlib.sha1(name.encode('utf-8')).hexdigest()[:12]}.json"
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def is_store(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+class RefDataStore(Mapping):
+    """Reference data split into one file per `value` table plus a manifest.
+
+    Each table file holds the table exactly as serialize_json formats it,
+    so tables are parsed only when first accessed and tables that were
+    never accessed are copied verbatim when the document is reassembled.
+
+    Usage:
+        store = RefDataStore.open("RefData")
+        heroes = store["RefHero"]          # parses RefHero.json only
+        heroes[0]["attack"] = "99"
+        store.save()                       # rewrites RefHero.json only
+        encrypted = store.encrypt()
+    """
+
+    def __init__(self, directory: str, manifest: dict):
+        self.directory = directory
+        self.manifest = manifest
+        self._loaded = {}
+        self._raw = {}
+
+    @classmethod
+    def open(cls, directory: str) -> 'RefDataStore':
+        with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported reference data store version in {directory}")
+        return cls(directory, manifest)
+
+    @classmethod
+    def write(cls, data: dict, directory: str, name: str = "WSREFDATA") -> 'RefDataStore':
+        """Split a parsed reference data document into directory."""
+        value = data.get("value")
+        if not isinstance(value, dict):
+            raise ValueError("Reference data has no 'value' object")
+
+        os.makedirs(directory, exist_ok=True)
+        tables = {}
+        for table, records in value.items():
+            text = serialize_json(records, in_game_data=True)
+            file_name = _table_file(table)
+            with open(os.path.join(directory, file_name), 'w', encoding='utf-8') as f:
+                f.write(text)
+            tables[table] = {
+                "file": file_name,
+                "sha1": _digest(text),
+                "records": len(records) if isinstance(records, list) else None,
+            }
+
+        manifest = {
+            "version": STORE_VERSION,
+            "name": name,
+            "envelope": {k: v for k, v in data.items() if k != "value"},
+            "tables": tables,
+        }
+        store = cls(directory, manifest)
+        store._write_manifest()
+        logger.debug(f"Wrote {len(tables)} tables to {directory}")
+        return store
+
+    def _write_manifest(self) -> None:
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @property
+    def name(self) -> str:
+        return self.manifest.get("name", "WSREFDATA")
+
+    def __getitem__(self, table: str):
+        if table not in self._loaded:
+            self._loaded[table] = json.loads(self.raw(table), strict=False)
+            logger.debug(f"Parsed table {table}")
+        return self._loaded[table]
+
+    def __setitem__(self, table: str, records) -> None:
+        if table not in self.manifest["tables"]:
+            self.manifest["tables"][table] = {"file": _table_file(table), "sha1": None, "records": None}
+        self._raw.pop(table, None)
+        self._loaded[table] = records
+
+    def __contains__(self, table) -> bool:
+        return table in self.manifest["tables"]
+
+    def __iter__(self):
+        return iter(self.manifest["tables"])
+
+    def __len__(self) -> int:
+        return len(self.manifest["tables"])
+
+    def raw(self, table: str) -> str:
+        """The table's serialized text, read without parsing it."""
+        if table in self._loaded:
+            return serialize_json(self._loaded[table], in_game_data=True)
+        text = self._raw.get(table)
+        if text is None:
+            info = self.manifest["tables"][table]
+            with open(os.path.join(self.directory, info["file"]), 'r', encoding='utf-8') as f:
+                text = self._raw[table] = f.read()
+        return text
+
+    def _fragments(self) -> dict[str, str]:
+        """Serialized text of every table; only accessed tables are re-serialized."""
+        return {table: self.raw(table) for table in self.manifest["tables"]}
+
+    def serialize(self) -> str:
+        """The whole document exactly as serialize_json(data, in_game_data=True) would format it."""
+        fragments = self._fragments()
+        value = "{" + ",".join(f'"{t}":{fragments[t]}' for t in sorted(fragments)) + "}"
+        parts = [
+            (key, serialize_json(item, in_game_data=True))
+            for key, item in self.manifest["envelope"].items()
+        ]
+        parts.append(("value", value))
+        return "{" + ",".join(f'"{key}":{text}' for key, text in sorted(parts)) + "}"
+
+    def to_dict(self) -> dict:
+        """Parse every table and return the full document."""
+        return {**self.manifest["envelope"], "value": {t: self[t] for t in self}}
+
+    def encrypt(self) -> bytes:
+        """Encrypt the reassembled document like asset --encrypt does."""
+        from crypto import SaveCrypto
+        return SaveCrypto.encrypt(self.serialize())
+
+    def save(self) -> list[str]:
+        """Write back the tables whose serialized text changed.
+
+        Returns:
+            list: Names of the tables that were rewritten
+        """
+        changed = []
+        for table in self._loaded:
+            info = self.manifest["tables"][table]
+            text = self.raw(table)
+            digest = _digest(text)
+            if digest == info["sha1"]:
+                continue
+            with open(os.path.join(self.directory, info["file"]), 'w', encoding='utf-8') as f:
+                f.write(text)
+            records = self._loaded[table]
+            info.update(sha1=digest, records=len(records) if isinstance(records, list) else None)
+            changed.append(table)
+        if changed:
+            self._write_manifest()
+            logger.debug(f"Saved tables: {', '.join(changed)}")
+        return changed
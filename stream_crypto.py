@@ -0,0 +1,215 @@
+"""Bounded-memory encryption and decryption of saves and reference data.
+
+The in-memory paths in SaveCrypto hold the file, the base64 text, the
+ciphertext, the plaintext and the parsed JSON at the same time. The
+functions here read the input in CHUNK_SIZE pieces and push each piece
+through base64, AES and UTF-8 before reading the next, so peak memory
+stays roughly constant regardless of the input size.
+
+The decrypted text is written exactly as stored (key order and formatting
+as the game wrote them) instead of being parsed and re-serialized, and
+encryption takes the JSON file verbatim. Both always use the native
+pycryptodome cipher, which is byte-identical to RijndaelManaged.
+"""
+import codecs
+import os
+from contextlib import contextmanager
+
+from crypto import SaveCrypto
+from dotnet_io import read_7bit_int_from, write_7bit_int
+from json_events import JsonEventParser, iter_events
+from native_crypto import NativeRijndael
+from logger import get_logger
+from profiler import stage
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 1 << 20
+UTF8_BOM = codecs.BOM_UTF8
+
+
+def _read_chunks(f, length: int = None, chunk_size: int = CHUNK_SIZE):
+    """Yield chunks of f until EOF, or exactly length bytes when given."""
+    remaining = length
+    while remaining is None or remaining > 0:
+        chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not chunk:
+            if remaining:
+                raise EOFError("Unable to read beyond the end of the stream")
+            return
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+
+@contextmanager
+def _output(path: str, mode: str, **kwargs):
+    """Open a temporary file next to path and move it into place on success.
+
+    A stream can fail halfway through (bad padding, invalid UTF-8), and the
+    output is often the file being replaced, so it is only touched once the
+    whole stream went through.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def iter_decrypt(f, key: str, length: int = None, chunk_size: int = CHUNK_SIZE):
+    """Decrypt the base64 payload read from f, yielding text chunks.
+
+    Args:
+        f: Binary file object positioned at the start of the payload
+        key (str): Encryption key
+        length (int): Payload length in bytes, or None to read until EOF
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')('dotnet_replace')
+    cipher = NativeRijndael.for_key(key)
+    for plain in cipher.decrypt_chunks(_read_chunks(f, length, chunk_size)):
+        text = decoder.decode(plain)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_save_text(input_file: str, key: str = None, chunk_size: int = CHUNK_SIZE):
+    """Yield the decrypted JSON text of a save file in chunks."""
+    with open(input_file, 'rb') as f:
+        length = read_7bit_int_from(f)
+        if length < 0:
+            raise ValueError(f"Invalid string length: {length}")
+        logger.debug("Streaming %d bytes of save payload from %s", length, input_file)
+        yield from iter_decrypt(f, key or SaveCrypto.SAVE_KEY, length, chunk_size)
+
+
+def iter_save_events(input_file: str, key: str = None):
+    """Yield JSON parser events for a save file while it is being decrypted."""
+    return iter_events(iter_save_text(input_file, key))
+
+
+def iter_refdata_text(assets_file: str, name: str = "WSREFDATA", index=None, chunk_size: int = CHUNK_SIZE):
+    """Yield the decrypted reference data text of a TextAsset in chunks.
+
+    The m_Script bytes are read straight from the assets file through the
+    asset index. Assets wrapped in a bundle cannot be read in place, so they
+    fall back to loading the TextAsset with UnityPy first.
+    """
+    from asset_index import AssetIndex
+
+    script_range = (index or AssetIndex()).script_range(assets_file, name)
+    if script_range is None:
+        import io
+
+        logger.warning(f"{name} in {assets_file} cannot be read in place, loading it with UnityPy")
+        script = _load_script(assets_file, name)
+        yield from iter_decrypt(io.BytesIO(script[len(script) % 4:]), SaveCrypto.REFDATA_KEY, chunk_size=chunk_size)
+        return
+
+    offset, length = script_range
+    # Skip the length prefix in front of the base64 text, like SaveCrypto does
+    skip = length % 4
+    with open(assets_file, 'rb') as f:
+        f.seek(offset + skip)
+        yield from iter_decrypt(f, SaveCrypto.REFDATA_KEY, length - skip, chunk_size)
+
+
+def _load_script(assets_file: str, name: str) -> bytes:
+    import UnityPy
+
+    env = UnityPy.load(assets_file)
+    for obj in env.objects:
+        if obj.type.name == "TextAsset":
+            data = obj.read()
+            if data.m_Name == name:
+                script = data.m_Script
+                return script.encode('utf-8', 'surrogateescape') if isinstance(script, str) else script
+    raise ValueError(f"Could not find {name} in assets file")
+
+
+def _write_text(chunks, output_file: str, validate: bool) -> None:
+    parser = JsonEventParser() if validate else None
+    with _output(output_file, 'w', encoding='utf-8', newline='') as out:
+        for text in chunks:
+            if parser:
+                parser.feed(text)
+            out.write(text)
+    if parser:
+        parser.close()
+
+
+def decrypt_save_file(input_file: str, output_file: str, key: str = None, validate: bool = False) -> int:
+    """Decrypt a save file to JSON without holding it in memory.
+
+    Args:
+        validate (bool): Also run the text through the incremental JSON
+            parser and fail if it is not a complete JSON document
+
+    Returns:
+        int: Number of bytes read from input_file
+    """
+    with stage("stream_decrypt"):
+        _write_text(iter_save_text(input_file, key), output_file, validate)
+    return os.path.getsize(input_file)
+
+
+def extract_refdata_file(
+    assets_file: str,
+    output_file: str = None,
+    name: str = "WSREFDATA",
+    index=None,
+    validate: bool = False
+) -> str:
+    """Decrypt reference data from an assets file without holding it in memory.
+
+    Returns:
+        str: Path of the written JSON file ([name].json next to the assets file by default)
+    """
+    output_file = output_file or os.path.join(os.path.dirname(assets_file), f"{name}.json")
+    with stage("stream_decrypt"):
+        _write_text(iter_refdata_text(assets_file, name, index), output_file, validate)
+    logger.info(f"Saved extracted reference data to {output_file}")
+    return output_file
+
+
+def _iter_plain_chunks(f, validate: bool, chunk_size: int = CHUNK_SIZE):
+    """Yield the raw UTF-8 chunks of f, checking the encoding (and JSON) as they pass."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parser = JsonEventParser() if validate else None
+    try:
+        for chunk in _read_chunks(f, chunk_size=chunk_size):
+            text = decoder.decode(chunk)
+            if parser:
+                parser.feed(text)
+            yield chunk
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError as e:
+        raise ValueError(f"Input is not valid UTF-8: {e.reason}") from e
+    if parser:
+        parser.close()
+
+
+def encrypt_save_file(input_file: str, output_file: str, key: str = None, validate: bool = False) -> int:
+    """Encrypt a JSON file to the save format without holding it in memory.
+
+    The length prefix needs the size of the base64 text up front; it is
+    computed from the file size, so the JSON is encrypted verbatim.
+
+    Returns:
+        int: Number of bytes read from input_file
+    """
+    cipher = NativeRijndael.for_key(key or SaveCrypto.SAVE_KEY)
+    size = os.path.getsize(input_file)
+    with stage("stream_encrypt"), open(input_file, 'rb') as f, _output(output_file, 'wb') as out:
+        skip = len(UTF8_BOM) if f.read(len(UTF8_BOM)) == UTF8_BOM else 0
+        f.seek(skip)
+        out.write(write_7bit_int(NativeRijndael.encrypted_b64_length(size - skip)))
+        for encrypted in cipher.encrypt_chunks(_iter_plain_chunks(f, validate)):
+            out.write(encrypted)
+    return size
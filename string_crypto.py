@@ -1,70 +1,95 @@
+import json
 import os
-import clr
-from System import Array, String, Char
-from System.IO import (
-    BinaryWriter,
-    BinaryReader,
-    FileStream,
-    FileMode,
-)
-from logger import get_logger
+from collections.abc import Iterable
 
-clr.AddReference('System.IO')
-clr.AddReference('System')
+from dotnet_io import read_7bit_int, read_dotnet_string, write_dotnet_string
+from logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def _build_table(source: str, target: str) -> dict[int, str]:
+    """Map each char of source to the char at the same index in target.
+
+    Only the first occurrence counts, matching the game's linear search.
+    """
+    table = {}
+    for src, dst in zip(source, target):
+        table.setdefault(ord(src), dst)
+    return table
+
+
+def _build_byte_table(table: dict[int, str]) -> bytes:
+    """256-entry bytes.translate table for the ASCII part of a str table."""
+    byte_table = bytearray(range(256))
+    for src, dst in table.items():
+        if src < 256 and ord(dst) < 256:
+            byte_table[src] = ord(dst)
+    return bytes(byte_table)
+
+
 class StringCrypto:
-    DICTIONARY = String(
+    DICTIONARY = (
         "aAbcdEFgGijJklmnoOpPqrSUwXyZ234BCDfHIKMNQtuvWxz7@!#_=|}'68~`$%"
         "ehLRsTVY0159+{:?^&*()-/[];,<>.\\"
-    ).ToCharArray()
-    
-    REFERENCES = String(
+    )
+
+    REFERENCES = (
         "aAbBcCdDeEfFgGhHiIjJkKlLmMnNoOpPqQrRsStTuUvVwWxXyYzZ0123456789"
         "@~`!#$%^&*()_-=+/|[]{}';:,<>?.\\"
-    ).ToCharArray()
+    )
+
+    # Substitution tables, built once: REFERENCES -> DICTIONARY and back
+    ENCODE_TABLE = _build_table(REFERENCES, DICTIONARY)
+    DECODE_TABLE = _build_table(DICTIONARY, REFERENCES)
+    ENCODE_BYTES = _build_byte_table(ENCODE_TABLE)
+    DECODE_BYTES = _build_byte_table(DECODE_TABLE)
+
+    # Separator for the bulk APIs; it is not part of either alphabet
+    _BULK_SEPARATOR = "\x00"
+
+    @staticmethod
+    def _translate(input_str, table: dict[int, str], byte_table: bytes):
+        if isinstance(input_str, (bytes, bytearray, memoryview)):
+            return bytes(input_str).translate(byte_table)
+        if not isinstance(input_str, str):
+            input_str = str(input_str)
+        return input_str.translate(table)
 
     @staticmethod
     def encode(input_str):
         """Encrypts a string using the same character substitution as the game."""
-        if not isinstance(input_str, str):
-            array = input_str.ToCharArray()
-        else:
-            array = String(input_str).ToCharArray()
-
-        text = String.Empty
-        for i in range(len(array)):
-            num = -1
-            for c in StringCrypto.REFERENCES:
-                num += 1
-                if array[i] == c:
-                    array[i] = StringCrypto.DICTIONARY[num]
-                    num = -1
-                    break
-            text += array[i]
-        return str(text)
+        return StringCrypto._translate(
+            input_str, StringCrypto.ENCODE_TABLE, StringCrypto.ENCODE_BYTES
+        )
 
     @staticmethod
     def decode(input_str):
         """Decrypts a string using the same character substitution as the game."""
-        if not isinstance(input_str, str):
-            array = input_str.ToCharArray()
-        else:
-            array = String(input_str).ToCharArray()
-
-        text = String.Empty
-        for i in range(len(array)):
-            num = -1
-            for c in StringCrypto.DICTIONARY:
-                num += 1
-                if array[i] == c:
-                    array[i] = StringCrypto.REFERENCES[num]
-                    num = -1
-                    break
-            text += array[i]
-        return str(text)
+        return StringCrypto._translate(
+            input_str, StringCrypto.DECODE_TABLE, StringCrypto.DECODE_BYTES
+        )
+
+    @staticmethod
+    def _translate_many(strings: Iterable, translate) -> list:
+        strings = list(strings)
+        if not strings:
+            return []
+        sep = StringCrypto._BULK_SEPARATOR
+        if all(isinstance(s, str) and sep not in s for s in strings):
+            # One translate call over the joined batch instead of one per item
+            return translate(sep.join(strings)).split(sep)
+        return [translate(s) for s in strings]
+
+    @staticmethod
+    def encode_many(strings: Iterable) -> list:
+        """Encode every str or bytes item in strings in one call."""
+        return StringCrypto._translate_many(strings, StringCrypto.encode)
+
+    @staticmethod
+    def decode_many(strings: Iterable) -> list:
+        """Decode every str or bytes item in strings in one call."""
+        return StringCrypto._translate_many(strings, StringCrypto.decode)
 
     @staticmethod
     def save_wsdir(save_paths, filepath):
@@ -89,25 +114,30 @@ class StringCrypto:
 
         required_slots.update(save_paths)
 
-        content = String.Empty
+        parts = []
         for k, v in required_slots.items():
             if not isinstance(k, str) or not isinstance(v, str):
                 raise ValueError("Both keys and values must be strings")
-            content += f"{k}={v};"
+            parts.append(f"{k}={v};")
+
+        encrypted = StringCrypto.encode("".join(parts))
 
-        encrypted = StringCrypto.encode(content)
+        # Same layout as BinaryWriter.Write(string)
+        with open(filepath, 'wb') as f:
+            f.write(write_dotnet_string(encrypted))
 
-        fs = None
-        writer = None
+    @staticmethod
+    def _read_wsdir_text(raw: bytes) -> str:
+        """Strip the BinaryWriter length prefix when the file has one."""
+        view = memoryview(raw)
         try:
-            fs = FileStream(filepath, FileMode.Create)
-            writer = BinaryWriter(fs)
-            writer.Write(String(encrypted))
-        finally:
-            if writer:
-                writer.Close()
-            if fs:
-                fs.Close()
+            length, pos = read_7bit_int(view)
+            if length == len(view) - pos:
+                return read_dotnet_string(view)
+        except (ValueError, EOFError):
+            pass
+        logger.debug("WSDir file has no length prefix, decoding whole file")
+        return str(view, 'utf-8', 'dotnet_replace')
 
     @staticmethod
     def load_wsdir(filepath):
@@ -121,30 +151,33 @@ class StringCrypto:
         """
         if not os.path.exists(filepath):
             return {}
-       
-        fs = None
-        reader = None
-        try:
-            fs = FileStream(filepath, FileMode.Open)
-            reader = BinaryReader(fs)
-
-            length = fs.Length
-            bytes_array = Array.CreateInstance(Char, int(length))
-            reader.Read(bytes_array, 0, int(length))
-            encrypted = String(bytes_array)
-
-            decrypted = StringCrypto.decode(encrypted)
-
-            result = {}
-            pairs = String(decrypted).Split(Array[Char]([';']))
-            for pair in pairs:
-                if String(pair).Contains('='):
-                    key_value = String(pair).Split(Array[Char](['=']))
-                    if len(key_value) == 2:
-                        result[str(key_value[0])] = str(key_value[1])
-            return result
-        finally:
-            if reader:
-                reader.Close()
-            if fs:
-                fs.Close() 
\ No newline at end of file
+
+        with open(filepath, 'rb') as f:
+            encrypted = StringCrypto._read_wsdir_text(f.read())
+
+        decrypted = StringCrypto.decode(encrypted)
+
+        result = {}
+        for pair in decrypted.split(';'):
+            if '=' in pair:
+                key_value = pair.split('=')
+                if len(key_value) == 2:
+                    result[key_value[0]] = key_value[1]
+        return result
+
+
+def process_wsdir_file(input_file: str, output_file: str, encrypt: bool) -> None:
+    """Encrypt a WSDir JSON file to WSDir.txt format, or decrypt one to indented JSON."""
+    if encrypt:
+        from backup_store import snapshot_before_write
+
+        # Load JSON, encrypt and save
+        with open(input_file, 'r') as f:
+            json_data = json.load(f)
+        snapshot_before_write(output_file, "wsdir --encrypt")
+        StringCrypto.save_wsdir(json_data, output_file)
+    else:
+        # Decrypt and save as JSON
+        decrypted = StringCrypto.load_wsdir(input_file)
+        with open(output_file, 'w') as f:
+            json.dump(decrypted, f, indent=2)
@@ -0,0 +1,203 @@
+"""Synthetic saves, WSDir files, reference data and assets files.
+
+Every generator is deterministic for a given seed and scales its output to
+roughly the requested size in bytes of serialized text, so benchmarks can
+run the same inputs from a few KB up to hundreds of MB.
+"""
+import random
+import struct
+
+from utils import serialize_json
+
+ITEM_TYPES = ("Sword", "Axe", "Dagger", "Bow", "Staff", "Spear", "Shield", "Armor")
+ELEMENTS = ("None", "Fire", "Ice", "Lightning", "Poison")
+WORDS = (
+    "potato", "forge", "anvil", "ember", "quench", "temper", "rune", "gem",
+    "hilt", "blade", "guard", "pommel", "smith", "ore", "flux", "bellows",
+)
+
+# Unity serialized file layout written by build_assets_file
+SERIALIZED_VERSION = 17
+UNITY_VERSION = "2018.4.36f1"
+TARGET_PLATFORM = 5  # StandaloneWindows
+TEXT_ASSET_CLASS_ID = 49
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _scaled(size: int, make_record, rng: random.Random, fixed: int = 0) -> list:
+    """Build records until their serialized size reaches size - fixed bytes."""
+    sample = [make_record(rng, i) for i in range(32)]
+    per_record = max(1, len(serialize_json(sample)) // len(sample))
+    count = max(1, (size - fixed) // per_record)
+    return sample[:count] + [make_record(rng, i) for i in range(len(sample), count)]
+
+
+def _save_item(rng: random.Random, i: int) -> dict:
+    return {
+        "uid": i,
+        "type": rng.choice(ITEM_TYPES),
+        "name": _text(rng, 2).title(),
+        "quality": round(rng.random() * 5, 3),
+        "level": rng.randint(1, 60),
+        "element": rng.choice(ELEMENTS),
+        "stats": {
+            "attack": rng.randint(0, 999),
+            "defense": rng.randint(0, 999),
+            "magic": rng.randint(0, 999),
+            "speed": rng.randint(0, 999),
+        },
+        "enchanted": rng.random() < 0.2,
+        "price": rng.randint(10, 100000),
+    }
+
+
+def synthetic_save(size: int, seed: int = 0) -> dict:
+    """A save-shaped document whose JSON is roughly size bytes."""
+    rng = random.Random(seed)
+    heroes = [
+        {
+            "id": f"hero_{i}",
+            "name": _text(rng, 1).title(),
+            "level": rng.randint(1, 50),
+            "xp": rng.randint(0, 10 ** 6),
+            "equipment": [rng.randint(0, 10 ** 4) for _ in range(4)],
+        }
+        for i in range(8)
+    ]
+    save = {
+        "version": "1.2.0",
+        "day": rng.randint(1, 1000),
+        "gold": rng.randint(0, 10 ** 7),
+        "shopName": _text(rng, 3).title(),
+        "flags": {f"flag_{i}": rng.random() < 0.5 for i in range(32)},
+        "heroes": heroes,
+        "inventory": [],
+    }
+    fixed = len(serialize_json(save))
+    save["inventory"] = _scaled(size, _save_item, rng, fixed)
+    return save
+
+
+def synthetic_wsdir(size: int, seed: int = 0) -> dict:
+    """WSDir entries (save slot name to save path) totalling roughly size bytes."""
+    rng = random.Random(seed)
+    entries = {"autosaveLoad": "WS_autosave.txt"}
+    total = 0
+    i = 1
+    while total < size:
+        key = f"save{i}Load"
+        value = f"C:\\Users\\{rng.choice(WORDS)}\\Documents\\SavedGames\\HPAWS\\WS_save{i}.txt"
+        entries[key] = value
+        total += len(key) + len(value) + 2
+        i += 1
+    return entries
+
+
+def _refdata_record(table: int):
+    def make(rng: random.Random, i: int) -> dict:
+        return {
+            "id": f"T{table}_{i}",
+            "name": _text(rng, 2),
+            "description": _text(rng, rng.randint(4, 16)),
+            "count": rng.randint(0, 1000),
+            "rate": rng.random() * 100,
+            "enabled": rng.random() < 0.5,
+            "tags": [rng.choice(WORDS) for _ in range(rng.randint(0, 4))],
+        }
+    return make
+
+
+def synthetic_refdata(size: int, seed: int = 0, tables: int = 10) -> dict:
+    """A WSREFDATA-shaped document whose in-game JSON is roughly size bytes."""
+    rng = random.Random(seed)
+    per_table = max(1, size // tables)
+    return {
+        "status": "OK",
+        "value": {
+            f"RefTable{t}": _scaled(per_table, _refdata_record(t), rng)
+            for t in range(tables)
+        },
+    }
+
+
+def _aligned_string(data: bytes, endian: str) -> bytes:
+    padding = (4 - len(data) % 4) % 4
+    return struct.pack(f"{endian}i", len(data)) + data + b"\0" * padding
+
+
+def text_asset_bytes(name: str, script: bytes, endian: str = "<") -> bytes:
+    """Serialize a TextAsset object (m_Name, m_Script) as read by parse_text_asset."""
+    return _aligned_string(name.encode('utf-8'), endian) + _aligned_string(script, endian)
+
+
+def build_assets_file(text_assets: dict[str, bytes], endian: str = "<") -> bytes:
+    """Build a minimal standalone Unity serialized file holding only TextAssets.
+
+    The layout is format version 17 without type trees, which UnityPy reads
+    with its built-in class definitions for UNITY_VERSION.
+
+    Args:
+        text_assets (dict): TextAsset name to m_Script bytes, in path ID order
+        endian (str): "<" or ">" for the object data and metadata
+
+    Returns:
+        bytes: The assets file contents
+    """
+    header_size = 20
+    metadata = bytearray()
+    metadata += UNITY_VERSION.encode('ascii') + b"\0"
+    metadata += struct.pack(f"{endian}i?", TARGET_PLATFORM, False)
+
+    # Type table: a single TextAsset entry
+    metadata += struct.pack(f"{endian}i", 1)
+    metadata += struct.pack(f"{endian}i?h", TEXT_ASSET_CLASS_ID, False, -1)
+    metadata += b"\0" * 16  # old type hash
+
+    data = bytearray()
+    metadata += struct.pack(f"{endian}i", len(text_assets))
+    for path_id, (name, script) in enumerate(text_assets.items(), 1):
+        data += b"\0" * ((8 - len(data) % 8) % 8)
+        obj = text_asset_bytes(name, script, endian)
+        # Object entries are aligned to 4 bytes from the start of the file
+        metadata += b"\0" * ((4 - (header_size + len(metadata)) % 4) % 4)
+        metadata += struct.pack(f"{endian}qIIi", path_id, len(data), len(obj), 0)
+        data += obj
+
+    metadata += struct.pack(f"{endian}ii", 0, 0)  # script types, externals
+    metadata += b"\0"  # user information
+
+    data_offset = header_size + len(metadata)
+    data_offset += (16 - data_offset % 16) % 16
+    header = struct.pack(
+        ">IIII?3x",
+        len(metadata),
+        data_offset + len(data),
+        SERIALIZED_VERSION,
+        data_offset,
+        endian == ">"
+    )
+    padding = b"\0" * (data_offset - header_size - len(metadata))
+    return header + bytes(metadata) + padding + bytes(data)
+
+
+def synthetic_assets(refdata: dict, filler: int = 16, seed: int = 0) -> bytes:
+    """An assets file with an encrypted WSREFDATA between filler TextAssets."""
+    from crypto import SaveCrypto
+
+    rng = random.Random(seed)
+    text_assets = {
+        f"Dialogue_{i}": _text(rng, rng.randint(20, 200)).encode('utf-8')
+        for i in range(filler // 2)
+    }
+    text_assets["WSREFDATA"] = SaveCrypto.encrypt(
+        serialize_json(refdata, in_game_data=True),
+        SaveCrypto.REFDATA_KEY
+    )
+    text_assets.update(
+        (f"Credits_{i}", _text(rng, rng.randint(20, 200)).encode('utf-8'))
+        for i in range(filler - filler // 2)
+    )
+    return build_assets_file(text_assets)
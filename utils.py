@@ -1,42 +1,140 @@
-import clr
-from System import Int32, Double, Convert
+import io
+import json
+import math
+import os
 
-clr.AddReference('System')
+from profiler import stage
 
+CONFORMANCE_CORPUS = os.path.join(os.path.dirname(__file__), "conformance", "dotnet_format.json")
 
-def serialize_json(obj, in_game_data=False):
-    """Serialize JSON in the same format as LitJson.JsonMapper"""
-    if isinstance(obj, dict):
-        items = sorted(obj.items())
-        parts = []
-        for key, value in items:
-            key_str = f'"{key}"'
-            value_str = serialize_json(
-                value,
-                in_game_data=(in_game_data or key == "value")
-            )
-            parts.append(f"{key_str}:{value_str}")
-        return "{" + ",".join(parts) + "}"
-    elif isinstance(obj, (list, tuple)):
-        return "[" + ",".join(
-            serialize_json(x, in_game_data) for x in obj
-        ) + "]"
-    elif isinstance(obj, bool):
-        if in_game_data:
-            return f'"{Convert.ToString(obj)}"'
+INT32_MIN = -(1 << 31)
+INT32_MAX = (1 << 31) - 1
+
+
+def format_dotnet_int(value: int) -> str:
+    """Same output as Int32(value).ToString()."""
+    if not INT32_MIN <= value <= INT32_MAX:
+        raise OverflowError(f"Value {value} was either too large or too small for an Int32")
+    return str(value)
+
+
+def format_dotnet_double(value: float) -> str:
+    """Same output as Double(value).ToString() with the invariant culture.
+
+    .NET Framework formats doubles with "G15": 15 significant digits, an
+    uppercase exponent with at least two digits, and no negative zero.
+    """
+    if value != value:
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value == 0:
+        return "0"
+    return format(value, '.15g').replace('e', 'E')
+
+
+def format_dotnet_bool(value: bool) -> str:
+    """Same output as Convert.ToString(value)."""
+    return "True" if value else "False"
+
+
+class JsonStreamWriter:
+    """Writes JSON in the same format as LitJson.JsonMapper to a write callable.
+
+    Fragments are collected into a small buffer that is flushed after every
+    buffer_size fragments, so the whole document is never held in memory.
+    """
+
+    def __init__(self, write, buffer_size: int = 4096):
+        self._write = write
+        self._buffer = []
+        self._buffer_size = buffer_size
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._write("".join(self._buffer))
+            self._buffer.clear()
+
+    def write(self, obj, in_game_data: bool = False) -> None:
+        self._value(obj, in_game_data)
+        self.flush()
+
+    def _value(self, obj, in_game_data: bool) -> None:
+        append = self._buffer.append
+        if isinstance(obj, dict):
+            separator = "{"
+            for key, value in sorted(obj.items()):
+                append(f'{separator}"{key}":')
+                separator = ","
+                self._value(value, in_game_data or key == "value")
+            append("{}" if separator == "{" else "}")
+        elif isinstance(obj, (list, tuple)):
+            separator = "["
+            for item in obj:
+                append(separator)
+                separator = ","
+                self._value(item, in_game_data)
+            append("[]" if separator == "[" else "]")
         else:
+            append(self._scalar(obj, in_game_data))
+            return
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    @staticmethod
+    def _scalar(obj, in_game_data: bool) -> str:
+        if isinstance(obj, str):
+            return '"' + obj.replace('"', '\\"') + '"'
+        elif isinstance(obj, bool):
+            if in_game_data:
+                return f'"{format_dotnet_bool(obj)}"'
             return "true" if obj else "false"
-    elif isinstance(obj, int):
-        if in_game_data:
-            return f'"{Int32(obj).ToString()}"'
-        else:
+        elif isinstance(obj, int):
+            if in_game_data:
+                return f'"{format_dotnet_int(obj)}"'
             return str(obj)
-    elif isinstance(obj, float):
-        if in_game_data:
-            return f'"{Double(obj).ToString()}"'
-        else:
+        elif isinstance(obj, float):
+            if in_game_data:
+                return f'"{format_dotnet_double(obj)}"'
             return str(obj)
-    elif obj is None:
-        return "null"
-    else:
-        return f'"{str(obj).replace('"', '\\"')}"' 
\ No newline at end of file
+        elif obj is None:
+            return "null"
+        return '"' + str(obj).replace('"', '\\"') + '"'
+
+
+def dump_json(obj, fp, in_game_data=False) -> None:
+    """Stream obj to the text file fp in the same format as serialize_json."""
+    with stage("serialize_json"):
+        JsonStreamWriter(fp.write).write(obj, in_game_data)
+
+
+def serialize_json(obj, in_game_data=False):
+    """Serialize JSON in the same format as LitJson.JsonMapper"""
+    buffer = io.StringIO()
+    dump_json(obj, buffer, in_game_data)
+    return buffer.getvalue()
+
+
+def verify_dotnet_conformance(corpus_path: str = CONFORMANCE_CORPUS) -> list[str]:
+    """Check the .NET number/bool formatting against the conformance corpus.
+
+    Returns:
+        list: Human readable descriptions of every mismatch (empty when conformant)
+    """
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    formatters = {
+        "int": (int, format_dotnet_int),
+        "double": (float, format_dotnet_double),
+        "bool": (lambda v: v == "True", format_dotnet_bool),
+    }
+    mismatches = []
+    for case in corpus["cases"]:
+        parse, formatter = formatters[case["type"]]
+        actual = formatter(parse(case["input"]))
+        if actual != case["expected"]:
+            mismatches.append(
+                f"{case['type']} {case['input']}: expected {case['expected']!r}, got {actual!r}"
+            )
+    return mismatches